@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# bench_chunk.py
+# Noita Savior - chunk-level deduplication benchmark
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Measure what content-defined chunking saves and what it costs.
+
+Usage: python benchmarks/bench_chunk.py [--shape large_files] [--scale 0.5]
+           [--generations 5] [--edits 8] [--chunk-mb 1] [--dir PATH] [--out results.json]
+
+A synthetic save is snapshotted --generations times into two stores, one
+keeping whole files and one chunking files of at least --chunk-mb. Between
+generations every large file gets --edits small overwrites plus one
+insertion, as a world file that is rewritten in a few places. Reported per
+store: the bytes added by each later generation, the dedup ratio (bytes of
+all snapshots / bytes stored), and the ingest and restore throughput of the
+first generation next to CopyEngine.copy_tree of the same save.
+
+The synthetic files are half zeros, so the chunked store also dedups zero
+runs inside a file; compare the per-generation growth for the effect of
+partial changes.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from copyengine import CopyEngine
+from objstore import ObjectStore, scan_tree
+from synth import SHAPES, generate
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def edit_large_files(root, threshold, edits, rng):
+    """Overwrite a few regions of each large file and insert a short run"""
+    files, _dirs = scan_tree(root)
+    for rel, st in files.items():
+        if st.st_size < threshold:
+            continue
+        path = os.path.join(root, *rel.split("/"))
+        with open(path, 'rb') as f:
+            data = bytearray(f.read())
+        for _ in range(edits):
+            offset = rng.randrange(len(data))
+            size = rng.randint(64, 4096)
+            data[offset:offset + size] = rng.randbytes(min(size, len(data) - offset))
+        offset = rng.randrange(len(data))
+        data[offset:offset] = rng.randbytes(rng.randint(1, 512))
+        with open(path, 'wb') as f:
+            f.write(data)
+
+
+def stored_bytes(store):
+    return store.stats()[1]
+
+
+def bench_shape(args, shape, engine):
+    work = tempfile.mkdtemp(prefix="nsav_chunk_", dir=args.dir)
+    try:
+        save_path = os.path.join(work, "save00")
+        total = generate(save_path, shape, args.scale, seed=args.seed)
+        threshold = int(args.chunk_mb * 1024 * 1024)
+        stores = {
+            "whole": ObjectStore(os.path.join(work, "whole"), engine, clone=False),
+            "chunked": ObjectStore(os.path.join(work, "chunked"), engine, clone=False,
+                                   chunk_threshold=threshold),
+        }
+        result = {"bytes": total, "copy_tree_mb_per_s":
+                  total / 1048576 / timed(engine.copy_tree, save_path,
+                                          os.path.join(work, "copy"))}
+        shutil.rmtree(os.path.join(work, "copy"))
+        for name, store in stores.items():
+            result[name] = {"ingest_mb_per_s": total / 1048576 / timed(
+                store.snapshot, save_path, "gen_0")}
+            restore = timed(store.restore, "gen_0", os.path.join(work, f"restore_{name}"))
+            result[name]["restore_mb_per_s"] = total / 1048576 / restore
+            shutil.rmtree(os.path.join(work, f"restore_{name}"))
+            result[name]["added_bytes"] = []
+
+        rng = random.Random(args.seed)
+        logical = total
+        for generation in range(1, args.generations):
+            edit_large_files(save_path, threshold, args.edits, rng)
+            logical += sum(st.st_size for st in scan_tree(save_path)[0].values())
+            for name, store in stores.items():
+                before = stored_bytes(store)
+                store.snapshot(save_path, f"gen_{generation}", base=f"gen_{generation - 1}")
+                result[name]["added_bytes"].append(stored_bytes(store) - before)
+
+        for name, store in stores.items():
+            entry = result[name]
+            entry["stored_bytes"] = stored_bytes(store)
+            entry["dedup_ratio"] = logical / entry["stored_bytes"]
+            later = entry["added_bytes"]
+            print(f"{shape:<12} {name:<8} ingest {entry['ingest_mb_per_s']:>7.1f} MB/s  "
+                  f"restore {entry['restore_mb_per_s']:>7.1f} MB/s  "
+                  f"per generation +{sum(later) / max(len(later), 1) / 1048576:>7.2f} MB  "
+                  f"dedup {entry['dedup_ratio']:>5.2f}x", file=sys.stderr)
+        print(f"{shape:<12} copy_tree {result['copy_tree_mb_per_s']:>7.1f} MB/s", file=sys.stderr)
+        result["logical_bytes"] = logical
+        return result
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--shape", action="append", choices=sorted(SHAPES),
+                        help="save shape to test (repeatable, default: large_files, late_game)")
+    parser.add_argument("--scale", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--generations", type=int, default=5)
+    parser.add_argument("--edits", type=int, default=8, help="overwrites per large file")
+    parser.add_argument("--chunk-mb", type=float, default=1.0,
+                        help="chunk files at least this big")
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--dir", default=None, help="where to create the test trees")
+    parser.add_argument("--out", default=None, help="JSON file (default: stdout)")
+    args = parser.parse_args()
+    if args.dir:
+        # mkdtemp() needs the parent to exist
+        os.makedirs(args.dir, exist_ok=True)
+
+    engine = CopyEngine(args.workers or None)
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "scale": args.scale,
+              "generations": args.generations, "edits": args.edits,
+              "chunk_mb": args.chunk_mb, "shapes": {}}
+    # The store reports clone support on stdout; keep it off the JSON
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for shape in args.shape or ["large_files", "late_game"]:
+            report["shapes"][shape] = bench_shape(args, shape, engine)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
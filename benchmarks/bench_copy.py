@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# bench_copy.py
+# Noita Savior - copy engine benchmark
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Compare CopyEngine.copy_tree with shutil.copytree on synthetic saves.
+
+Usage: python benchmarks/bench_copy.py [--scale 0.25] [--workers 8] [--dir PATH]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from copyengine import CopyEngine
+from synth import SHAPES, generate
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=float, default=0.25)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--dir", default=None, help="where to create the test trees")
+    args = parser.parse_args()
+    if args.dir:
+        # mkdtemp() needs the parent to exist
+        os.makedirs(args.dir, exist_ok=True)
+
+    engine = CopyEngine(args.workers or None)
+    print(f"{'shape':<12} {'size MB':>8} {'copytree s':>11} {'engine s':>9} {'speedup':>8}")
+    for shape in SHAPES:
+        work = tempfile.mkdtemp(dir=args.dir)
+        try:
+            src = os.path.join(work, "save00")
+            total = generate(src, shape, args.scale)
+            baseline = timed(shutil.copytree, src, os.path.join(work, "a"))
+            parallel = timed(engine.copy_tree, src, os.path.join(work, "b"))
+            print(f"{shape:<12} {total / 1048576:>8.1f} {baseline:>11.3f} "
+                  f"{parallel:>9.3f} {baseline / parallel:>7.2f}x")
+        finally:
+            shutil.rmtree(work)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# bench_core.py
+# Noita Savior - save/load/backup/delete benchmark suite
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Time the slot operations of SaveCore on synthetic saves and write JSON.
+
+Usage: python benchmarks/bench_core.py [--shape late_game] [--scale 0.25]
+           [--files N] [--large-mb MB] [--repeat 5] [--out results.json]
+
+Every operation runs once cold and then --repeat times warm. For the cold
+run the page cache of the trees involved is dropped first (all of it when
+running as root on Linux, otherwise per file with posix_fadvise, which is
+best effort). Cold saves also start from an empty store, so they show a
+full copy while warm saves show the incremental path. quicksave is a save
+into a slot with the shadow mirror synced beforehand (not timed), i.e.
+what a save costs once the mirror has caught up in the background.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from core import DEFAULT_SETTINGS, SaveCore
+from synth import SHAPES, generate
+
+OPERATIONS = ("save_to_slot", "quicksave", "load_from_slot", "backup_current_save",
+              "delete_slot", "load_slots_data")
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[rank - 1]
+
+
+def summarize(runs):
+    summary = {"runs": runs, "min": min(runs), "mean": sum(runs) / len(runs)}
+    for pct in PERCENTILES:
+        summary[f"p{pct}"] = percentile(runs, pct)
+    return summary
+
+
+def drop_caches(*roots):
+    """Evict the trees under roots from the page cache; returns the method used"""
+    if sys.platform.startswith("linux"):
+        os.sync()
+        try:
+            with open("/proc/sys/vm/drop_caches", 'w') as f:
+                f.write("3\n")
+            return "drop_caches"
+        except OSError:
+            pass
+    if not hasattr(os, "posix_fadvise"):
+        return "none"
+    for root in roots:
+        for dirpath, _dirnames, filenames in os.walk(root):
+            for name in filenames:
+                try:
+                    fd = os.open(os.path.join(dirpath, name), os.O_RDONLY)
+                except OSError:
+                    continue
+                try:
+                    os.fsync(fd)
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+                except OSError:
+                    pass
+                finally:
+                    os.close(fd)
+    return "fadvise"
+
+
+def clear_backups(core):
+    """Remove the auto-backups created by loads and backups (not timed)"""
+    for name in os.listdir(core.backup_dir):
+        if name.startswith("auto_backup_"):
+            shutil.rmtree(os.path.join(core.backup_dir, name))
+
+
+class Bench:
+    """One SaveCore working on a synthetic save inside a scratch folder"""
+
+    def __init__(self, work, settings):
+        self.work = work
+        self.save_path = os.path.join(work, "save00")
+        self.settings = settings
+        self.cache_method = "none"
+        self.core = SaveCore(self.save_path, settings=settings, base_dir=work)
+
+    def reset_store(self):
+        """Start over with no slots, simulating a first save"""
+        shutil.rmtree(self.core.backup_dir)
+        if os.path.exists(self.core.slots_file):
+            os.remove(self.core.slots_file)
+        self.core = SaveCore(self.save_path, settings=self.settings, base_dir=self.work)
+
+    def time(self, op, cold):
+        """Run op once and return its duration in seconds"""
+        core = self.core
+        roots = (self.save_path, core.backup_dir)
+        if op == "save_to_slot":
+            if cold:
+                self.reset_store()
+                core = self.core
+            return self._timed(roots, cold, lambda: core.save_slot(0))
+        if op == "quicksave":
+            if cold:
+                self.reset_store()
+                core = self.core
+            core.settings = dict(core.settings, shadow_mirror=True)
+            core.sync_shadow()
+            try:
+                return self._timed(roots, cold, lambda: core.save_slot(5))
+            finally:
+                core.settings = self.settings
+        if op == "load_from_slot":
+            if not core.slot_exists(1):
+                core.save_slot(1)
+            try:
+                return self._timed(roots, cold, lambda: core.load_slot(1))
+            finally:
+                clear_backups(core)
+        if op == "backup_current_save":
+            try:
+                return self._timed(roots, cold, core.backup_current_save)
+            finally:
+                clear_backups(core)
+        if op == "delete_slot":
+            core.save_slot(7)
+            return self._timed(roots, cold, lambda: core.delete_slot(7))
+        if op == "load_slots_data":
+            return self._timed(roots, cold, core.load_slots_data)
+        raise ValueError(f"unknown operation: {op}")
+
+    def _timed(self, roots, cold, func):
+        if cold:
+            self.cache_method = drop_caches(*roots)
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+
+def bench_shape(args, shape, settings):
+    work = tempfile.mkdtemp(prefix="nsav_bench_", dir=args.dir)
+    try:
+        save_path = os.path.join(work, "save00")
+        total = generate(save_path, shape, args.scale, seed=args.seed,
+                         files=args.files, large_mb=args.large_mb)
+        file_count = sum(len(files) for _root, _dirs, files in os.walk(save_path))
+        bench = Bench(work, settings)
+        results = {}
+        for op in args.ops:
+            cold = bench.time(op, cold=True)
+            warm = [bench.time(op, cold=False) for _ in range(args.repeat)]
+            results[op] = {"cold": cold, "warm": summarize(warm)}
+            print(f"{shape:<12} {op:<20} cold {cold:>8.3f}s  warm p50 "
+                  f"{results[op]['warm']['p50']:>8.3f}s  p90 {results[op]['warm']['p90']:>8.3f}s",
+                  file=sys.stderr)
+        return {"files": file_count, "bytes": total, "cache_drop": bench.cache_method,
+                "operations": results}
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--shape", action="append", choices=sorted(SHAPES),
+                        help="save shape to test (repeatable, default: all)")
+    parser.add_argument("--scale", type=float, default=0.25)
+    parser.add_argument("--files", type=int, default=None, help="small file count before scaling")
+    parser.add_argument("--large-mb", type=float, default=None, help="large file size before scaling")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="warm runs per operation")
+    parser.add_argument("--op", dest="ops", action="append", choices=OPERATIONS,
+                        help="operation to time (repeatable, default: all)")
+    parser.add_argument("--slot-format", choices=("store", "archive"), default="store")
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--dir", default=None, help="where to create the test trees")
+    parser.add_argument("--out", default=None, help="JSON file (default: stdout)")
+    args = parser.parse_args()
+    if args.dir:
+        # mkdtemp() needs the parent to exist
+        os.makedirs(args.dir, exist_ok=True)
+    args.ops = args.ops or list(OPERATIONS)
+
+    settings = dict(DEFAULT_SETTINGS, slot_format=args.slot_format, copy_workers=args.workers)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "scale": args.scale,
+        "files": args.files,
+        "large_mb": args.large_mb,
+        "repeat": args.repeat,
+        "settings": settings,
+        "shapes": {},
+    }
+    # The core reports progress on stdout; keep it off the JSON
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for shape in args.shape or list(SHAPES):
+            report["shapes"][shape] = bench_shape(args, shape, settings)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# bench_live.py
+# Noita Savior - live snapshot benchmark
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Measure what a live snapshot costs the game and what its retries cost.
+
+Usage: python benchmarks/bench_live.py [--shape late_game] [--scale 0.25]
+           [--rate 0 --rate 50 --rate 20] [--fps 60] [--save-every 1.0]
+           [--save-files 40] [--dir PATH] [--out results.json]
+
+A stand-in for the game runs in its own process at --fps frames per
+second. Each frame does a fixed amount of CPU work (calibrated to a
+third of the frame budget when idle) and reads one world file; every
+--save-every seconds it rewrites --save-files files of the save, like an
+autosave. While it runs, the save is snapshotted into an empty store:
+once as a plain snapshot (unthrottled and unchecked, for reference) and
+once per --rate as a live snapshot at that many MB/s (0 = unlimited).
+
+Reported per run: snapshot time, passes, the files and bytes copied
+again because the game changed them mid-copy (and that as a share of the
+first pass), and the frame times inside the snapshot window next to a
+run without any snapshot: p50, p99, max and the share of frames over
+their budget.
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from copyengine import CopyEngine
+from livesnap import LiveCopy, LiveSnapshotError
+from objstore import ObjectStore, scan_tree
+from synth import SHAPES, generate
+
+PERCENTILES = (50, 99)
+# Share of the frame budget the game's CPU work takes when nothing else runs
+CPU_SHARE = 0.3
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[rank - 1]
+
+
+def _work(rounds, buffer):
+    for _ in range(rounds):
+        hashlib.sha256(buffer).digest()
+
+
+def _calibrate(seconds, buffer):
+    """Rounds of _work that take about `seconds` on an idle machine"""
+    rounds = 1
+    while True:
+        start = time.perf_counter()
+        _work(rounds, buffer)
+        elapsed = time.perf_counter() - start
+        if elapsed >= 0.05:
+            return max(1, int(rounds * seconds / elapsed))
+        rounds *= 2
+
+
+def game(save_path, rels, args, stop, ready, results):
+    """Frame loop of the stand-in game; puts [(start, frame seconds), ...] on results"""
+    rng = random.Random(args.seed)
+    budget = 1.0 / args.fps
+    buffer = bytes(16 * 1024)
+    rounds = _calibrate(budget * CPU_SHARE, buffer)
+    frames = []
+    next_save = time.time() + args.save_every
+    next_frame = time.perf_counter()
+    ready.set()
+    while not stop.is_set():
+        start = time.time()
+        _work(rounds, buffer)
+        # Stream one world file from disk
+        with open(os.path.join(save_path, *rng.choice(rels).split("/")), 'rb') as f:
+            f.read()
+        if start >= next_save:
+            # Autosave: rewrite a batch of files with new contents
+            for rel in rng.sample(rels, min(args.save_files, len(rels))):
+                with open(os.path.join(save_path, *rel.split("/")), 'wb') as f:
+                    f.write(rng.randbytes(rng.randint(4096, 32768)))
+            next_save += args.save_every
+        frames.append((start, time.time() - start))
+        next_frame += budget
+        delay = next_frame - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # Late: do not try to catch up with a burst of frames
+            next_frame = time.perf_counter()
+    results.put(frames)
+
+
+def frame_stats(frames, budget):
+    times = [seconds for _start, seconds in frames]
+    if not times:
+        return {}
+    stats = {f"p{pct}_ms": percentile(times, pct) * 1000 for pct in PERCENTILES}
+    stats["max_ms"] = max(times) * 1000
+    stats["over_budget"] = sum(1 for seconds in times if seconds > budget) / len(times)
+    stats["frames"] = len(times)
+    return stats
+
+
+def run_with_game(args, save_path, rels, func):
+    """Run func() while the game runs; returns (result, frames during func, seconds)"""
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    ready = context.Event()
+    results = context.Queue()
+    process = context.Process(target=game, args=(save_path, rels, args, stop, ready, results))
+    process.start()
+    try:
+        ready.wait()
+        time.sleep(args.settle)
+        start = time.time()
+        result = func()
+        end = time.time()
+        time.sleep(args.settle)
+    finally:
+        stop.set()
+        frames = results.get()
+        process.join()
+    return result, [frame for frame in frames if start <= frame[0] <= end], end - start
+
+
+def bench_shape(args, shape, engine):
+    work = tempfile.mkdtemp(prefix="nsav_live_", dir=args.dir)
+    try:
+        save_path = os.path.join(work, "save00")
+        total = generate(save_path, shape, args.scale, seed=args.seed)
+        files = scan_tree(save_path)[0]
+        # The game only touches small files; world chunks are what it rewrites
+        rels = sorted(rel for rel, st in files.items() if st.st_size < 1024 * 1024)
+        budget = 1.0 / args.fps
+        result = {"files": len(files), "bytes": total}
+
+        _none, frames, seconds = run_with_game(args, save_path, rels,
+                                               lambda: time.sleep(args.baseline))
+        result["baseline"] = {"frames": frame_stats(frames, budget)}
+
+        runs = [("plain", None)] + [(f"live_{rate:g}", rate) for rate in args.rate]
+        for name, rate in runs:
+            store_dir = os.path.join(work, f"store_{name}")
+            store = ObjectStore(store_dir, engine, clone=False)
+            live = LiveCopy(rate, args.workers, args.rounds) if rate is not None else None
+
+            def snapshot():
+                try:
+                    return store.snapshot(save_path, "snap", live=live)
+                except LiveSnapshotError as e:
+                    return e
+
+            stats, frames, seconds = run_with_game(args, save_path, rels, snapshot)
+            entry = {"seconds": seconds, "frames": frame_stats(frames, budget)}
+            if isinstance(stats, LiveSnapshotError):
+                # Never settled: the game changed files faster than one pass
+                entry["error"] = str(stats)
+            else:
+                entry["first_pass_bytes"] = stats.bytes
+            if live is not None and "error" not in entry:
+                entry.update(passes=live.rounds, retry_files=live.retry_files,
+                             retry_bytes=live.retry_bytes,
+                             retry_share=live.retry_bytes / max(stats.bytes, 1),
+                             throttled_seconds=live.limiter.waited)
+            result[name] = entry
+            shutil.rmtree(store_dir)
+
+        base = result["baseline"]["frames"]
+        print(f"{shape:<12} {'baseline':<10} {'':>33}  frames p50 {base['p50_ms']:>6.2f} ms  "
+              f"p99 {base['p99_ms']:>6.2f} ms  max {base['max_ms']:>7.2f} ms  "
+              f"over budget {base['over_budget'] * 100:>5.1f}%", file=sys.stderr)
+        for name, _rate in runs:
+            entry = result[name]
+            frames = entry["frames"]
+            retries = (f"{entry['passes']} passes +{entry['retry_bytes'] / 1048576:.1f} MB "
+                       f"({entry['retry_share'] * 100:.1f}%)" if "passes" in entry
+                       else "gave up" if "error" in entry else "")
+            print(f"{shape:<12} {name:<10} {entry['seconds']:>6.2f}s {retries:<25}  "
+                  f"frames p50 {frames['p50_ms']:>6.2f} ms  p99 {frames['p99_ms']:>6.2f} ms  "
+                  f"max {frames['max_ms']:>7.2f} ms  "
+                  f"over budget {frames['over_budget'] * 100:>5.1f}%", file=sys.stderr)
+        return result
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--shape", action="append", choices=sorted(SHAPES),
+                        help="save shape to test (repeatable, default: late_game)")
+    parser.add_argument("--scale", type=float, default=0.25)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rate", type=float, action="append",
+                        help="live snapshot rate in MB/s, 0 = unlimited "
+                             "(repeatable, default: 0, 50, 20)")
+    parser.add_argument("--workers", type=int, default=2, help="live snapshot threads")
+    parser.add_argument("--rounds", type=int, default=5, help="live snapshot passes at most")
+    parser.add_argument("--fps", type=float, default=60)
+    parser.add_argument("--save-every", type=float, default=1.0,
+                        help="seconds between the game's autosaves")
+    parser.add_argument("--save-files", type=int, default=40, help="files rewritten per autosave")
+    parser.add_argument("--baseline", type=float, default=3.0,
+                        help="seconds of frames measured without a snapshot")
+    parser.add_argument("--settle", type=float, default=0.5,
+                        help="seconds the game runs before and after each snapshot")
+    parser.add_argument("--copy-workers", type=int, default=0,
+                        help="threads of the plain snapshot (0 = automatic)")
+    parser.add_argument("--dir", default=None, help="where to create the test trees")
+    parser.add_argument("--out", default=None, help="JSON file (default: stdout)")
+    args = parser.parse_args()
+    if args.dir:
+        # mkdtemp() needs the parent to exist
+        os.makedirs(args.dir, exist_ok=True)
+    args.rate = args.rate if args.rate is not None else [0, 50, 20]
+
+    engine = CopyEngine(args.copy_workers or None)
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "python": platform.python_version(), "platform": platform.platform(),
+              "cpus": os.cpu_count(), "scale": args.scale, "fps": args.fps,
+              "save_every": args.save_every, "save_files": args.save_files,
+              "workers": args.workers, "shapes": {}}
+    # The store reports clone support on stdout; keep it off the JSON
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for shape in args.shape or ["late_game"]:
+            report["shapes"][shape] = bench_shape(args, shape, engine)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
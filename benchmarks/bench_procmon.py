@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# bench_procmon.py
+# Noita Savior - process detection benchmark
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Compare a full process table scan with the cached ProcessMonitor check.
+
+Without Noita running, pass --name with another process name (for example
+python.exe or python3) so the monitor has a PID to cache.
+
+Usage: python benchmarks/bench_procmon.py [--name noita.exe] [--rounds 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from procmon import ProcessMonitor, find_pid, psutil_available
+
+
+def measure(func, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--name", default="noita.exe")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    names = (args.name,)
+    monitor = ProcessMonitor(names)
+    monitor.refresh(force_scan=True)
+    print(f"psutil available: {psutil_available()}, process found: pid={monitor.pid}")
+
+    full = measure(lambda: find_pid(names), args.rounds)
+    cached = measure(monitor.is_running, args.rounds)
+    # With the background thread running, a missing Noita is answered from cache
+    monitor.start()
+    background = measure(monitor.is_running, args.rounds)
+    monitor.stop()
+    print(f"{'method':<22} {'median ms':>10} {'p95 ms':>10}")
+    print(f"{'full scan':<22} {full[0] * 1000:>10.3f} {full[1] * 1000:>10.3f}")
+    print(f"{'monitor.is_running':<22} {cached[0] * 1000:>10.3f} {cached[1] * 1000:>10.3f}")
+    print(f"{'  with monitor thread':<22} {background[0] * 1000:>10.3f} "
+          f"{background[1] * 1000:>10.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# bench_watch.py
+# Noita Savior - save watcher polling cost benchmark
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Measure the CPU cost of the auto-snapshot watcher on a synthetic save.
+
+Reports the CPU time of a normal tick (directory stats only) and of a
+deep tick (full rescan), and the resulting average CPU share at the
+default poll interval.
+
+Usage: python benchmarks/bench_watch.py [--shape late_game] [--scale 1.0]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from savewatch import DEEP_EVERY, POLL_SECONDS, TreeIndex
+from synth import SHAPES, generate
+
+
+def cpu_time(func, rounds):
+    start = time.thread_time()
+    for _ in range(rounds):
+        func()
+    return (time.thread_time() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--shape", choices=sorted(SHAPES), default="late_game")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--dir", default=None, help="where to create the test tree")
+    args = parser.parse_args()
+    if args.dir:
+        # mkdtemp() needs the parent to exist
+        os.makedirs(args.dir, exist_ok=True)
+
+    work = tempfile.mkdtemp(dir=args.dir)
+    try:
+        root = os.path.join(work, "save00")
+        generate(root, args.shape, args.scale)
+        index = TreeIndex(root)
+        files = sum(len(entries) for _mtime, entries in index.dirs.values())
+        shallow = cpu_time(index.refresh, args.rounds)
+        deep = cpu_time(lambda: index.refresh(deep=True), args.rounds)
+
+        # Sanity check: a new file is picked up by the next normal tick
+        open(os.path.join(root, "world", "new_chunk.png_petri"), 'wb').close()
+        detected = index.refresh() > 0
+
+        average = (shallow * (DEEP_EVERY - 1) + deep) / DEEP_EVERY
+        print(f"tree: {len(index.dirs)} dirs, {files} entries")
+        print(f"normal tick CPU: {shallow * 1000:.3f} ms")
+        print(f"deep tick CPU:   {deep * 1000:.3f} ms (every {DEEP_EVERY} ticks)")
+        print(f"average CPU at {POLL_SECONDS:.0f}s poll: {average / POLL_SECONDS * 100:.3f}%")
+        print(f"new file detected: {detected}")
+    finally:
+        shutil.rmtree(work)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# synth.py
+# Noita Savior - synthetic save folder generator for benchmarks
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Generate fake save00 trees shaped like real Noita saves.
+"""
+import os
+import random
+
+# name: (small files, small file size, large files, large file size, depth)
+SHAPES = {
+    "small_files": (4000, 8 * 1024, 0, 0, 1),
+    "large_files": (20, 8 * 1024, 8, 32 * 1024 * 1024, 1),
+    "deep_tree": (2000, 16 * 1024, 2, 8 * 1024 * 1024, 6),
+    "late_game": (6000, 24 * 1024, 4, 48 * 1024 * 1024, 2),
+}
+
+
+def _write(path, size, rng):
+    # Half random, half zero bytes roughly matches chunk data compressibility
+    half = size // 2
+    with open(path, 'wb') as f:
+        f.write(rng.getrandbits(half * 8).to_bytes(half, "little") if half else b"")
+        f.write(bytes(size - half))
+
+
+def generate(root, shape="late_game", scale=1.0, seed=0, files=None, large_mb=None):
+    """Create a synthetic save folder at root and return its total byte size
+
+    files and large_mb override the shape's small file count and large file
+    size before scaling.
+    """
+    small_count, small_size, large_count, large_size, depth = SHAPES[shape]
+    if files is not None:
+        small_count = files
+    if large_mb is not None:
+        large_size = int(large_mb * 1024 * 1024)
+    rng = random.Random(seed)
+    total = 0
+
+    world = os.path.join(root, "world")
+    os.makedirs(world, exist_ok=True)
+    for i in range(int(small_count * scale)):
+        sub = world
+        for level in range(1, depth):
+            sub = os.path.join(sub, f"d{level}_{(i >> (level * 3)) % 8}")
+        os.makedirs(sub, exist_ok=True)
+        size = rng.randint(small_size // 2, small_size * 3 // 2)
+        _write(os.path.join(sub, f"area_{i}.png_petri"), size, rng)
+        total += size
+    for i in range(int(large_count * max(scale, 1.0 / max(large_count, 1)))):
+        size = int(large_size * scale) or large_size
+        _write(os.path.join(world, f"world_{i}.bin"), size, rng)
+        total += size
+
+    for sub in ("persistent/flags", "stats/sessions"):
+        os.makedirs(os.path.join(root, *sub.split("/")), exist_ok=True)
+    for i in range(200):
+        open(os.path.join(root, "persistent", "flags", f"flag_{i}"), 'wb').close()
+    for name in ("player.xml", "world_state.xml", "session_numbers.salakieli"):
+        size = rng.randint(16 * 1024, 256 * 1024)
+        _write(os.path.join(root, name), size, rng)
+        total += size
+    return total
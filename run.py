@@ -2,6 +2,8 @@
 """
 Noita Savior - Save Manager for Noita Game
 Run this script to start the Noita save manager.
+With arguments (e.g. `python run.py list --json`) it runs the command line
+interface instead and never loads the window.
 """
 
 import sys
@@ -10,9 +12,12 @@ import os
 # Add src directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-# Import and run the main application
-from nsav import NoitaSaveManager
-
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        from cli import main
+        sys.exit(main())
+
+    # Import and run the main application
+    from nsav import NoitaSaveManager
     app = NoitaSaveManager()
     app.run()
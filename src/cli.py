@@ -0,0 +1,388 @@
+# cli.py
+# Noita Savior - command line interface
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Save, load and list slots without the window.
+
+    nsav list [--json] [--search TEXT] [--sort date|name|size|slot|playtime|gold|depth]
+    nsav new "Before the Tower"
+    nsav save 3
+    nsav save 3 --live
+    nsav load 3
+    nsav load 3 --only persistent --only "stats/*"
+    nsav delete 3 --yes
+    nsav rename 3 "After the Tower"
+    nsav diff 3 [--against 2] [--files]
+    nsav verify [SLOT ...] [--full]
+    nsav export 3 tower.nsavslot [--compression gz|xz|none] [--level 9]
+    nsav import tower.nsavslot [--name "Friend's Tower"]
+    nsav trash [--empty]
+    nsav gc
+    nsav shadow [--drop]
+    nsav metrics [--op load] [--json]
+    nsav profiles [--rescan] [--add ID PATH [--name NAME]] [--remove ID]
+    nsav --save-profile save01 save 3
+    nsav --profiler cprofile load 3
+
+Slot numbers start at 1 as in the window. Each save profile (see
+``nsav profiles``) has its own slot numbers; without --save-profile the
+default one (save00 of the regular game) is used. Diagnostics of the core go to
+stderr so that stdout only carries the result (e.g. the JSON listing).
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+# Commands that can move files into the trash; only these empty it on exit
+DISCARDING_COMMANDS = ("save", "new", "load", "delete", "import", "shadow")
+
+
+def _slot(value):
+    """argparse type for 1-based slot numbers"""
+    try:
+        slot = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a slot number: {value}")
+    if slot < 1:
+        raise argparse.ArgumentTypeError(f"slot numbers start at 1: {value}")
+    return slot
+
+
+def _profile(value):
+    """argparse type for save profile ids"""
+    from saveprofiles import PROFILE_ID
+
+    if not PROFILE_ID.fullmatch(value):
+        raise argparse.ArgumentTypeError(
+            f"profile ids are lower case letters, digits, - and _: {value}")
+    return value
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="nsav", description="Noita Savior save manager")
+    parser.add_argument("--save-dir", help="Noita save00 folder (default: auto-detect)")
+    parser.add_argument("--save-profile", type=_profile, default="default", metavar="ID",
+                        help="save profile whose slots to use (see the profiles command)")
+    parser.add_argument("--profiler", choices=("cprofile", "tracemalloc"),
+                        help="profile the operation; the report goes to backups/profiles")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    listing = commands.add_parser("list", help="show the slots")
+    listing.add_argument("--json", action="store_true", help="print the slots as JSON")
+    listing.add_argument("--search", default="", help="only slots whose name contains TEXT "
+                                                        "or whose run has that seed")
+    listing.add_argument("--sort", choices=("date", "name", "size", "slot", "playtime", "gold",
+                                            "depth"), default="slot")
+
+    new = commands.add_parser("new", help="save the live game into a new slot")
+    new.add_argument("name", nargs="?", default=None)
+    new.add_argument("--force", action="store_true",
+                     help="skip the check whether Noita is running")
+    new.add_argument("--live", action="store_true",
+                     help="save while Noita runs (throttled, re-copies files it changes)")
+
+    for name, text in (("save", "save the live game into a slot"),
+                       ("load", "replace the live game with a slot")):
+        command = commands.add_parser(name, help=text)
+        command.add_argument("slot", type=_slot)
+        command.add_argument("--force", action="store_true",
+                             help="skip the check whether Noita is running")
+        if name == "save":
+            command.add_argument("--live", action="store_true",
+                                 help="save while Noita runs (throttled, re-copies files "
+                                      "it changes)")
+        if name == "load":
+            command.add_argument("--only", action="append", metavar="PATTERN",
+                                 help="restore only this subtree, glob or preset "
+                                      "(persistent, world, stats); may be repeated")
+
+    delete = commands.add_parser("delete", help="delete a slot")
+    delete.add_argument("slot", type=_slot)
+    delete.add_argument("--yes", action="store_true", help="do not ask for confirmation")
+
+    rename = commands.add_parser("rename", help="rename a slot")
+    rename.add_argument("slot", type=_slot)
+    rename.add_argument("name")
+
+    diff = commands.add_parser("diff", help="show what loading a slot would change")
+    diff.add_argument("slot", type=_slot)
+    diff.add_argument("--against", type=_slot, help="compare with this slot, not the live save")
+    diff.add_argument("--files", action="store_true", help="list every changed file")
+
+    verify = commands.add_parser("verify", help="check slots against their saved hashes")
+    verify.add_argument("slots", type=_slot, nargs="*", help="slots to check (default: all)")
+    verify.add_argument("--full", action="store_true",
+                        help="hash everything, not only files changed since the last check")
+
+    export = commands.add_parser("export", help="write a slot to a single file")
+    export.add_argument("slot", type=_slot)
+    export.add_argument("path")
+    export.add_argument("--compression", choices=("gz", "xz", "none"), default="gz")
+    export.add_argument("--level", type=int, help="compression level (gz 1-9, xz 0-9)")
+
+    imported = commands.add_parser("import", help="add an exported slot as a new slot")
+    imported.add_argument("path")
+    imported.add_argument("--name", help="slot name (default: the exported one)")
+
+    metrics = commands.add_parser("metrics", help="average timings per operation and phase")
+    metrics.add_argument("--op", help="only this operation (save, load, backup, delete, ...)")
+    metrics.add_argument("--json", action="store_true", help="print the raw records as JSON")
+
+    shadow = commands.add_parser("shadow", help="sync the shadow mirror used for instant saves")
+    shadow.add_argument("--drop", action="store_true", help="delete the mirror instead")
+
+    profiles = commands.add_parser("profiles", help="list the known save folders")
+    profiles.add_argument("--rescan", action="store_true",
+                          help="look for save folders again instead of using the cached list")
+    profiles.add_argument("--add", nargs=2, metavar=("ID", "PATH"),
+                          help="add a save folder outside the usual places")
+    profiles.add_argument("--name", help="display name for --add")
+    profiles.add_argument("--remove", metavar="ID", help="forget a hand-added save folder")
+
+    trash = commands.add_parser("trash", help="show space still held by deleted data")
+    trash.add_argument("--empty", action="store_true", help="free it now")
+
+    commands.add_parser("gc", help="delete stored files no slot uses any more")
+    return parser
+
+
+def _print_slots(core, args):
+    from runsummary import describe
+
+    # Slots saved by older versions get their run details read once
+    core.refresh_run_summaries()
+    slots = []
+    for slot_num, data in core.query_slots(args.search, args.sort):
+        slot = {"slot": slot_num + 1, "name": data.get("name", ""),
+                "date": data.get("date", ""), "exists": data.get("exists", False)}
+        # Size, file count, manifest hash and timings as recorded at save time
+        slot.update((field, value) for field, value in data.items() if field not in slot)
+        slots.append(slot)
+    if args.json:
+        print(json.dumps(slots, indent=2))
+        return
+    for slot in slots:
+        size = f"{slot['size'] / 1048576:.1f} MB" if slot.get("size") is not None else ""
+        flag = "  DAMAGED" if slot.get("damaged_files") else ""
+        print(f"{slot['slot']:>4}  {slot['name']:<28} {slot['date']:<16} {size:>10}  "
+              f"{describe(slot.get('run') or {}, long=True)}{flag}")
+
+
+def _confirm(question):
+    try:
+        return input(f"{question} [y/N] ").strip().lower() in ("y", "yes")
+    except EOFError:
+        return False
+
+
+def run(args, out):
+    """Execute a parsed command; returns the process exit code"""
+    from core import SaveCore
+
+    core = SaveCore(save_path=args.save_dir, profile=args.save_profile)
+    if args.profiler:
+        core.metrics.profile_next(args.profiler)
+    try:
+        if args.command == "list":
+            with contextlib.redirect_stdout(out):
+                _print_slots(core, args)
+            return 0
+
+        if args.command == "diff":
+            for slot in (args.slot, args.against):
+                if slot is not None and not core.slot_exists(slot - 1):
+                    print(f"Slot {slot} is empty!", file=sys.stderr)
+                    return 1
+            against = args.against - 1 if args.against is not None else None
+            diff = core.diff_slot(args.slot - 1, against)
+            for group, info in sorted(diff.groups().items()):
+                print(f"{group:<16} {info['added']:>6} added {info['removed']:>6} removed "
+                      f"{info['modified']:>6} modified {info['bytes'] / 1048576:>+10.2f} MB",
+                      file=out)
+                if args.files:
+                    for status, rel, _old, _new in info["changes"]:
+                        print(f"    {status:<8} {rel}", file=out)
+            print(diff, file=out)
+            return 0
+
+        if args.command == "verify":
+            for slot in args.slots:
+                if not core.slot_exists(slot - 1):
+                    print(f"Slot {slot} is empty!", file=sys.stderr)
+                    return 1
+            slot_nums = [slot - 1 for slot in args.slots] or None
+            report = core.verify_slots(slot_nums, full=args.full)
+            for slot_num, rel, reason in report.problems:
+                print(f"Slot {slot_num + 1}: {rel or '(slot)'}: {reason}", file=out)
+            for slot_num in report.unverifiable:
+                print(f"Slot {slot_num + 1}: no recorded hashes (saved by an older version)",
+                      file=out)
+            print(f"{'OK' if report.ok else 'DAMAGED'}: {report}", file=out)
+            return 0 if report.ok else 2
+
+        if args.command == "export":
+            if not core.slot_exists(args.slot - 1):
+                print(f"Slot {args.slot} is empty!", file=sys.stderr)
+                return 1
+            stats = core.export_slot(args.slot - 1, args.path, args.compression, args.level)
+            print(f"Exported Slot {args.slot} to {args.path} ({stats})", file=out)
+            return 0
+
+        if args.command == "import":
+            slot_num, skipped = core.import_slot(args.path, args.name)
+            print(f"Imported {args.path} as Slot {slot_num + 1} "
+                  f"({skipped} files already stored)", file=out)
+            return 0
+
+        if args.command == "metrics":
+            from metrics import summarize
+
+            records = [record for record in core.metrics.read()
+                       if not args.op or record.get("op") == args.op]
+            if args.json:
+                print(json.dumps(records, indent=2), file=out)
+                return 0
+            for name, entry in sorted(summarize(records).items()):
+                failed = f", {entry['failed']} failed" if entry["failed"] else ""
+                print(f"{name}: {entry['count']} runs{failed}, "
+                      f"mean {entry['seconds'] * 1000:.1f} ms", file=out)
+                for phase_name, seconds in sorted(entry["phases"].items(),
+                                                  key=lambda item: -item[1]):
+                    print(f"    {phase_name:<16} {seconds * 1000:>10.1f} ms", file=out)
+            return 0
+
+        if args.command == "profiles":
+            if args.add:
+                core.save_profiles.add(args.add[0], args.add[1], args.name)
+            if args.remove:
+                try:
+                    core.save_profiles.remove(args.remove)
+                except KeyError:
+                    print(f"Unknown save profile: {args.remove}", file=sys.stderr)
+                    return 1
+            for profile, entry in core.list_profiles(rescan=args.rescan):
+                state = "" if os.path.isdir(entry["path"]) else "  (missing)"
+                added = "  (added)" if entry.get("added") else ""
+                print(f"{profile:<16} {entry['name']:<20} {entry['path']}{added}{state}",
+                      file=out)
+            return 0
+
+        if args.command == "gc":
+            freed = core.store.gc()
+            print(f"Freed {freed / 1048576:.1f} MB of unused store files", file=out)
+            return 0
+
+        if args.command == "trash":
+            if args.empty:
+                core.trash.empty()
+            # Sizes of entries left by an earlier run are only known once measured
+            core.trash.measure_pending()
+            print(f"{core.trash.pending_count()} entries, "
+                  f"{core.trash.pending_bytes() / 1048576:.1f} MB awaiting cleanup", file=out)
+            return 0
+
+        if args.command == "shadow" and args.drop:
+            core.drop_shadow()
+            print("Shadow mirror deleted", file=out)
+            return 0
+
+        slot_num = args.slot - 1 if args.command not in ("new", "shadow") else None
+
+        if args.command == "rename":
+            if not core.slot_exists(slot_num):
+                print(f"Slot {args.slot} is empty!", file=sys.stderr)
+                return 1
+            core.rename_slot(slot_num, args.name)
+            print(f"Slot {args.slot} renamed to \"{args.name}\"", file=out)
+            return 0
+
+        if args.command == "delete":
+            if not core.slot_exists(slot_num):
+                print(f"Slot {args.slot} is already empty!", file=sys.stderr)
+                return 1
+            if not args.yes and not _confirm(f"Delete Slot {args.slot}?"):
+                return 1
+            core.delete_slot(slot_num)
+            print(f"Deleted Slot {args.slot}", file=out)
+            return 0
+
+        if not core.noita_folder_exists:
+            print("Noita save folder not found!", file=sys.stderr)
+            return 1
+        if args.command == "shadow":
+            # Allowed while Noita runs: the mirror is then synced as a live
+            # snapshot, and it is only read from, never loaded
+            stats = core.sync_shadow()
+            print(f"Shadow mirror synced ({stats})", file=out)
+            return 0
+        saving = args.command in ("save", "new")
+        running = not args.force and core.is_noita_running()
+        # While Noita runs, saves can still go ahead as live snapshots
+        live = saving and (args.live or (running and core.settings["live_snapshot"]))
+        if running and not live:
+            hint = "pass --live to save while it runs" if saving else "pass --force"
+            print(f"Cannot {args.command} while Noita is running! "
+                  f"Close Noita first or {hint}.", file=sys.stderr)
+            return 1
+
+        if saving:
+            if slot_num is None:
+                slot_num = core.new_slot(args.name)
+            stats = core.save_slot(slot_num, live=live)
+            print(f"Saved to Slot {slot_num + 1} ({stats})", file=out)
+        else:
+            if not core.slot_exists(slot_num):
+                print(f"Slot {args.slot} is empty!", file=sys.stderr)
+                return 1
+            if args.only:
+                stats = core.restore_partial(slot_num, args.only)
+            else:
+                stats = core.load_slot(slot_num)
+            # No background thread here: the process ends right after
+            core.retention.run()
+            if args.only:
+                print(f"Loaded {', '.join(args.only)} of Slot {args.slot} "
+                      f"({stats}, replaced files backed up)", file=out)
+            else:
+                print(f"Loaded Slot {args.slot} ({stats}, auto-backup created)", file=out)
+        return 0
+    finally:
+        if args.command in DISCARDING_COMMANDS:
+            # There is no background reaper in a one-shot process: reclaim
+            # what this run (or an earlier one) moved into the trash
+            try:
+                core.trash.empty()
+            except OSError as e:
+                # Left for the next run; the command itself succeeded
+                print(f"Could not empty the trash: {e}", file=sys.stderr)
+        core.close()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    out = sys.stdout
+    # Keep stdout for results; the core's progress chatter goes to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            return run(args, out)
+        except Exception as e:
+            print(f"{args.command} failed: {e}", file=sys.stderr)
+            return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
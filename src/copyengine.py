@@ -0,0 +1,142 @@
+# copyengine.py
+# Noita Savior - parallel file copy engine
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Thread pool based copy engine.
+
+A Noita save holds thousands of small chunk files. Copying them one by
+one keeps only a single request in flight, so the engine spreads the work
+over a pool of threads. Small files are grouped into batches so the pool
+overhead stays negligible, large files get a task of their own.
+"""
+import os
+import shutil
+import threading
+import time
+
+DEFAULT_WORKERS = min(16, (os.cpu_count() or 4) * 2)
+SMALL_FILE_SIZE = 256 * 1024
+BATCH_BYTES = 4 * 1024 * 1024
+BATCH_FILES = 64
+
+
+class CopyStats:
+    """Counters describing a finished copy"""
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    @property
+    def throughput(self):
+        """Bytes per second"""
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self):
+        mb = self.bytes / (1024 * 1024)
+        return (f"{self.files} files, {mb:.1f} MB in {self.seconds:.2f}s "
+                f"({self.throughput / (1024 * 1024):.1f} MB/s)")
+
+
+class CopyEngine:
+    """Run many small file operations concurrently on a thread pool"""
+
+    def __init__(self, workers=None):
+        self.workers = workers or DEFAULT_WORKERS
+
+    def run(self, tasks, progress=None):
+        """Execute tasks and return (results in task order, CopyStats).
+
+        tasks is a list of (func, args, size) tuples; size is the number of
+        bytes the task moves and is used for batching and progress reports.
+        progress, if given, is called from worker threads as
+        progress(files_done, bytes_done, total_files, total_bytes); an
+        exception raised by it aborts the run.
+        """
+        stats = CopyStats()
+        results = [None] * len(tasks)
+        total_bytes = sum(size for _func, _args, size in tasks)
+        lock = threading.Lock()
+        start = time.perf_counter()
+
+        def run_batch(batch):
+            for index in batch:
+                func, args, size = tasks[index]
+                results[index] = func(*args)
+                with lock:
+                    stats.files += 1
+                    stats.bytes += size
+                    if progress:
+                        progress(stats.files, stats.bytes, len(tasks), total_bytes)
+
+        if tasks:
+            # Imported here: concurrent.futures pulls in logging and slows startup
+            from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(run_batch, batch)
+                           for batch in self._batches(tasks)]
+                done, _pending = wait(futures, return_when=FIRST_EXCEPTION)
+                for future in futures:
+                    if future in done and future.exception():
+                        for other in futures:
+                            other.cancel()
+                        raise future.exception()
+                for future in futures:
+                    future.result()
+
+        stats.seconds = time.perf_counter() - start
+        return results, stats
+
+    def _batches(self, tasks):
+        batch = []
+        batch_bytes = 0
+        for index, (_func, _args, size) in enumerate(tasks):
+            if size >= SMALL_FILE_SIZE:
+                yield [index]
+                continue
+            batch.append(index)
+            batch_bytes += size
+            if len(batch) >= BATCH_FILES or batch_bytes >= BATCH_BYTES:
+                yield batch
+                batch = []
+                batch_bytes = 0
+        if batch:
+            yield batch
+
+    def copy_files(self, pairs, progress=None):
+        """Copy (src, dst, size) triples with metadata; destination folders must exist"""
+        _results, stats = self.run(
+            [(shutil.copy2, (src, dst), size) for src, dst, size in pairs], progress)
+        return stats
+
+    def copy_tree(self, src, dst, progress=None):
+        """Parallel replacement for shutil.copytree; dst must not exist"""
+        pairs = []
+        os.makedirs(dst)
+        stack = [(src, dst)]
+        while stack:
+            src_dir, dst_dir = stack.pop()
+            with os.scandir(src_dir) as it:
+                for entry in it:
+                    target = os.path.join(dst_dir, entry.name)
+                    if entry.is_dir(follow_symlinks=False):
+                        os.mkdir(target)
+                        stack.append((entry.path, target))
+                    else:
+                        pairs.append((entry.path, target,
+                                      entry.stat(follow_symlinks=False).st_size))
+        return self.copy_files(pairs, progress)
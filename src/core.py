@@ -0,0 +1,1039 @@
+# core.py
+# Noita Savior - GUI-free save management core
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Everything Noita Savior does to save folders, without any user interface.
+
+SaveCore is shared by the Tk window (nsav.py) and the command line
+(cli.py). It never imports tkinter, and modules that are only needed by
+some operations (compression, process detection, the save watcher) are
+imported on first use so scripted calls start quickly.
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+from copyengine import CopyEngine
+from metrics import MetricsLog, phase
+from objstore import ObjectStore, hash_file, scan_tree
+from savediff import diff_indexes
+from saveprofiles import DEFAULT_PROFILE, PROFILE_ID, SaveProfiles
+from slotmeta import SlotIndex
+from trash import Trash
+from snapclone import DEFAULT_LINK_PATTERNS
+
+# Use proper paths that work both in development and as executable
+if getattr(sys, 'frozen', False):
+    # Running as executable
+    BASE_DIR = os.path.dirname(sys.executable)
+else:
+    # Running as script
+    BASE_DIR = os.path.dirname(__file__)
+
+BACKUP_DIR = os.path.join(BASE_DIR, "backups")
+SLOTS_FILE = os.path.join(BASE_DIR, "slots.json")
+SETTINGS_FILE = os.path.join(BASE_DIR, "settings.json")
+
+# Sibling folders of the save folder used while swapping in a loaded slot
+STAGING_SUFFIX = ".nsav_staging"
+OLD_SUFFIX = ".nsav_old"
+
+# Store snapshot mirroring the live save while shadow_mirror is on
+SHADOW_SNAPSHOT = "shadow"
+
+# Slot record fields that describe the local copy and are not exported
+LOCAL_RECORD_FIELDS = ("exists", "damaged_files", "format", "files", "size", "manifest",
+                       "save_seconds", "run", "run_manifest")
+
+# Defaults for settings.json; missing keys fall back to these
+DEFAULT_SETTINGS = {
+    "copy_workers": 0,  # 0 = pick automatically from the CPU count
+    "clone_files": True,  # reflink/hardlink files when the filesystem allows it
+    "hardlink_patterns": list(DEFAULT_LINK_PATTERNS),
+    "slot_format": "store",  # "store" (deduplicated) or "archive" (compressed)
+    # Store files of at least this many MB as content-defined chunks so a
+    # partly changed world file only adds the changed parts (0 = off)
+    "chunk_files_mb": 0,
+    "archive_codec": "zlib",  # "zlib" or "lzma"
+    "archive_level": None,  # None = codec default
+    # Retention of auto_backup_* folders (0 disables a limit)
+    "auto_backup_keep_last": 20,
+    "auto_backup_keep_hourly": 24,
+    "auto_backup_keep_daily": 14,
+    "auto_backup_max_mb": 0,
+    "job_workers": 2,  # save/load/delete operations that may run at once
+    # Snapshot the save folder automatically once Noita stopped writing it
+    "auto_snapshot": False,
+    "auto_snapshot_count": 5,  # rotating auto_snap_N snapshots kept in the store
+    "auto_snapshot_quiet_seconds": 10,
+    "auto_snapshot_poll_seconds": 2,
+    # Keep a hashed mirror of the live save in the store so saving a slot
+    # only has to check file sizes and dates
+    "shadow_mirror": False,
+    # Allow saving while Noita runs: a throttled copy on low-priority threads,
+    # repeated for files the game changed meanwhile (always kept in the store)
+    "live_snapshot": False,
+    "live_snapshot_mb_per_s": 20,  # read rate limit (0 = unlimited)
+    "live_snapshot_workers": 2,
+    "live_snapshot_rounds": 5,  # passes before giving up on a save that keeps changing
+    # Per-phase timings of every operation, appended to backups/metrics.jsonl
+    "metrics_log": True,
+    "metrics_max_kb": 1024,  # size at which the log is rotated
+    "metrics_keep": 3,  # rotated logs kept
+    # Profile one operation per run, e.g. "load:cprofile" or "tracemalloc" (any operation)
+    "profiler": "",
+}
+
+# Alternative save paths to check
+ALTERNATIVE_PATHS = [
+    os.path.expandvars(r"%AppData%\LocalLow\Nolla_Games_Noita\save00"),
+    os.path.expandvars(r"%USERPROFILE%\AppData\LocalLow\Nolla_Games_Noita\save00"),
+    os.path.expandvars(r"%LOCALAPPDATA%\..\LocalLow\Nolla_Games_Noita\save00"),
+    os.path.join(os.path.expanduser("~"), "AppData", "LocalLow", "Nolla_Games_Noita", "save00")
+]
+
+
+def load_settings():
+    """Load user settings from JSON file, falling back to defaults"""
+    settings = dict(DEFAULT_SETTINGS)
+    if os.path.exists(SETTINGS_FILE):
+        try:
+            with open(SETTINGS_FILE, 'r') as f:
+                user_settings = json.load(f)
+            # Called "profile" before save profiles took that name
+            if "profile" in user_settings:
+                user_settings.setdefault("profiler", user_settings.pop("profile"))
+            settings.update(user_settings)
+        except (OSError, ValueError) as e:
+            print(f"Error loading settings, using defaults: {e}")
+    return settings
+
+
+def finish_interrupted_load(save_path):
+    """Repair a save folder left behind by a load that was interrupted mid-swap"""
+    staging_path = save_path + STAGING_SUFFIX
+    old_path = save_path + OLD_SUFFIX
+    try:
+        # The staging copy is only complete once the live save was moved away
+        if os.path.exists(staging_path):
+            if os.path.exists(save_path):
+                shutil.rmtree(staging_path)
+            else:
+                os.rename(staging_path, save_path)
+                print(f"Completed interrupted load into: {save_path}")
+        if os.path.exists(old_path) and os.path.exists(save_path):
+            shutil.rmtree(old_path)
+    except OSError as e:
+        print(f"Error repairing interrupted load at {save_path}: {e}")
+
+
+def noita_roots():
+    """LocalLow folders that may hold Nolla_Games_Noita* game folders"""
+    roots = []
+    for path in ALTERNATIVE_PATHS:
+        root = os.path.normpath(os.path.dirname(os.path.dirname(path)))
+        if root not in roots:
+            roots.append(root)
+    return roots
+
+
+def find_noita_save_folder():
+    """Find the correct Noita save folder by checking multiple possible paths"""
+    for path in ALTERNATIVE_PATHS:
+        finish_interrupted_load(path)
+        if os.path.exists(path):
+            print(f"Found Noita save folder at: {path}")
+            return path
+
+    # If not found, print debug information
+    print("Noita save folder not found. Checked paths:")
+    for i, path in enumerate(ALTERNATIVE_PATHS, 1):
+        print(f"  {i}. {path} - {'EXISTS' if os.path.exists(path) else 'NOT FOUND'}")
+
+    # Check if the parent directory exists
+    parent_dir = os.path.dirname(ALTERNATIVE_PATHS[0])
+    if os.path.exists(parent_dir):
+        print(f"Parent directory exists: {parent_dir}")
+        print("Contents:")
+        try:
+            for item in os.listdir(parent_dir):
+                print(f"  - {item}")
+        except Exception as e:
+            print(f"  Error listing contents: {e}")
+    else:
+        print(f"Parent directory does not exist: {parent_dir}")
+
+    return None
+
+
+class SaveCore:
+    """Slots, backups and metadata for one Noita save folder"""
+
+    def __init__(self, save_path=None, settings=None, base_dir=None,
+                 profile=DEFAULT_PROFILE, parent=None):
+        # Slots and backups live next to the program unless base_dir is given
+        if parent is not None:
+            base_dir = parent.base_dir
+        # The id names a folder and prefixes store names; nothing else may pass
+        if not PROFILE_ID.fullmatch(profile):
+            raise ValueError(f"Not a save profile id: {profile!r}")
+        self.base_dir = base_dir
+        self.root_dir = os.path.join(base_dir, "backups") if base_dir else BACKUP_DIR
+        # The default profile keeps the single-profile layout; others get a
+        # folder of their own for slots.json, archives and auto-backups
+        self.profile = profile
+        self.parent = parent
+        if profile == DEFAULT_PROFILE:
+            self.backup_dir = self.root_dir
+            self.slots_file = os.path.join(base_dir, "slots.json") if base_dir else SLOTS_FILE
+            self.snapshot_prefix = ""
+        else:
+            self.backup_dir = os.path.join(self.root_dir, "saves", profile)
+            self.slots_file = os.path.join(self.backup_dir, "slots.json")
+            # Store names of other profiles never start with "slot_"
+            self.snapshot_prefix = f"{profile}."
+
+        # Discovered save folders, cached next to slots.json
+        if parent is not None:
+            self.save_profiles = parent.save_profiles
+        else:
+            self.save_profiles = SaveProfiles(os.path.join(base_dir or BASE_DIR,
+                                                           "save_profiles.json"))
+
+        # Find the correct Noita save folder
+        if save_path:
+            save_path = os.path.abspath(save_path)
+            finish_interrupted_load(save_path)
+        else:
+            # Cached from an earlier scan; the folders are only probed if it is gone
+            save_path = self.save_profiles.resolve(profile, noita_roots(),
+                                                   prepare=finish_interrupted_load)
+            if save_path is None and profile == DEFAULT_PROFILE:
+                save_path = find_noita_save_folder()
+            elif save_path:
+                print(f"Found Noita save folder at: {save_path}")
+            elif not os.path.isdir(self.backup_dir):
+                # Slots of a profile whose folder is gone stay reachable
+                raise ValueError(f"Unknown save profile: {profile}")
+        self.noita_save_path = save_path
+        self.noita_folder_exists = (self.noita_save_path is not None and
+                                    os.path.exists(self.noita_save_path))
+
+        # Create backup directory if it doesn't exist
+        os.makedirs(self.backup_dir, exist_ok=True)
+
+        if parent is not None:
+            # Every profile shares one store, so a file kept by several
+            # profiles (or copied between them) is stored once
+            self.settings = parent.settings
+            self.trash = parent.trash
+            self.metrics = parent.metrics
+            self.engine = parent.engine
+            self.store = parent.store
+        else:
+            # Deleted folders are renamed into backups/.trash and removed later
+            self.trash = Trash(os.path.join(self.root_dir, ".trash"))
+
+            # Parallel copy engine and deduplicated snapshot store for the slots
+            self.settings = settings if settings is not None else load_settings()
+            self.metrics = MetricsLog(os.path.join(self.root_dir, "metrics.jsonl"),
+                                      enabled=self.settings["metrics_log"],
+                                      max_bytes=self.settings["metrics_max_kb"] * 1024,
+                                      keep=self.settings["metrics_keep"])
+            if self.settings["profiler"]:
+                operation, _sep, kind = self.settings["profiler"].rpartition(":")
+                self.metrics.profile_next(kind, operation or "*")
+            self.engine = CopyEngine(self.settings["copy_workers"] or None)
+            self.store = ObjectStore(os.path.join(self.root_dir, "store"), self.engine,
+                                     clone=self.settings["clone_files"],
+                                     link_patterns=self.settings["hardlink_patterns"],
+                                     trash=self.trash,
+                                     chunk_threshold=self.settings["chunk_files_mb"] * 1024 * 1024)
+
+        self._retention = None
+        # Per-slot file indexes for diffs, and hashes of live files read for them
+        self._file_indexes = {}
+        self._live_hashes = {}
+        self.process_monitor = None
+        self.save_watcher = None
+        self._profile_cores = {}
+
+        # Slot records live in a journaled index; reading it needs no stat calls
+        self.meta = SlotIndex(self.slots_file)
+        self.slots_data = self._prepare_slots()
+
+    def profile_core(self, profile):
+        """SaveCore of another save profile, sharing this core's store"""
+        if profile == self.profile:
+            return self
+        if self.parent is not None:
+            return self.parent.profile_core(profile)
+        if profile not in self._profile_cores:
+            self._profile_cores[profile] = SaveCore(settings=self.settings, profile=profile,
+                                                    parent=self)
+        return self._profile_cores[profile]
+
+    def list_profiles(self, rescan=False):
+        """Known save profiles as (id, {"name", "path", ...}), default first"""
+        if rescan:
+            self.save_profiles.rescan(noita_roots(), prepare=finish_interrupted_load)
+        return self.save_profiles.ordered()
+
+    def snapshot_name(self, slot_num):
+        """Store snapshot name of a slot in this profile"""
+        return f"{self.snapshot_prefix}slot_{slot_num}"
+
+    def slot_key(self, slot_num):
+        """Scheduler key of a slot; slots of different profiles never conflict"""
+        return f"slot:{self.profile}:{slot_num}"
+
+    @property
+    def save_key(self):
+        """Scheduler key of the live save folder (shared by profiles using the same one)"""
+        return f"save:{os.path.normcase(self.noita_save_path or '')}"
+
+    @property
+    def retention(self):
+        """Retention manager that evicts old auto-backups after a load"""
+        if self._retention is None:
+            from retention import RetentionManager, RetentionPolicy
+
+            self._retention = RetentionManager(self.backup_dir, RetentionPolicy(
+                keep_last=self.settings["auto_backup_keep_last"],
+                keep_hourly=self.settings["auto_backup_keep_hourly"],
+                keep_daily=self.settings["auto_backup_keep_daily"],
+                max_bytes=self.settings["auto_backup_max_mb"] * 1024 * 1024),
+                trash=self.trash)
+        return self._retention
+
+    # -- process and watcher ---------------------------------------------
+
+    def start_process_monitor(self, listener=None):
+        """Track the Noita process on a background thread"""
+        from procmon import ProcessMonitor
+
+        self.process_monitor = ProcessMonitor()
+        if listener:
+            self.process_monitor.add_listener(listener)
+        self.process_monitor.start()
+        return self.process_monitor
+
+    def is_noita_running(self):
+        """Check if Noita game process is currently running"""
+        if self.parent is not None:
+            # One game process, whichever profile asks
+            return self.parent.is_noita_running()
+        if self.process_monitor is None:
+            # One-shot callers (the CLI) do a single scan without a thread
+            from procmon import ProcessMonitor
+            self.process_monitor = ProcessMonitor()
+        # Re-checks only the cached PID; a full scan happens in the background
+        start = time.perf_counter()
+        running = self.process_monitor.is_running()
+        self.metrics.record("process_check", time.perf_counter() - start, running=running)
+        return running
+
+    def start_save_watcher(self, on_settled):
+        """Start the save watcher if auto-snapshots or the shadow mirror are enabled"""
+        if not ((self.settings["auto_snapshot"] or self.settings["shadow_mirror"])
+                and self.noita_folder_exists):
+            return None
+        from savewatch import SaveWatcher
+
+        self.save_watcher = SaveWatcher(
+            self.noita_save_path, on_settled,
+            poll_seconds=self.settings["auto_snapshot_poll_seconds"],
+            quiet_seconds=self.settings["auto_snapshot_quiet_seconds"])
+        self.save_watcher.start()
+        return self.save_watcher
+
+    def close(self):
+        """Stop the background threads owned by the core (and its other profiles)"""
+        for core in self._profile_cores.values():
+            core.close()
+        # Unfinished trash entries are picked up again by the next start
+        if self.parent is None:
+            self.trash.stop()
+        if self.process_monitor is not None:
+            self.process_monitor.stop()
+        if self.save_watcher is not None:
+            self.save_watcher.stop()
+
+    # -- slot metadata ---------------------------------------------------
+
+    def slot_archive_path(self, slot_num):
+        """Return the path of a slot's compressed archive"""
+        return os.path.join(self.backup_dir, f"slot_{slot_num}.nsa")
+
+    def slot_exists(self, slot_num):
+        """Check whether a slot holds a save in the store, an archive or a legacy folder"""
+        return (self.store.has(self.snapshot_name(slot_num)) or
+                os.path.exists(self.slot_archive_path(slot_num)) or
+                os.path.isdir(os.path.join(self.backup_dir, f"slot_{slot_num}")))
+
+    def load_slots_data(self):
+        """(Re)load slot metadata from the journaled index"""
+        self.meta.load()
+        self.slots_data = self._prepare_slots()
+        return self.slots_data
+
+    def _prepare_slots(self):
+        """Check records from an older slots.json against the disk once"""
+        if self.meta.needs_reconcile:
+            # First start, or a slots.json written by an older version:
+            # look at what is really stored and journal the result
+            stored = self.stored_slot_ids()
+            for key in list(self.meta.slots):
+                if not key.isdigit() or int(key) not in stored:
+                    self.meta.remove(key)
+            for slot_num in sorted(stored):
+                record = self.meta.get(slot_num, {})
+                if not record.get("exists") or "name" not in record:
+                    self.meta.update(slot_num, name=record.get("name", f"Slot {slot_num + 1}"),
+                                     date=record.get("date", ""), exists=True)
+            self.meta.compact()
+        return self.meta.slots
+
+    def stored_slot_ids(self):
+        """Scan the backups for slots in any format (slow; used for migration)"""
+        ids = set()
+        prefix = self.snapshot_name("")
+        for name in self.store.names():
+            if name.startswith(prefix) and name[len(prefix):].isdigit():
+                ids.add(int(name[len(prefix):]))
+        for name in os.listdir(self.backup_dir):
+            if name.endswith(".nsa"):
+                name = name[:-4]
+            if name.startswith("slot_") and name[5:].isdigit():
+                ids.add(int(name[5:]))
+        return ids
+
+    def new_slot(self, name=None):
+        """Reserve an unused slot number; the slot counts as empty until saved"""
+        with self.meta.lock:
+            slot_num = max((int(key) for key in self.meta.slots if key.isdigit()),
+                           default=-1) + 1
+            # Claim the number right away so a second new slot gets another one
+            self.meta.slots[str(slot_num)] = {}
+        self.meta.update(slot_num, name=name or f"Slot {slot_num + 1}", date="", exists=False)
+        return slot_num
+
+    def query_slots(self, text="", sort="date", descending=None):
+        """Search and sort the saved slots by their recorded metadata"""
+        return [(int(slot), record) for slot, record in
+                self.meta.query(text, sort, descending)]
+
+    def slot_summary(self, slot_num):
+        """Return size, file count and manifest hash of a stored slot"""
+        archive_path = self.slot_archive_path(slot_num)
+        if self.store.has(self.snapshot_name(slot_num)):
+            files, size, digest = self.store.summary(self.snapshot_name(slot_num))
+            return {"format": "store", "files": files, "size": size, "manifest": digest}
+        if os.path.exists(archive_path):
+            from slotarchive import SlotArchive
+
+            archive = SlotArchive(archive_path)
+            listing = json.dumps(archive.files, sort_keys=True).encode()
+            return {"format": "archive", "files": len(archive.files),
+                    "size": sum(entry[1] for entry in archive.files.values()),
+                    "manifest": hashlib.sha256(listing).hexdigest()}
+        return {"format": "folder", "files": None, "size": None, "manifest": None}
+
+    def _content_fields(self, slot_num):
+        """Record fields describing what a freshly stored slot contains"""
+        fields = self.slot_summary(slot_num)
+        fields["run"] = self._parse_run(slot_num)
+        fields["run_manifest"] = fields["manifest"]
+        return fields
+
+    def _slot_reader(self, slot_num):
+        """Return (relative paths, open_file(rel)) over the files of a stored slot"""
+        manifest = self.store.read_manifest(self.snapshot_name(slot_num))
+        if manifest is not None:
+            files = manifest["files"]
+            return list(files), lambda rel: self.store.open_object(files[rel][0])
+        archive_path = self.slot_archive_path(slot_num)
+        if os.path.exists(archive_path):
+            from slotarchive import SlotArchive
+
+            archive = SlotArchive(archive_path)
+            return list(archive.files), lambda rel: io.BytesIO(archive.read_file(rel))
+        slot_dir = os.path.join(self.backup_dir, f"slot_{slot_num}")
+        if not os.path.isdir(slot_dir):
+            raise FileNotFoundError(f"Slot {slot_num + 1} is empty")
+        files, _dirs = scan_tree(slot_dir)
+        return list(files), lambda rel: open(os.path.join(slot_dir, *rel.split("/")), 'rb')
+
+    def _parse_run(self, slot_num):
+        from runsummary import extract
+
+        with phase("summary"):
+            rels, open_file = self._slot_reader(slot_num)
+            return extract(rels, open_file)
+
+    def run_summary(self, slot_num):
+        """Return the run details (gold, depth, playtime, seed, ...) of a slot.
+
+        They are parsed when the slot is saved and kept in its record; the
+        slot's files are only read again if its manifest has changed since.
+        """
+        record = self.meta.get(slot_num, {})
+        if "run" in record and record.get("run_manifest") == record.get("manifest"):
+            return record["run"]
+        run = self._parse_run(slot_num)
+        self.meta.update(slot_num, run=run, run_manifest=record.get("manifest"))
+        return run
+
+    def refresh_run_summaries(self):
+        """Fill in run details of slots saved by older versions; returns how many"""
+        updated = 0
+        for slot_num, record in self.query_slots(sort="slot"):
+            if "run" in record and record.get("run_manifest") == record.get("manifest"):
+                continue
+            try:
+                self.run_summary(slot_num)
+                updated += 1
+            except Exception as e:
+                print(f"Cannot read run details of slot {slot_num + 1}: {e}")
+        return updated
+
+    def rename_slot(self, slot_num, new_name):
+        """Give a slot a new display name"""
+        self.meta.update(slot_num, name=new_name)
+
+    # -- file operations -------------------------------------------------
+
+    def _new_backup_path(self):
+        """Return (timestamp, unused auto_backup_* path)"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        backup_path = os.path.join(self.backup_dir, f"auto_backup_{timestamp}")
+        suffix = 1
+        while os.path.exists(backup_path):
+            backup_path = os.path.join(self.backup_dir, f"auto_backup_{timestamp}_{suffix}")
+            suffix += 1
+        return timestamp, backup_path
+
+    def backup_current_save(self, move=False, progress=None):
+        """Backup the current save folder
+
+        With move=True the save folder is renamed into the backup folder
+        instead of copied, which is instant but leaves no live save behind.
+        If the backups live on another drive it is copied as usual.
+        """
+        if not self.noita_folder_exists or not self.noita_save_path:
+            return False, "Noita save folder not found"
+
+        with self.metrics.operation("backup", move=move):
+            try:
+                timestamp, backup_path = self._new_backup_path()
+                if move:
+                    try:
+                        with phase("move"):
+                            os.rename(self.noita_save_path, backup_path)
+                        return True, f"Auto-backup created: {timestamp}"
+                    except OSError as e:
+                        print(f"Cannot move save into backups ({e}), copying instead")
+                with phase("copy") as copy:
+                    stats = self.engine.copy_tree(self.noita_save_path, backup_path, progress)
+                    copy.add(stats=stats)
+                print(f"Auto-backup copied {stats}")
+                return True, f"Auto-backup created: {timestamp}"
+            except Exception as e:
+                return False, f"Backup failed: {e}"
+
+    def live_copy(self):
+        """LiveCopy for a snapshot taken while Noita runs, from the settings"""
+        from livesnap import LiveCopy
+
+        return LiveCopy(self.settings["live_snapshot_mb_per_s"],
+                        self.settings["live_snapshot_workers"],
+                        self.settings["live_snapshot_rounds"])
+
+    def save_slot(self, slot_num, progress=None, live=False):
+        """Copy the live save into a slot, record it and return the CopyStats.
+
+        live=True saves while Noita may be writing the save (see livesnap.py).
+        """
+        live = self.live_copy() if live else None
+        slot_format = "store" if live else self.settings["slot_format"]
+        with self.metrics.operation("save", slot=slot_num + 1, format=slot_format,
+                                    live=live is not None):
+            start = time.perf_counter()
+            legacy_dir = os.path.join(self.backup_dir, f"slot_{slot_num}")
+            archive_path = self.slot_archive_path(slot_num)
+
+            try:
+                if slot_format == "archive":
+                    from slotarchive import write_archive
+
+                    # Compress the save into a single archive file
+                    with phase("copy") as copy:
+                        stats = write_archive(self.noita_save_path, archive_path,
+                                              codec=self.settings["archive_codec"],
+                                              level=self.settings["archive_level"],
+                                              workers=self.engine.workers, progress=progress)
+                        copy.add(stats=stats)
+                    self.store.delete(self.snapshot_name(slot_num))
+                else:
+                    # Snapshot current save into the store; unchanged files are shared,
+                    # and with an up-to-date shadow mirror no file has to be read
+                    stats = self.store.snapshot(self.noita_save_path,
+                                                self.snapshot_name(slot_num),
+                                                progress=progress, base=self._shadow_base(),
+                                                live=live)
+                    with phase("delete"):
+                        self.trash.discard(archive_path)
+            except BaseException:
+                # A slot reserved by new_slot() stays empty; forget it again
+                if not self.meta.get(slot_num, {}).get("exists"):
+                    self.meta.remove(slot_num)
+                raise
+            print(f"Slot {slot_num + 1} saved, stored {stats}" +
+                  (f" (live: {live})" if live else ""))
+
+            # Drop the full copy left behind by older versions
+            with phase("delete"):
+                self.trash.discard(legacy_dir)
+
+            # Keep a user-defined name, default one otherwise
+            with phase("metadata"):
+                record = self.meta.get(slot_num, {})
+                self.meta.update(slot_num, name=record.get("name", f"Slot {slot_num + 1}"),
+                                 date=datetime.now().strftime("%Y-%m-%d %H:%M"),
+                                 saved_at=time.time(), exists=True, damaged_files=0,
+                                 save_seconds=round(time.perf_counter() - start, 3),
+                                 **self._content_fields(slot_num))
+            return stats
+
+    def load_slot(self, slot_num, progress=None, check_cancelled=None):
+        """Stage a slot next to the live save and swap it in; returns CopyStats.
+
+        check_cancelled, if given, is called once the slot is staged and may
+        raise to abort before the live save is touched.
+        """
+        with self.metrics.operation("load", slot=slot_num + 1):
+            start = time.perf_counter()
+            slot_dir = os.path.join(self.backup_dir, f"slot_{slot_num}")
+            staging_path = self.noita_save_path + STAGING_SUFFIX
+            old_path = self.noita_save_path + OLD_SUFFIX
+            try:
+                # Restore from slot into a staging folder next to the live save
+                with phase("delete"):
+                    self.trash.discard(staging_path)
+                archive_path = self.slot_archive_path(slot_num)
+                if self.store.has(self.snapshot_name(slot_num)):
+                    stats = self.store.restore(self.snapshot_name(slot_num), staging_path,
+                                               progress=progress)
+                elif os.path.exists(archive_path):
+                    from slotarchive import SlotArchive
+
+                    with phase("copy") as copy:
+                        stats = SlotArchive(archive_path).extract_to(
+                            staging_path, workers=self.engine.workers, progress=progress)
+                        copy.add(stats=stats)
+                else:
+                    with phase("copy") as copy:
+                        stats = self.engine.copy_tree(slot_dir, staging_path, progress=progress)
+                        copy.add(stats=stats)
+                print(f"Slot {slot_num + 1} staged, restored {stats}")
+                # Last point at which a cancel leaves the live save untouched
+                if check_cancelled:
+                    check_cancelled()
+            except BaseException:
+                self._discard_quietly(staging_path)
+                raise
+
+            # The live save is replaced anyway, so move it into the backups
+            success, message = self.backup_current_save(move=True)
+            if not success:
+                self._discard_quietly(staging_path)
+                raise RuntimeError(f"Auto-backup failed: {message}")
+
+            with phase("swap"):
+                # A copied backup leaves the live save in place; set it aside
+                if os.path.exists(self.noita_save_path):
+                    os.rename(self.noita_save_path, old_path)
+
+                # Swap the staged slot in and drop the old save
+                os.rename(staging_path, self.noita_save_path)
+            with phase("delete"):
+                self.trash.discard(old_path)
+            # Our own swap is not a save written by Noita
+            if self.save_watcher:
+                self.save_watcher.reset()
+            with phase("metadata"):
+                self.meta.update(slot_num, loaded_at=time.time(),
+                                 load_seconds=round(time.perf_counter() - start, 3))
+            return stats
+
+    def restore_partial(self, slot_num, patterns, progress=None, check_cancelled=None):
+        """Restore only the parts of a slot matching patterns; returns CopyStats.
+
+        patterns are subtrees, globs or preset names (see selection.py).
+        Within the selection the live save ends up as in the slot, live
+        files the slot does not have included; everything else is left
+        alone. Only files that differ from the slot are copied, and the live
+        files they replace are moved into an auto-backup first, so the I/O
+        is proportional to what actually changes.
+        """
+        from selection import compile_selection
+
+        select = compile_selection(patterns)
+        with self.metrics.operation("partial_load", slot=slot_num + 1,
+                                    patterns=select.patterns):
+            start = time.perf_counter()
+            with phase("scan"):
+                diff = self.diff_slot(slot_num)
+                restore = {rel for rel, *_sizes in diff.added + diff.modified if select(rel)}
+                replaced = [rel for rel, *_sizes in diff.modified + diff.removed
+                            if select(rel)]
+
+            slot_dir = os.path.join(self.backup_dir, f"slot_{slot_num}")
+            staging_path = self.noita_save_path + STAGING_SUFFIX
+            try:
+                with phase("delete"):
+                    self.trash.discard(staging_path)
+                archive_path = self.slot_archive_path(slot_num)
+                if self.store.has(self.snapshot_name(slot_num)):
+                    stats = self.store.restore(self.snapshot_name(slot_num), staging_path,
+                                               progress=progress, select=restore.__contains__)
+                elif os.path.exists(archive_path):
+                    from slotarchive import SlotArchive
+
+                    with phase("copy") as copy:
+                        stats = SlotArchive(archive_path).extract_to(
+                            staging_path, workers=self.engine.workers, progress=progress,
+                            select=restore.__contains__)
+                        copy.add(stats=stats)
+                else:
+                    with phase("copy") as copy:
+                        os.makedirs(staging_path, exist_ok=True)
+                        pairs = []
+                        for rel in restore:
+                            dst = os.path.join(staging_path, *rel.split("/"))
+                            os.makedirs(os.path.dirname(dst), exist_ok=True)
+                            pairs.append((os.path.join(slot_dir, *rel.split("/")), dst,
+                                          self.slot_file_index(slot_num)[rel][0]))
+                        stats = self.engine.copy_files(pairs, progress=progress)
+                        copy.add(stats=stats)
+                print(f"Slot {slot_num + 1} staged {', '.join(select.patterns)}, "
+                      f"restored {stats}")
+                if check_cancelled:
+                    check_cancelled()
+            except BaseException:
+                self._discard_quietly(staging_path)
+                raise
+
+            # Move the live files being replaced into a (partial) auto-backup
+            if replaced:
+                _timestamp, backup_path = self._new_backup_path()
+                with phase("backup"):
+                    os.makedirs(backup_path)
+                    for rel in replaced:
+                        dst = os.path.join(backup_path, *rel.split("/"))
+                        os.makedirs(os.path.dirname(dst), exist_ok=True)
+                        shutil.move(os.path.join(self.noita_save_path, *rel.split("/")), dst)
+                print(f"Moved {len(replaced)} replaced live files into {backup_path}")
+
+            with phase("swap"):
+                for rel in restore:
+                    dst = os.path.join(self.noita_save_path, *rel.split("/"))
+                    os.makedirs(os.path.dirname(dst), exist_ok=True)
+                    os.replace(os.path.join(staging_path, *rel.split("/")), dst)
+            with phase("delete"):
+                self.trash.discard(staging_path)
+            if self.save_watcher:
+                self.save_watcher.reset()
+            with phase("metadata"):
+                self.meta.update(slot_num, loaded_at=time.time(),
+                                 load_seconds=round(time.perf_counter() - start, 3))
+            return stats
+
+    def delete_slot(self, slot_num):
+        """Remove a slot in every format and forget its record"""
+        with self.metrics.operation("delete", slot=slot_num + 1):
+            slot_dir = os.path.join(self.backup_dir, f"slot_{slot_num}")
+            # Objects still used by other slots are kept by the store
+            self.store.delete(self.snapshot_name(slot_num))
+            with phase("delete"):
+                self.trash.discard(self.slot_archive_path(slot_num))
+                self.trash.discard(slot_dir)
+            with phase("metadata"):
+                self.meta.remove(slot_num)
+
+    def export_slot(self, slot_num, path, compression="gz", level=None, progress=None):
+        """Write a slot with its record to a single export file; returns CopyStats.
+
+        Objects are streamed from the store or archive into the file; files
+        shared by several paths are written once.
+        """
+        from slotexport import write_export
+
+        with self.metrics.operation("export", slot=slot_num + 1, compression=compression):
+            archive_path = self.slot_archive_path(slot_num)
+            manifest = self.store.read_manifest(self.snapshot_name(slot_num))
+            if manifest is not None:
+                files, dirs = manifest["files"], manifest["dirs"]
+                sizes = {digest: size for digest, size, _mtime in files.values()}
+                objects = ((digest, size, lambda digest=digest: self.store.open_object(digest))
+                           for digest, size in sizes.items())
+            elif os.path.exists(archive_path):
+                from slotarchive import SlotArchive
+
+                archive = SlotArchive(archive_path)
+                files = {rel: [digest, size, mtime_ns] for rel, (_offset, size, mtime_ns, digest)
+                         in archive.files.items()}
+                dirs = archive.dirs
+
+                def archive_objects():
+                    # write_export consumes each object before asking for the next
+                    seen = set()
+                    for _rel, (_offset, size, _mtime, digest), chunks in archive.iter_files(
+                            self.engine.workers):
+                        if digest not in seen:
+                            seen.add(digest)
+                            yield digest, size, lambda chunks=chunks: chunks
+                objects = archive_objects()
+            else:
+                slot_dir = os.path.join(self.backup_dir, f"slot_{slot_num}")
+                if not os.path.isdir(slot_dir):
+                    raise FileNotFoundError(f"Slot {slot_num + 1} is empty")
+                # Plain folders from older versions have to be hashed first
+                with phase("hash"):
+                    scanned, dirs = scan_tree(slot_dir)
+                    paths = {rel: os.path.join(slot_dir, *rel.split("/")) for rel in scanned}
+                    files = {rel: [hash_file(paths[rel]), st.st_size, st.st_mtime_ns]
+                             for rel, st in scanned.items()}
+                first = {}
+                for rel, (digest, size, _mtime) in files.items():
+                    first.setdefault(digest, (size, paths[rel]))
+                objects = ((digest, size, lambda path=path: open(path, 'rb'))
+                           for digest, (size, path) in first.items())
+
+            record = {key: value for key, value in self.meta.get(slot_num, {}).items()
+                      if key not in LOCAL_RECORD_FIELDS}
+            header = {"record": record, "manifest": {"files": files, "dirs": dirs}}
+            with phase("copy") as copy:
+                stats = write_export(path, header, objects, compression, level, progress)
+                copy.add(stats=stats)
+        print(f"Slot {slot_num + 1} exported to {path}, {stats}")
+        return stats
+
+    def import_slot(self, path, name=None, progress=None):
+        """Add an exported slot as a new slot in the store; returns (slot_num, skipped).
+
+        Objects the store already holds are not written again; skipped is
+        the number of them.
+        """
+        from slotexport import read_export
+
+        with self.metrics.operation("import"):
+            slot_num = self.new_slot(name)
+            pins = []
+            try:
+                with phase("copy") as copy:
+                    header, stats, skipped = read_export(
+                        path, self.store,
+                        lambda header: pins.extend(self.store.pin_manifest(header["manifest"])),
+                        progress)
+                    copy.add(stats=stats)
+                with phase("metadata"):
+                    self.store.import_snapshot(self.snapshot_name(slot_num),
+                                               header["manifest"], pins)
+            except BaseException:
+                if pins and not self.store.has(self.snapshot_name(slot_num)):
+                    self.store.release(pins)
+                self.meta.remove(slot_num)
+                raise
+            with phase("metadata"):
+                record = {key: value for key, value in header.get("record", {}).items()
+                          if key not in LOCAL_RECORD_FIELDS}
+                if name:
+                    record["name"] = name
+                record.setdefault("name", f"Slot {slot_num + 1}")
+                record.setdefault("date", datetime.now().strftime("%Y-%m-%d %H:%M"))
+                self.meta.update(slot_num, **record, exists=True, damaged_files=0,
+                                 **self._content_fields(slot_num))
+        print(f"Imported {path} as slot {slot_num + 1}, stored {stats}, "
+              f"{skipped} objects already present")
+        return slot_num, skipped
+
+    def verify_slots(self, slot_nums=None, full=False, progress=None):
+        """Check slots (default: all saved) against the hashes recorded at save time.
+
+        Files unchanged since their last successful check are skipped
+        unless full=True. Returns a VerifyReport labelled by slot number.
+        """
+        from verify import Verifier
+
+        if slot_nums is None:
+            slot_nums = [slot_num for slot_num, _record in self.query_slots(sort="slot")]
+        targets = []
+        for slot_num in slot_nums:
+            archive_path = self.slot_archive_path(slot_num)
+            if self.store.has(self.snapshot_name(slot_num)):
+                targets.append((slot_num, "store", self.snapshot_name(slot_num)))
+            elif os.path.exists(archive_path):
+                targets.append((slot_num, "archive", archive_path))
+            else:
+                # Plain folders from older versions have no recorded hashes
+                targets.append((slot_num, "folder", None))
+        verifier = Verifier(self.store, os.path.join(self.backup_dir, "verify_cache.json"),
+                            self.engine)
+        report = verifier.verify(targets, full=full, progress=progress)
+
+        damaged = {}
+        for slot_num, _rel, _reason in report.problems:
+            damaged[slot_num] = damaged.get(slot_num, 0) + 1
+        for slot_num in slot_nums:
+            # Only journal changes so checking hundreds of healthy slots writes nothing
+            if (slot_num not in report.unverifiable and
+                    self.meta.get(slot_num, {}).get("damaged_files", 0) != damaged.get(slot_num, 0)):
+                self.meta.update(slot_num, damaged_files=damaged.get(slot_num, 0))
+        return report
+
+    def slot_file_index(self, slot_num):
+        """Return {rel: (size, mtime_ns, sha256 or None)} of a saved slot.
+
+        Store manifests and archive indexes already hold the hashes; the
+        result is cached until the slot is saved again.
+        """
+        record = self.meta.get(slot_num, {})
+        key = (record.get("manifest"), record.get("saved_at"))
+        cached = self._file_indexes.get(slot_num)
+        if cached and cached[0] == key and key[0]:
+            return cached[1]
+        archive_path = self.slot_archive_path(slot_num)
+        manifest = self.store.read_manifest(self.snapshot_name(slot_num))
+        if manifest is not None:
+            index = {rel: (size, mtime_ns, digest)
+                     for rel, (digest, size, mtime_ns) in manifest["files"].items()}
+        elif os.path.exists(archive_path):
+            from slotarchive import SlotArchive
+
+            index = {rel: (size, mtime_ns, digest) for rel, (_offset, size, mtime_ns, digest)
+                     in SlotArchive(archive_path).files.items()}
+        else:
+            slot_dir = os.path.join(self.backup_dir, f"slot_{slot_num}")
+            if not os.path.isdir(slot_dir):
+                raise FileNotFoundError(f"Slot {slot_num + 1} is empty")
+            files, _dirs = scan_tree(slot_dir)
+            index = {rel: (st.st_size, st.st_mtime_ns, None) for rel, st in files.items()}
+        self._file_indexes[slot_num] = (key, index)
+        return index
+
+    def live_file_index(self):
+        """Return {rel: (size, mtime_ns, sha256 or None)} of the live save"""
+        files, _dirs = scan_tree(self.noita_save_path)
+        index = {}
+        for rel, st in files.items():
+            known = self._live_hashes.get(rel)
+            digest = known[2] if known and known[:2] == (st.st_size, st.st_mtime_ns) else None
+            index[rel] = (st.st_size, st.st_mtime_ns, digest)
+        return index
+
+    def _hash_live(self, rel):
+        path = os.path.join(self.noita_save_path, *rel.split("/"))
+        st = os.stat(path)
+        digest = hash_file(path)
+        self._live_hashes[rel] = (st.st_size, st.st_mtime_ns, digest)
+        return digest
+
+    def diff_slot(self, slot_num, against=None):
+        """Return the SaveDiff of going from `against` to a slot.
+
+        against is another slot number, or None for the live save, i.e.
+        what loading the slot would change.
+        """
+        new = self.slot_file_index(slot_num)
+        slot_dir = os.path.join(self.backup_dir, f"slot_{slot_num}")
+        hash_new = lambda rel: hash_file(os.path.join(slot_dir, *rel.split("/")))
+        if against is None:
+            if not self.noita_folder_exists:
+                raise FileNotFoundError("Noita save folder not found")
+            return diff_indexes(self.live_file_index(), new, self._hash_live, hash_new)
+        other_dir = os.path.join(self.backup_dir, f"slot_{against}")
+        return diff_indexes(self.slot_file_index(against), new,
+                            lambda rel: hash_file(os.path.join(other_dir, *rel.split("/"))),
+                            hash_new)
+
+    def _discard_quietly(self, path):
+        """Trash a leftover folder while already handling another error"""
+        try:
+            self.trash.discard(path)
+        except OSError as e:
+            print(f"Could not remove {path}: {e}")
+
+    def next_auto_snapshot_name(self):
+        """Pick the unused or oldest rotating auto-snapshot name"""
+        names = [f"{self.snapshot_prefix}auto_snap_{i}" for i in range(max(1, self.settings["auto_snapshot_count"]))]
+        for name in names:
+            if not self.store.has(name):
+                return name
+        return min(names, key=lambda name: os.path.getmtime(self.store.manifest_path(name)))
+
+    def auto_snapshot(self, progress=None):
+        """Snapshot the live save into the next rotating auto-snapshot"""
+        name = self.next_auto_snapshot_name()
+        # The watcher fires while Noita runs; copy gently then, if allowed to
+        live = (self.live_copy() if self.settings["live_snapshot"] and self.is_noita_running()
+                else None)
+        with self.metrics.operation("auto_snapshot", name=name, live=live is not None):
+            stats = self.store.snapshot(self.noita_save_path, name, progress=progress,
+                                        base=self._shadow_base(), live=live)
+        message = f"Auto-snapshot {name} stored {stats}"
+        if live:
+            message += f" (live: {live})"
+        if self.save_watcher:
+            message += f", watcher CPU {self.save_watcher.cpu_fraction() * 100:.2f}%"
+        print(message)
+        return name
+
+    # -- shadow mirror ---------------------------------------------------
+
+    @property
+    def shadow_name(self):
+        return self.snapshot_prefix + SHADOW_SNAPSHOT
+
+    def _shadow_base(self):
+        return self.shadow_name if self.settings["shadow_mirror"] else None
+
+    def sync_shadow(self, progress=None):
+        """Bring the shadow mirror up to date with the live save; returns CopyStats.
+
+        Meant to run in the background whenever Noita is closed or has
+        stopped writing, so that a later save_slot() finds every file
+        already hashed and stored and only commits a manifest. That save
+        reads no file data, but it still stats every file and writes a
+        manifest of all of them: its cost is O(files), not O(bytes).
+        While Noita runs the mirror is synced as a live snapshot: each file
+        is read once and hashed as it is copied, so a file rewritten
+        mid-sync cannot end up stored under the hash of its old contents.
+        """
+        live = self.live_copy() if self.is_noita_running() else None
+        with self.metrics.operation("shadow_sync", live=live is not None):
+            stats = self.store.snapshot(self.noita_save_path, self.shadow_name,
+                                        progress=progress, live=live)
+        print(f"Shadow mirror synced, stored {stats}" + (f" (live: {live})" if live else ""))
+        return stats
+
+    def drop_shadow(self):
+        """Delete the shadow mirror, freeing objects no slot uses"""
+        self.store.delete(self.shadow_name)
@@ -0,0 +1,148 @@
+# diffview.py
+# Noita Savior - panel showing what a slot would change
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Window listing the differences between a slot and the live save or
+another slot, grouped by top-level folder (world, persistent, ...).
+
+Files of a group are only inserted into the tree when the group is
+opened, so a diff touching thousands of world chunks opens instantly.
+Selected groups or files can be restored from the slot on their own.
+"""
+import tkinter as tk
+from tkinter import ttk
+
+from savediff import TOP_LEVEL
+
+LIVE_SAVE = "Live save"
+
+
+def format_bytes(count):
+    """Signed size for the diff columns"""
+    if count is None:
+        return ""
+    if abs(count) >= 1048576:
+        return f"{count / 1048576:+.1f} MB"
+    if abs(count) >= 1024:
+        return f"{count / 1024:+.1f} KB"
+    return f"{count:+d} B"
+
+
+class DiffPanel(tk.Toplevel):
+    """Shows a SaveDiff; choosing another base calls on_compare(choice).
+
+    on_restore(patterns), if given, restores the selected groups/files of
+    the slot into the live save.
+    """
+
+    def __init__(self, master, title, choices, on_compare, on_restore=None):
+        super().__init__(master)
+        self.title(title)
+        self.geometry("560x420")
+        self.on_compare = on_compare
+        self.on_restore = on_restore
+        self.groups = {}
+
+        top = ttk.Frame(self, padding=(10, 10, 10, 5))
+        top.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        ttk.Label(top, text="Compare with:").grid(row=0, column=0, padx=(0, 5))
+        self.base_var = tk.StringVar(value=choices[0])
+        base_box = ttk.Combobox(top, textvariable=self.base_var, state="readonly",
+                                values=choices, width=30)
+        base_box.grid(row=0, column=1, sticky=tk.W)
+        base_box.bind("<<ComboboxSelected>>", lambda event: self.on_compare(self.base_var.get()))
+        self.restore_button = ttk.Button(top, text="Restore Selected", state='disabled',
+                                         command=self._restore)
+        self.restore_button.grid(row=0, column=2, padx=(10, 0))
+        top.columnconfigure(1, weight=1)
+        self.summary_var = tk.StringVar(value="Comparing...")
+        ttk.Label(top, textvariable=self.summary_var).grid(row=1, column=0, columnspan=2,
+                                                            sticky=tk.W, pady=(5, 0))
+
+        frame = ttk.Frame(self, padding=(10, 0, 10, 10))
+        frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.tree = ttk.Treeview(frame, columns=("change", "bytes"), selectmode="extended")
+        self.tree.heading("#0", text="File")
+        self.tree.heading("change", text="Change")
+        self.tree.heading("bytes", text="Size change")
+        self.tree.column("change", width=140, stretch=False)
+        self.tree.column("bytes", width=90, anchor=tk.E, stretch=False)
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.tree.bind("<<TreeviewOpen>>", self._expand)
+        self.tree.bind("<<TreeviewSelect>>", lambda event: self._update_restore())
+
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+
+    def show(self, diff, caption):
+        """Replace the contents with a SaveDiff"""
+        self.tree.delete(*self.tree.get_children())
+        self.summary_var.set(f"{caption}: {diff}")
+        self.groups = diff.groups()
+        for group, info in sorted(self.groups.items()):
+            counts = ", ".join(f"{info[status]} {status}"
+                               for status in ("added", "removed", "modified") if info[status])
+            self.tree.insert("", tk.END, iid=group, text=group,
+                             values=(counts, format_bytes(info["bytes"])))
+            # Placeholder so the group can be opened; filled in by _expand
+            self.tree.insert(group, tk.END, text="...", tags=("placeholder",))
+
+        self._update_restore()
+
+    def show_error(self, message):
+        self.tree.delete(*self.tree.get_children())
+        self.summary_var.set(message)
+        self._update_restore()
+
+    def selected_patterns(self):
+        """Patterns for the selected groups and files"""
+        patterns = []
+        for item in self.tree.selection():
+            if item in self.groups:
+                if item == TOP_LEVEL:
+                    # Loose files in save00 have no folder to select as a whole
+                    patterns += [rel for _status, rel, _old, _new in self.groups[item]["changes"]]
+                else:
+                    patterns.append(item)
+            elif "placeholder" not in self.tree.item(item, "tags"):
+                patterns.append(self.tree.item(item, "text"))
+        return patterns
+
+    def _update_restore(self):
+        # Restoring only makes sense against the live save
+        usable = (self.on_restore is not None and self.base_var.get() == LIVE_SAVE
+                  and self.selected_patterns())
+        self.restore_button.config(state='normal' if usable else 'disabled')
+
+    def _restore(self):
+        patterns = self.selected_patterns()
+        if patterns:
+            self.on_restore(patterns)
+
+    def _expand(self, event):
+        group = self.tree.focus()
+        info = self.groups.get(group)
+        if info is None or info.get("expanded"):
+            return
+        info["expanded"] = True
+        self.tree.delete(*self.tree.get_children(group))
+        for status, rel, old, new in info["changes"]:
+            self.tree.insert(group, tk.END, text=rel,
+                             values=(status, format_bytes((new or 0) - (old or 0))))
@@ -0,0 +1,207 @@
+# jobs.py
+# Noita Savior - background job scheduler
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Run file operations on worker threads.
+
+Every job names the resources it touches ("slot:3", "save:<path>", ...).
+Jobs sharing a resource run one after another in submission order, jobs
+with disjoint resources run at the same time. Progress and completion
+callbacks are handed to a ``post`` function so a GUI can run them on its
+own thread.
+"""
+import itertools
+import threading
+import time
+
+PROGRESS_INTERVAL = 0.1
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once it has been cancelled"""
+
+
+class Job:
+    """A unit of work plus its progress counters"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, description, keys, func, on_progress=None, on_done=None):
+        self.id = next(self._ids)
+        self.description = description
+        self.keys = frozenset(keys)
+        self.func = func
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.cancel_event = threading.Event()
+        self.state = "pending"
+        self.started = None
+        self.files_done = 0
+        self.bytes_done = 0
+        self.total_files = 0
+        self.total_bytes = 0
+        self._last_report = 0.0
+        self._post = None
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """Ask the job to stop at its next progress report"""
+        self.cancel_event.set()
+
+    def check_cancelled(self):
+        """Raise JobCancelled if cancel() was called"""
+        if self.cancel_event.is_set():
+            raise JobCancelled(f"{self.description} cancelled")
+
+    def progress(self, files_done, bytes_done, total_files=0, total_bytes=0):
+        """Progress callback for the copy engine; also the cancellation point"""
+        self.check_cancelled()
+        self.files_done = files_done
+        self.bytes_done = bytes_done
+        self.total_files = total_files or self.total_files
+        self.total_bytes = total_bytes or self.total_bytes
+        now = time.monotonic()
+        if self.on_progress and now - self._last_report >= PROGRESS_INTERVAL:
+            self._last_report = now
+            self._post(self.on_progress, self)
+
+    def eta(self):
+        """Estimated seconds left, or None while unknown"""
+        if not self.started or not self.bytes_done or not self.total_bytes:
+            return None
+        elapsed = time.monotonic() - self.started
+        return elapsed * (self.total_bytes - self.bytes_done) / self.bytes_done
+
+    def describe_progress(self):
+        """Human readable progress line for a status bar"""
+        text = f"{self.description}: {self.files_done}/{self.total_files} files"
+        if self.total_bytes:
+            text += (f", {self.bytes_done / 1048576:.1f}/"
+                     f"{self.total_bytes / 1048576:.1f} MB")
+        eta = self.eta()
+        if eta is not None:
+            text += f", ETA {eta:.0f}s"
+        return text
+
+
+class JobScheduler:
+    """Worker pool that serializes jobs touching the same resource"""
+
+    def __init__(self, workers=4, post=None):
+        self.post = post or (lambda func, *args: func(*args))
+        self.condition = threading.Condition()
+        self.pending = []
+        self.running = []
+        self.busy_keys = set()
+        self.stopping = False
+        self.threads = [threading.Thread(target=self._worker, name=f"job-worker-{i}",
+                                         daemon=True)
+                        for i in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, description, keys, func, on_progress=None, on_done=None):
+        """Queue func(job) and return the Job.
+
+        on_done is posted as on_done(job, result, error) when the job ends;
+        error is None on success and a JobCancelled after cancellation.
+        """
+        job = Job(description, keys, func, on_progress, on_done)
+        job._post = self.post
+        with self.condition:
+            self.pending.append(job)
+            self.condition.notify_all()
+        return job
+
+    def busy(self):
+        """True while any job is queued or running"""
+        with self.condition:
+            return bool(self.pending or self.running)
+
+    def jobs(self):
+        """Snapshot of the running and queued jobs"""
+        with self.condition:
+            return list(self.running) + list(self.pending)
+
+    def cancel_all(self):
+        """Cancel every queued and running job"""
+        with self.condition:
+            for job in self.running + self.pending:
+                job.cancel()
+            self.condition.notify_all()
+
+    def shutdown(self, cancel=True):
+        """Stop the workers, optionally cancelling outstanding work first"""
+        if cancel:
+            self.cancel_all()
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
+
+    def _next_job(self):
+        # A job may start once no running job and no older queued job shares a key
+        blocked = set(self.busy_keys)
+        for job in self.pending:
+            if job.cancelled or not (job.keys & blocked):
+                return job
+            blocked |= job.keys
+        return None
+
+    def _worker(self):
+        while True:
+            with self.condition:
+                job = self._next_job()
+                while job is None:
+                    if self.stopping and not self.pending:
+                        return
+                    self.condition.wait()
+                    job = self._next_job()
+                self.pending.remove(job)
+                if not job.cancelled:
+                    self.running.append(job)
+                    self.busy_keys |= job.keys
+
+            if job.cancelled:
+                job.state = "cancelled"
+                self._finish(job, None, JobCancelled(f"{job.description} cancelled"))
+                continue
+
+            job.state = "running"
+            job.started = time.monotonic()
+            result = error = None
+            try:
+                job.check_cancelled()
+                result = job.func(job)
+            except Exception as e:
+                error = e
+            job.state = "cancelled" if isinstance(error, JobCancelled) else (
+                "failed" if error else "done")
+
+            with self.condition:
+                self.running.remove(job)
+                self.busy_keys -= job.keys
+                self.condition.notify_all()
+            self._finish(job, result, error)
+
+    def _finish(self, job, result, error):
+        if job.on_done:
+            self.post(job.on_done, job, result, error)
+        elif error and not isinstance(error, JobCancelled):
+            print(f"{job.description} failed: {error}")
@@ -0,0 +1,315 @@
+# metrics.py
+# Noita Savior - operation timings and profiling hooks
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Structured timings of save, load, backup and delete operations.
+
+An operation is opened by the core around a whole save, load, ...::
+
+    with metrics.operation("save", slot=3):
+        with phase("scan"):
+            ...
+
+phase() is a module function that attaches to whatever operation is open
+on the calling thread, so lower layers (the object store) can time their
+steps without being handed anything. Outside an operation it does
+nothing. Phases of the same name add up, a phase opened inside another
+one is recorded as "outer.inner", and an operation started inside
+another one (the backup made by a load) becomes a phase of it.
+
+Every finished operation becomes one line of a JSONL log that is rotated
+by size, e.g.::
+
+    {"op": "load", "seconds": 1.92, "ok": true, "phases": [
+        {"name": "copy", "seconds": 1.41, "files": 3012, "bytes": 231209872,
+         "mb_per_s": 156.4}, {"name": "backup", ...}, ...], "slot": 3}
+
+A profiler (cProfile or tracemalloc) can be armed for the next operation
+of a given kind; its report is written next to the log. cProfile only
+sees the thread that runs the operation, not the copy workers.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_KEEP = 3
+PROFILERS = ("cprofile", "tracemalloc")
+
+_current = threading.local()
+
+
+class Phase:
+    """Timing and counters of one step of an operation"""
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.files = 0
+        self.bytes = 0
+
+    def add(self, files=0, bytes=0, stats=None):
+        """Count work done in this phase, e.g. from a CopyStats"""
+        if stats is not None:
+            files += stats.files
+            bytes += stats.bytes
+        self.files += files
+        self.bytes += bytes
+
+    def as_dict(self):
+        data = {"name": self.name, "seconds": round(self.seconds, 4)}
+        if self.files:
+            data["files"] = self.files
+        if self.bytes:
+            data["bytes"] = self.bytes
+            if self.seconds > 0:
+                data["mb_per_s"] = round(self.bytes / 1048576 / self.seconds, 1)
+        return data
+
+
+class _NullPhase(Phase):
+    """Stand-in used when no operation is being measured"""
+
+    def add(self, files=0, bytes=0, stats=None):
+        pass
+
+
+class _PhaseTimer:
+    def __init__(self, operation, name):
+        self.operation = operation
+        self.name = name
+
+    def __enter__(self):
+        if self.operation is None:
+            return _NullPhase(self.name)
+        # A phase inside another one is recorded as "outer.inner"
+        stack = self.operation.stack
+        self.phase = self.operation.phase_named(".".join(stack + [self.name]))
+        stack.append(self.name)
+        self.start = time.perf_counter()
+        return self.phase
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.operation is not None:
+            self.phase.seconds += time.perf_counter() - self.start
+            self.operation.stack.pop()
+        return False
+
+
+def phase(name):
+    """Time a step of the operation running on this thread (if any)"""
+    return _PhaseTimer(getattr(_current, "operation", None), name)
+
+
+class Operation:
+    """One measured operation and its phases"""
+
+    def __init__(self, log, name, fields):
+        self.log = log
+        self.name = name
+        self.fields = fields
+        self.phases = {}
+        self.stack = []
+        self.profiler = None
+
+    def phase_named(self, name):
+        if name not in self.phases:
+            self.phases[name] = Phase(name)
+        return self.phases[name]
+
+    def __enter__(self):
+        self.parent = getattr(_current, "operation", None)
+        if self.parent is not None:
+            # Nested (e.g. the backup inside a load): time it as a phase of the outer one
+            self.timer = phase(self.name)
+            return self.timer.__enter__()
+        _current.operation = self
+        self.profiler = self.log.take_profiler(self.name)
+        if self.profiler:
+            self.profiler.start()
+        self.started = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.parent is not None:
+            return self.timer.__exit__(exc_type, exc, tb)
+        seconds = time.perf_counter() - self.start
+        _current.operation = None
+        record = {"op": self.name,
+                  "started": datetime.fromtimestamp(self.started).isoformat(
+                      timespec="milliseconds"),
+                  "seconds": round(seconds, 4),
+                  "ok": exc_type is None}
+        if exc_type is not None:
+            record["error"] = f"{exc_type.__name__}: {exc}"
+        record["phases"] = [item.as_dict() for item in self.phases.values()]
+        accounted = sum(item.seconds for item in self.phases.values() if "." not in item.name)
+        record["other_seconds"] = round(max(0.0, seconds - accounted), 4)
+        if self.profiler:
+            record["profile"] = self.profiler.stop(self.name)
+        record.update(self.fields)
+        self.log.write(record)
+        return False
+
+
+class _Profiler:
+    """Wraps one operation in cProfile or tracemalloc"""
+
+    def __init__(self, kind, directory):
+        self.kind = kind
+        self.directory = directory
+
+    def start(self):
+        if self.kind == "cprofile":
+            import cProfile
+
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            import tracemalloc
+
+            tracemalloc.start(25)
+
+    def stop(self, name):
+        """Stop profiling, write the report and return its path"""
+        os.makedirs(self.directory, exist_ok=True)
+        stem = os.path.join(self.directory,
+                            f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self.kind}")
+        if self.kind == "cprofile":
+            import pstats
+
+            self.profile.disable()
+            self.profile.dump_stats(f"{stem}.prof")
+            with open(f"{stem}.txt", 'w') as f:
+                pstats.Stats(self.profile, stream=f).sort_stats("cumulative").print_stats(40)
+        else:
+            import tracemalloc
+
+            snapshot = tracemalloc.take_snapshot()
+            _current_size, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(f"{stem}.txt", 'w') as f:
+                f.write(f"Peak traced memory: {peak / 1048576:.1f} MB\n\n")
+                for stat in snapshot.statistics("lineno")[:40]:
+                    f.write(f"{stat}\n")
+        return f"{stem}.txt"
+
+
+class MetricsLog:
+    """Appends operation records to a JSONL file rotated by size"""
+
+    def __init__(self, path, enabled=True, max_bytes=DEFAULT_MAX_BYTES, keep=DEFAULT_KEEP):
+        self.path = path
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.armed = {}  # operation name (or "*") -> profiler kind
+
+    def operation(self, name, **fields):
+        """Context manager measuring one operation; extra fields go into the record"""
+        return Operation(self, name, fields)
+
+    def record(self, name, seconds, **fields):
+        """Log a single measurement that is not part of an operation"""
+        self.write({"op": name, "started": datetime.now().isoformat(timespec="milliseconds"),
+                    "seconds": round(seconds, 4), **fields})
+
+    def profile_next(self, kind, name="*"):
+        """Profile the next operation called name (any operation for "*")"""
+        if kind not in PROFILERS:
+            raise ValueError(f"Unknown profiler: {kind} (choose from {', '.join(PROFILERS)})")
+        with self.lock:
+            self.armed[name] = kind
+
+    def take_profiler(self, name):
+        with self.lock:
+            kind = self.armed.pop(name, None) or self.armed.pop("*", None)
+        if kind is None:
+            return None
+        return _Profiler(kind, os.path.join(os.path.dirname(self.path), "profiles"))
+
+    def write(self, record):
+        if not self.enabled:
+            return
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self.lock:
+            try:
+                if os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    self._rotate()
+            except OSError:
+                pass
+            try:
+                with open(self.path, 'a') as f:
+                    f.write(line)
+            except OSError as e:
+                print(f"Cannot write metrics to {self.path}: {e}")
+
+    def _rotate(self):
+        # metrics.jsonl -> metrics.jsonl.1 -> ... -> metrics.jsonl.<keep> (dropped)
+        for number in range(self.keep - 1, 0, -1):
+            older = f"{self.path}.{number}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{number + 1}")
+        if self.keep > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def read(self):
+        """Return the logged records, oldest first, including rotated logs"""
+        records = []
+        paths = [f"{self.path}.{number}" for number in range(self.keep, 0, -1)] + [self.path]
+        for path in paths:
+            try:
+                with open(path, 'r') as f:
+                    for line in f:
+                        try:
+                            records.append(json.loads(line))
+                        except ValueError:
+                            continue
+            except OSError:
+                continue
+        return records
+
+
+def summarize(records):
+    """Average duration and phase breakdown per operation name.
+
+    Returns {op: {"count", "failed", "seconds", "phases": {name: seconds}}}
+    with mean seconds over the successful runs.
+    """
+    summary = {}
+    for record in records:
+        entry = summary.setdefault(record.get("op", "?"), {"count": 0, "failed": 0,
+                                                           "seconds": 0.0, "phases": {}})
+        if record.get("ok") is False:
+            entry["failed"] += 1
+            continue
+        entry["count"] += 1
+        entry["seconds"] += record.get("seconds", 0.0)
+        for item in record.get("phases", []):
+            entry["phases"][item["name"]] = entry["phases"].get(item["name"], 0.0) + item["seconds"]
+        if "other_seconds" in record:
+            entry["phases"]["other"] = entry["phases"].get("other", 0.0) + record["other_seconds"]
+    for entry in summary.values():
+        if entry["count"]:
+            entry["seconds"] /= entry["count"]
+            for name in entry["phases"]:
+                entry["phases"][name] /= entry["count"]
+    return summary
@@ -13,72 +13,32 @@
 # 
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
-import shutil
-import sys
-import tkinter as tk
-from tkinter import filedialog, messagebox, ttk, simpledialog, PhotoImage
 import os
-from datetime import datetime
-import json
-
-# Try to import psutil, with fallback if not available
-try:
-    import psutil
-    PSUTIL_AVAILABLE = True
-except ImportError:
-    PSUTIL_AVAILABLE = False
-    print("Warning: psutil not available. Game protection will be disabled.")
-
-# Constants
-NOITA_SAVE_PATH = os.path.expandvars(r"%AppData%\LocalLow\Nolla_Games_Noita\save00")
-
-# Use proper paths that work both in development and as executable
-if getattr(sys, 'frozen', False):
-    # Running as executable
-    BASE_DIR = os.path.dirname(sys.executable)
-else:
-    # Running as script
-    BASE_DIR = os.path.dirname(__file__)
-
-BACKUP_DIR = os.path.join(BASE_DIR, "backups")
-SLOTS_FILE = os.path.join(BASE_DIR, "slots.json")
-
-# Alternative save paths to check
-ALTERNATIVE_PATHS = [
-    os.path.expandvars(r"%AppData%\LocalLow\Nolla_Games_Noita\save00"),
-    os.path.expandvars(r"%USERPROFILE%\AppData\LocalLow\Nolla_Games_Noita\save00"),
-    os.path.expandvars(r"%LOCALAPPDATA%\..\LocalLow\Nolla_Games_Noita\save00"),
-    os.path.join(os.path.expanduser("~"), "AppData", "LocalLow", "Nolla_Games_Noita", "save00")
-]
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk, simpledialog
+import queue
 
-# Simple tooltip helper
-class ToolTip:
-    """Display a tooltip with the full slot name when hovering over a widget."""
-    def __init__(self, widget, text=""):
-        self.widget = widget
-        self.text = text
-        self.tipwindow = None
-        widget.bind("<Enter>", self.enter)
-        widget.bind("<Leave>", self.leave)
+from core import BASE_DIR, SHADOW_SNAPSHOT, SaveCore
+from jobs import JobScheduler
+from slotlist import VirtualSlotList
+from diffview import DiffPanel, LIVE_SAVE
+from procmon import psutil_available
+from runsummary import describe
+from slotexport import EXTENSION as EXPORT_EXTENSION
 
-    def enter(self, event=None):
-        if self.tipwindow or not self.text:
-            return
-        # Position the tooltip just below the widget
-        x = self.widget.winfo_rootx() + 20
-        y = self.widget.winfo_rooty() + self.widget.winfo_height() + 5
-        self.tipwindow = tw = tk.Toplevel(self.widget)
-        tw.wm_overrideredirect(True)
-        tw.wm_geometry(f"+{x}+{y}")
-        label = ttk.Label(tw, text=self.text, background="#ffffe0",
-                          relief='solid', borderwidth=1, padding=2)
-        label.pack()
+# How often the Tk thread picks up results from background jobs
+UI_POLL_MS = 50
 
-    def leave(self, event=None):
-        tw = self.tipwindow
-        self.tipwindow = None
-        if tw:
-            tw.destroy()
+# Sort menu entries -> (slot index sort order, descending)
+SORT_CHOICES = {
+    "Newest first": ("date", True),
+    "Oldest first": ("date", False),
+    "Name": ("name", False),
+    "Largest first": ("size", True),
+    "Longest run": ("playtime", True),
+    "Most gold": ("gold", True),
+    "Deepest": ("depth", True),
+}
 
 class NoitaSaveManager:
     def __init__(self):
@@ -89,24 +49,44 @@ class NoitaSaveManager:
         self.root.resizable(True, True)
         self.root.minsize(500, 400)
         
-        # Create backup directory if it doesn't exist
-        os.makedirs(BACKUP_DIR, exist_ok=True)
+        # Slots, store and backups live in the GUI-free core; other save
+        # profiles get cores of their own that share its store
+        self.root_core = SaveCore()
+        self.core = self.root_core
+        self.settings = self.core.settings
+        self.store = self.core.store
+        self.noita_save_path = self.core.noita_save_path
+        self.noita_folder_exists = self.core.noita_folder_exists
+        if self.noita_folder_exists:
+            # Detect reflink/hardlink support now rather than on the first save
+            self.store.probe(self.noita_save_path)
         
-        # Find the correct Noita save folder
-        self.noita_save_path = self.find_noita_save_folder()
-        self.noita_folder_exists = self.noita_save_path is not None
+        # Run file operations off the Tk thread; results come back via ui_queue
+        self.ui_queue = queue.Queue()
+        self.scheduler = JobScheduler(self.settings["job_workers"], post=self.post_to_ui)
         
-        # Load slot data
-        self.slots_data = self.load_slots_data()
-        self.slot_tooltips = []          # <-- new list to hold tooltip objects
-
-        # Store references to rename buttons
-        self.rename_buttons = []
+        # Track the Noita process in the background so checks are free
+        self.process_monitor = self.core.start_process_monitor(self.on_noita_state_changed)
+        if not psutil_available():
+            print("Warning: psutil not available. Falling back to slower process detection.")
+        
+        # Optional watcher taking rotating snapshots after Noita wrote its save
+        self.save_watcher = None
+        self.start_profile()
+        if not self.settings["shadow_mirror"]:
+            # Mirrors left from when the setting was on; release their files
+            for name in self.store.names():
+                if name.rpartition(".")[2] == SHADOW_SNAPSHOT:
+                    self.scheduler.submit("Dropping shadow mirror", (f"shadow:{name}",),
+                                          lambda job, name=name: self.store.delete(name))
+        
+        # Deleted slots and old folders are renamed away; free their space slowly
+        self.core.trash.start()
         
         # Debug: Print file paths
         print(f"Base directory: {BASE_DIR}")
-        print(f"Backup directory: {BACKUP_DIR}")
-        print(f"Slots file: {SLOTS_FILE}")
+        print(f"Backup directory: {self.core.backup_dir}")
+        print(f"Slots file: {self.core.slots_file}")
         
         self.setup_ui()
 
@@ -121,128 +101,69 @@ class NoitaSaveManager:
         
         # Set up cleanup on window close
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
-    
-    def find_noita_save_folder(self):
-        """Find the correct Noita save folder by checking multiple possible paths"""
-        for path in ALTERNATIVE_PATHS:
-            if os.path.exists(path):
-                print(f"Found Noita save folder at: {path}")
-                return path
-        
-        # If not found, print debug information
-        print("Noita save folder not found. Checked paths:")
-        for i, path in enumerate(ALTERNATIVE_PATHS, 1):
-            print(f"  {i}. {path} - {'EXISTS' if os.path.exists(path) else 'NOT FOUND'}")
-        
-        # Check if the parent directory exists
-        parent_dir = os.path.dirname(ALTERNATIVE_PATHS[0])
-        if os.path.exists(parent_dir):
-            print(f"Parent directory exists: {parent_dir}")
-            print("Contents:")
-            try:
-                for item in os.listdir(parent_dir):
-                    print(f"  - {item}")
-            except Exception as e:
-                print(f"  Error listing contents: {e}")
-        else:
-            print(f"Parent directory does not exist: {parent_dir}")
         
-        return None
+        # Start picking up results from background jobs
+        self.root.after(UI_POLL_MS, self.process_ui_queue)
     
     def is_noita_running(self):
         """Check if Noita game process is currently running"""
-        if not PSUTIL_AVAILABLE:
-            # Fallback: try using tasklist command on Windows
-            try:
-                import subprocess
-                result = subprocess.run(['tasklist', '/FI', 'IMAGENAME eq noita.exe'], 
-                                      capture_output=True, text=True, timeout=5)
-                return 'noita.exe' in result.stdout
-            except (subprocess.TimeoutExpired, subprocess.CalledProcessError, FileNotFoundError):
-                # If tasklist fails, assume game is not running to be safe
-                return False
-        
-        try:
-            for proc in psutil.process_iter(['pid', 'name']):
-                if proc.info['name'] and proc.info['name'].lower() == 'noita.exe':
-                    return True
-            return False
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            return False
-        
-    def load_slots_data(self):
-        """Load slot metadata from JSON file"""
-        if os.path.exists(SLOTS_FILE):
-            try:
-                with open(SLOTS_FILE, 'r') as f:
-                    data = json.load(f)
-                    # Update exists status based on actual backup folders
-                    for i in range(8):
-                        slot_dir = os.path.join(BACKUP_DIR, f"slot_{i}")
-                        if str(i) in data:
-                            data[str(i)]["exists"] = os.path.exists(slot_dir)
-                        else:
-                            data[str(i)] = {"name": f"Slot {i+1}", "date": "", "exists": os.path.exists(slot_dir)}
-                    return data
-            except:
-                pass
-        
-        # Initialize with actual folder status
-        data = {}
-        for i in range(8):
-            slot_dir = os.path.join(BACKUP_DIR, f"slot_{i}")
-            exists = os.path.exists(slot_dir)
-            data[str(i)] = {
-                "name": f"Slot {i+1}", 
-                "date": "", 
-                "exists": exists
-            }
-            # If folder exists but no metadata, try to get creation date
-            if exists and not data[str(i)]["date"]:
-                try:
-                    timestamp = os.path.getctime(slot_dir)
-                    data[str(i)]["date"] = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
-                except:
-                    data[str(i)]["date"] = "Unknown date"
-        return data
-    
-    def save_slots_data(self):
-        """Save slot metadata to JSON file"""
-        try:
-            # Ensure the directory exists
-            os.makedirs(os.path.dirname(SLOTS_FILE), exist_ok=True)
-            
-            with open(SLOTS_FILE, 'w') as f:
-                json.dump(self.slots_data, f, indent=2)
-            
-            print(f"Slot data saved to: {SLOTS_FILE}")
-            return True
-        except Exception as e:
-            print(f"Error saving slot data: {e}")
-            self.update_status(f"Error saving slot data: {e}")
-            return False
-    
-    def backup_current_save(self):
-        """Backup the current save folder"""
-        if not self.noita_folder_exists or not self.noita_save_path:
-            return False, "Noita save folder not found"
+        return self.core.is_noita_running()
+    
+    def on_noita_state_changed(self, running):
+        """Monitor thread callback; refresh the status bar on the Tk thread"""
+        self.post_to_ui(self.update_initial_status)
+        if not running and self.settings["shadow_mirror"]:
+            # Noita has just written its final save; mirror it before the next quicksave
+            self.post_to_ui(self.sync_shadow)
         
-        try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_path = os.path.join(BACKUP_DIR, f"auto_backup_{timestamp}")
-            shutil.copytree(self.noita_save_path, backup_path)
-            return True, f"Auto-backup created: {timestamp}"
-        except Exception as e:
-            return False, f"Backup failed: {e}"
-    
-    def save_to_slot(self, slot_num):
-        """Save current game state to specified slot"""
+    def start_profile(self):
+        """Start the background work of the shown save profile"""
+        core = self.core
+        # Only the shown profile is watched; Noita writes one save at a time
+        if self.save_watcher is not None:
+            self.save_watcher.stop()
+        self.save_watcher = core.start_save_watcher(self.on_save_settled)
+        self.sync_shadow(core)
+        # Slots saved by older versions get their run details read once
+        self.scheduler.submit("Reading run details", (f"run_summaries:{core.profile}",),
+                              lambda job: core.refresh_run_summaries(),
+                              on_done=lambda job, updated, error:
+                              self._run_summaries_done(core, updated))
+    
+    def switch_profile(self, profile):
+        """Show the slots of another save profile.
+
+        Jobs already queued for the previous profile carry on, side by side
+        with jobs of this one; only jobs on the same slot or save folder wait.
+        """
+        core = self.root_core.profile_core(profile)
+        if core is self.core:
+            return
+        self.core = core
+        self.noita_save_path = core.noita_save_path
+        self.noita_folder_exists = core.noita_folder_exists
+        self.start_profile()
+        self.refresh_slot_list()
+        self.update_initial_status()
+    
+    def slot_exists(self, slot_num):
+        """Check the slot index whether a slot holds a save"""
+        return slot_num is not None and self.core.meta.get(slot_num, {}).get("exists", False)
+    
+    def slot_name(self, slot_num, core=None):
+        """Display name of a slot (of the shown profile unless core is given)"""
+        core = core or self.core
+        return core.meta.get(slot_num, {}).get("name", f"Slot {slot_num + 1}")
+    
+    def save_to_slot(self, slot_num=None):
+        """Save current game state to specified slot, or to a new one"""
         if not self.noita_folder_exists or not self.noita_save_path:
             self.set_temporary_status("Noita save folder not found!")
             return
         
-        # Check if Noita is running
-        if self.is_noita_running():
+        # Check if Noita is running; with live snapshots on, save gently anyway
+        live = self.is_noita_running()
+        if live and not self.settings["live_snapshot"]:
             messagebox.showwarning(
                 "Noita is Running", 
                 "Cannot save while Noita is running!\n\nPlease close Noita first, then try again."
@@ -250,52 +171,60 @@ class NoitaSaveManager:
             self.set_temporary_status("Save blocked - Noita is running")
             return
         
-        slot_dir = os.path.join(BACKUP_DIR, f"slot_{slot_num}")
+        # Jobs hold on to the core: the user may switch profiles meanwhile
+        core = self.core
+        if slot_num is None:
+            slot_num = core.new_slot()
+        self.scheduler.submit(
+            f"{'Live saving' if live else 'Saving'} to {self.slot_name(slot_num)}",
+            (core.slot_key(slot_num), core.save_key),
+            lambda job: self._save_job(job, core, slot_num, live),
+            on_progress=self.show_job_progress,
+            on_done=lambda job, result, error: self._save_done(core, slot_num, result, error))
+    
+    def _save_job(self, job, core, slot_num, live=False):
+        """Worker side of save_to_slot: copy the live save into the slot"""
+        return core.save_slot(slot_num, progress=job.progress, live=live)
+    
+    def _save_done(self, core, slot_num, stats, error):
+        """UI side of save_to_slot: show the new slot contents"""
+        if error:
+            self.refresh_slot_list()
+            self.set_temporary_status(f"Save failed: {error}")
+            return
         
-        try:
-            # Remove existing slot if it exists
-            if os.path.exists(slot_dir):
-                shutil.rmtree(slot_dir)
-            
-            # Copy current save to slot
-            shutil.copytree(self.noita_save_path, slot_dir)
-            
-            # Update slot metadata (keep user‑defined name if present)
-            slot_data = self.slots_data.get(str(slot_num), {})
-            slot_data["date"] = datetime.now().strftime("%Y-%m-%d %H:%M")
-            slot_data["exists"] = True
-            # Ensure a default name if none was set
-            if "name" not in slot_data:
-                slot_data["name"] = f"Slot {slot_num + 1}"
-            self.slots_data[str(slot_num)] = slot_data
-            
-            self.save_slots_data()
-            self.update_slot_display(slot_num)
-            self.set_temporary_status(f"Saved to Slot {slot_num + 1}")
-            
-        except Exception as e:
-            self.set_temporary_status(f"Save failed: {e}")
+        self.refresh_slot_list()
+        if core is self.core and self.slot_list.index_of(slot_num) is not None:
+            self.slot_list.select(slot_num)
+            self.slot_list.see(slot_num)
+        self.set_temporary_status(f"Saved to {self.slot_name(slot_num, core)}")
+
+    def _run_summaries_done(self, core, updated):
+        """Show run details read in the background"""
+        if updated and core is self.core:
+            self.refresh_slot_list()
 
     def rename_slot(self, slot_num):
         """Prompt user to rename a slot"""
-        current_name = self.slots_data[str(slot_num)].get("name", f"Slot {slot_num + 1}")
+        current_name = self.slot_name(slot_num)
         new_name = simpledialog.askstring(
             "Rename Slot",
-            f"Enter new name for Slot {slot_num + 1}:",
+            f"Enter new name for {current_name}:",
             initialvalue=current_name
         )
         if new_name:
-            self.slots_data[str(slot_num)]["name"] = new_name
-            self.save_slots_data()
-            self.update_slot_display(slot_num)
-            self.set_temporary_status(f"Slot {slot_num + 1} renamed to \"{new_name}\"")
+            try:
+                self.core.rename_slot(slot_num, new_name)
+            except Exception as e:
+                print(f"Error saving slot data: {e}")
+                self.update_status(f"Error saving slot data: {e}")
+            self.refresh_slot_list()
+            self.set_temporary_status(f"{current_name} renamed to \"{new_name}\"")
 
     def load_from_slot(self, slot_num):
         """Load game state from specified slot"""
-        slot_dir = os.path.join(BACKUP_DIR, f"slot_{slot_num}")
-        
-        if not os.path.exists(slot_dir):
-            self.set_temporary_status(f"Slot {slot_num + 1} is empty!")
+        if not self.slot_exists(slot_num):
+            self.set_temporary_status("Select a saved slot first")
             return
         
         # Check if Noita is running
@@ -307,45 +236,298 @@ class NoitaSaveManager:
             self.set_temporary_status("Load blocked - Noita is running")
             return
         
-        try:
-            # Backup current save first
-            success, message = self.backup_current_save()
-            if not success:
-                self.set_temporary_status(f"Auto-backup failed: {message}")
-                return
-            
-            # Remove current save
-            if self.noita_save_path and os.path.exists(self.noita_save_path):
-                shutil.rmtree(self.noita_save_path)
-            
-            # Restore from slot
-            shutil.copytree(slot_dir, self.noita_save_path)
-            self.set_temporary_status(f"Loaded Slot {slot_num + 1} (auto-backup created)")
-            
-        except Exception as e:
-            self.set_temporary_status(f"Load failed: {e}")
+        if not self.noita_folder_exists or not self.noita_save_path:
+            self.set_temporary_status("Noita save folder not found!")
+            return
+        
+        core = self.core
+        self.scheduler.submit(
+            f"Loading {self.slot_name(slot_num)}",
+            (core.slot_key(slot_num), core.save_key),
+            lambda job: self._load_job(job, core, slot_num),
+            on_progress=self.show_job_progress,
+            on_done=lambda job, result, error: self._load_done(core, slot_num, error))
+    
+    def _load_job(self, job, core, slot_num):
+        """Worker side of load_from_slot: stage the slot and swap it in"""
+        stats = core.load_slot(slot_num, progress=job.progress,
+                               check_cancelled=job.check_cancelled)
+        core.retention.run_in_background()
+        return stats
+    
+    def _load_done(self, core, slot_num, error):
+        """UI side of load_from_slot"""
+        if error:
+            self.set_temporary_status(f"Load failed: {error}")
+        else:
+            self.set_temporary_status(
+                f"Loaded {self.slot_name(slot_num, core)} (auto-backup created)")
+            self.sync_shadow(core)
 
+    def compare_slot(self, slot_num):
+        """Open a panel listing what loading a slot would change"""
+        if not self.slot_exists(slot_num):
+            self.set_temporary_status("Select a saved slot first")
+            return
+        # Other slots can be picked as the base instead of the live save
+        bases = {LIVE_SAVE: None}
+        for other, record in self.core.query_slots(sort="slot"):
+            if other != slot_num:
+                bases[f"{other + 1}: {record.get('name', '')}"] = other
+        core = self.core
+        panel = DiffPanel(self.root, f"Compare {self.slot_name(slot_num)}", list(bases),
+                          on_compare=lambda choice: self._run_compare(panel, core, slot_num,
+                                                                      bases[choice]),
+                          on_restore=lambda patterns: self.restore_partial(slot_num, patterns,
+                                                                           panel, core))
+        self._run_compare(panel, core, slot_num, None)
+    
+    def _run_compare(self, panel, core, slot_num, against):
+        """Compute a diff in the background and show it in panel"""
+        panel.summary_var.set("Comparing...")
+        base_key = core.slot_key(against) if against is not None else core.save_key
+        self.scheduler.submit(
+            f"Comparing {self.slot_name(slot_num, core)}",
+            (core.slot_key(slot_num), base_key),
+            lambda job: core.diff_slot(slot_num, against),
+            on_done=lambda job, diff, error: self._compare_done(panel, core, against, diff,
+                                                                error))
+    
+    def _compare_done(self, panel, core, against, diff, error):
+        """UI side of compare_slot"""
+        if not panel.winfo_exists():
+            return
+        if error:
+            panel.show_error(f"Compare failed: {error}")
+        elif against is None:
+            panel.show(diff, "Loading this slot")
+        else:
+            panel.show(diff, f"Compared with {self.slot_name(against, core)}")
+    
+    def restore_partial(self, slot_num, patterns, panel=None, core=None):
+        """Restore only some folders/files of a slot into the live save"""
+        core = core or self.core
+        if self.is_noita_running():
+            messagebox.showwarning(
+                "Noita is Running",
+                "Cannot load while Noita is running!\n\nPlease close Noita first, then try again.")
+            self.set_temporary_status("Load blocked - Noita is running")
+            return
+        shown = "\n".join(patterns[:10]) + ("\n..." if len(patterns) > 10 else "")
+        if not messagebox.askyesno(
+                "Confirm Restore",
+                f"Restore these parts of {self.slot_name(slot_num, core)}?\n\n{shown}\n\n"
+                "The rest of the current save stays as it is; replaced files are backed up.",
+                parent=panel or self.root):
+            return
+        self.scheduler.submit(
+            f"Restoring part of {self.slot_name(slot_num, core)}",
+            (core.slot_key(slot_num), core.save_key),
+            lambda job: self._restore_partial_job(job, core, slot_num, patterns),
+            on_progress=self.show_job_progress,
+            on_done=lambda job, result, error: self._restore_partial_done(core, slot_num, panel,
+                                                                          error))
+    
+    def _restore_partial_job(self, job, core, slot_num, patterns):
+        """Worker side of restore_partial"""
+        stats = core.restore_partial(slot_num, patterns, progress=job.progress,
+                                     check_cancelled=job.check_cancelled)
+        core.retention.run_in_background()
+        return stats
+    
+    def _restore_partial_done(self, core, slot_num, panel, error):
+        """UI side of restore_partial: refresh the comparison"""
+        if error:
+            self.set_temporary_status(f"Restore failed: {error}")
+            return
+        self.set_temporary_status(f"Restored part of {self.slot_name(slot_num, core)}")
+        self.sync_shadow(core)
+        if panel is not None and panel.winfo_exists():
+            self._run_compare(panel, core, slot_num, None)
+    
     def delete_slot(self, slot_num):
         """Delete specified slot"""
-        slot_dir = os.path.join(BACKUP_DIR, f"slot_{slot_num}")
-        
-        if not os.path.exists(slot_dir):
-            self.set_temporary_status(f"Slot {slot_num + 1} is already empty!")
+        if not self.slot_exists(slot_num):
+            self.set_temporary_status("Select a saved slot first")
             return
         
-        if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete Slot {slot_num + 1}?"):
-            try:
-                shutil.rmtree(slot_dir)
-                self.slots_data[str(slot_num)] = {
-                    "name": f"Slot {slot_num + 1}",
-                    "date": "",
-                    "exists": False
-                }
-                self.save_slots_data()
-                self.update_slot_display(slot_num)
-                self.set_temporary_status(f"Deleted Slot {slot_num + 1}")
-            except Exception as e:
-                self.set_temporary_status(f"Delete failed: {e}")
+        name = self.slot_name(slot_num)
+        if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete {name}?"):
+            core = self.core
+            self.scheduler.submit(
+                f"Deleting {name}",
+                (core.slot_key(slot_num),),
+                lambda job: self._delete_job(core, slot_num),
+                on_progress=self.show_job_progress,
+                on_done=lambda job, result, error: self._delete_done(name, error))
+    
+    def _delete_job(self, core, slot_num):
+        """Worker side of delete_slot: remove the slot in every format"""
+        core.delete_slot(slot_num)
+    
+    def _delete_done(self, name, error):
+        """UI side of delete_slot: drop the slot from the list"""
+        if error:
+            self.set_temporary_status(f"Delete failed: {error}")
+            return
+        self.refresh_slot_list()
+        self.set_temporary_status(f"Deleted {name}")
+    
+    def export_slot(self, slot_num):
+        """Write a slot to a single file that can be imported elsewhere"""
+        if not self.slot_exists(slot_num):
+            self.set_temporary_status("Select a saved slot first")
+            return
+        name = self.slot_name(slot_num)
+        path = filedialog.asksaveasfilename(
+            title=f"Export {name}", defaultextension=EXPORT_EXTENSION,
+            initialfile=f"{name}{EXPORT_EXTENSION}",
+            filetypes=[("Noita Savior slot", f"*{EXPORT_EXTENSION}"), ("All files", "*")])
+        if not path:
+            return
+        core = self.core
+        self.scheduler.submit(
+            f"Exporting {name}",
+            (core.slot_key(slot_num),),
+            lambda job: core.export_slot(slot_num, path, progress=job.progress),
+            on_progress=self.show_job_progress,
+            on_done=lambda job, stats, error: self._export_done(name, stats, error))
+    
+    def _export_done(self, name, stats, error):
+        """UI side of export_slot"""
+        if error:
+            self.set_temporary_status(f"Export failed: {error}")
+        else:
+            self.set_temporary_status(f"Exported {name} ({stats})", delay=6000)
+    
+    def import_slot(self):
+        """Add a slot from an export file as a new slot"""
+        path = filedialog.askopenfilename(
+            title="Import Slot",
+            filetypes=[("Noita Savior slot", f"*{EXPORT_EXTENSION}"), ("All files", "*")])
+        if not path:
+            return
+        core = self.core
+        self.scheduler.submit(
+            f"Importing {os.path.basename(path)}",
+            (f"import:{path}",),
+            lambda job: core.import_slot(path, progress=job.progress),
+            on_progress=self.show_job_progress,
+            on_done=lambda job, result, error: self._import_done(core, result, error))
+    
+    def _import_done(self, core, result, error):
+        """UI side of import_slot: show the new slot"""
+        self.refresh_slot_list()
+        if error:
+            self.set_temporary_status(f"Import failed: {error}")
+            return
+        slot_num, skipped = result
+        self.set_temporary_status(
+            f"Imported {self.slot_name(slot_num, core)} ({skipped} files already stored)",
+            delay=6000)
+    
+    def verify_slots(self):
+        """Check every saved slot against the hashes recorded when it was saved"""
+        slot_nums = [slot_num for slot_num, _record in self.core.query_slots(sort="slot")]
+        if not slot_nums:
+            self.set_temporary_status("No saved slots to verify")
+            return
+        # Keep saves and deletes of the slots out while they are checked
+        core = self.core
+        self.scheduler.submit(
+            "Verifying slots",
+            tuple(core.slot_key(slot_num) for slot_num in slot_nums),
+            lambda job: core.verify_slots(slot_nums, progress=job.progress),
+            on_progress=self.show_job_progress,
+            on_done=lambda job, report, error: self._verify_done(core, report, error))
+    
+    def _verify_done(self, core, report, error):
+        """UI side of verify_slots: flag damaged slots"""
+        self.refresh_slot_list()
+        if error:
+            self.set_temporary_status(f"Verify failed: {error}")
+            return
+        if report.ok:
+            self.set_temporary_status(f"All slots intact ({report})", delay=6000)
+            return
+        names = "\n".join(self.slot_name(slot_num, core) for slot_num in report.damaged_slots())
+        self.update_status(f"Verify found damage ({report})")
+        messagebox.showwarning(
+            "Damaged Slots",
+            f"These slots no longer match what was saved:\n\n{names}\n\n"
+            "Loading them may give a corrupted run.")
+    
+    def on_save_settled(self):
+        """Watcher thread callback: queue an automatic snapshot of the save"""
+        # Only the shown profile has a watcher
+        core = self.core
+        if self.settings["shadow_mirror"]:
+            self.sync_shadow(core)
+        if not self.settings["auto_snapshot"]:
+            return
+        self.scheduler.submit(
+            "Auto-snapshot",
+            (core.save_key, f"auto_snapshot:{core.profile}"),
+            lambda job: core.auto_snapshot(progress=job.progress),
+            on_done=self._auto_snapshot_done)
+    
+    def sync_shadow(self, core=None):
+        """Queue an update of the shadow mirror so the next save is instant"""
+        core = core or self.core
+        if not (self.settings["shadow_mirror"] and core.noita_folder_exists):
+            return
+        # Keyed on the save folder so it never reads a half-swapped load
+        self.scheduler.submit(
+            "Syncing shadow mirror",
+            (f"shadow:{core.shadow_name}", core.save_key),
+            lambda job: core.sync_shadow(progress=job.progress),
+            on_done=self._shadow_done)
+    
+    def _shadow_done(self, job, stats, error):
+        """UI side of sync_shadow; only failures are worth mentioning"""
+        if error:
+            self.set_temporary_status(f"Shadow mirror sync failed: {error}")
+    
+    def _auto_snapshot_done(self, job, name, error):
+        """UI side of the automatic snapshot"""
+        if error:
+            self.set_temporary_status(f"Auto-snapshot failed: {error}")
+        else:
+            self.set_temporary_status(f"Auto-snapshot saved ({name})")
+    
+    def show_job_progress(self, job):
+        """Show the progress of a running job in the status bar"""
+        if job.state == "running":
+            self.update_status(job.describe_progress())
+    
+    def post_to_ui(self, func, *args):
+        """Queue a callback from a worker thread to run on the Tk thread"""
+        self.ui_queue.put((func, args))
+    
+    def process_ui_queue(self):
+        """Run callbacks posted by worker threads and refresh the cancel button"""
+        try:
+            while True:
+                try:
+                    func, args = self.ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+                # One failing callback must not stop the others or the polling
+                try:
+                    func(*args)
+                except Exception as e:
+                    print(f"UI callback {getattr(func, '__name__', func)} failed: {e}")
+            if self.scheduler.busy():
+                self.cancel_button.config(state='normal')
+            else:
+                self.cancel_button.config(state='disabled')
+        finally:
+            self.root.after(UI_POLL_MS, self.process_ui_queue)
+    
+    def cancel_jobs(self):
+        """Cancel every queued and running operation"""
+        self.scheduler.cancel_all()
+        self.update_status("Cancelling...")
     
     def setup_ui(self):
         """Setup the user interface"""
@@ -353,75 +535,75 @@ class NoitaSaveManager:
         main_frame = ttk.Frame(self.root, padding="10")
         main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
-        # Create slots (2 rows of 4)
-        self.slot_frames = []
-        self.slot_labels = []
-        self.slot_buttons = []
+        # Save profile, then search and sort over its slot index
+        filter_frame = ttk.Frame(main_frame)
+        filter_frame.grid(row=0, column=0, columnspan=4, sticky=(tk.W, tk.E), pady=(0, 5))
+        ttk.Label(filter_frame, text="Profile:").grid(row=0, column=0, padx=(0, 5))
+        self.profile_choices = {entry["name"]: profile
+                                for profile, entry in self.core.list_profiles()}
+        self.profile_var = tk.StringVar(value=next(
+            (name for name, profile in self.profile_choices.items()
+             if profile == self.core.profile), self.core.profile))
+        profile_box = ttk.Combobox(filter_frame, textvariable=self.profile_var,
+                                   state="readonly", values=list(self.profile_choices), width=14)
+        profile_box.grid(row=0, column=1, padx=(0, 10))
+        profile_box.bind("<<ComboboxSelected>>", lambda event: self.switch_profile(
+            self.profile_choices.get(self.profile_var.get(), self.core.profile)))
+        ttk.Label(filter_frame, text="Search:").grid(row=0, column=2, padx=(0, 5))
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *args: self.refresh_slot_list())
+        ttk.Entry(filter_frame, textvariable=self.search_var).grid(
+            row=0, column=3, sticky=(tk.W, tk.E))
+        ttk.Label(filter_frame, text="Sort:").grid(row=0, column=4, padx=(10, 5))
+        self.sort_var = tk.StringVar(value=next(iter(SORT_CHOICES)))
+        sort_box = ttk.Combobox(filter_frame, textvariable=self.sort_var, state="readonly",
+                                values=list(SORT_CHOICES), width=14)
+        sort_box.grid(row=0, column=5)
+        sort_box.bind("<<ComboboxSelected>>", lambda event: self.refresh_slot_list())
+        filter_frame.columnconfigure(3, weight=1)
         
-        for i in range(8):
-            row = 2 + (i // 4)
-            col = i % 4
-            
-            # Slot frame
-            slot_frame = ttk.LabelFrame(main_frame, text=f"Slot {i+1}", padding="8")
-            slot_frame.grid(row=row, column=col, padx=3, pady=3, sticky=(tk.W, tk.E, tk.N, tk.S))
-            
-            # Configure slot frame to expand
-            slot_frame.columnconfigure(0, weight=1)
-            slot_frame.rowconfigure(0, weight=1)
-            slot_frame.rowconfigure(1, weight=1)
-            
-            self.slot_frames.append(slot_frame)
-            
-            # Slot info label
-            slot_label = ttk.Label(slot_frame, text="Empty", font=("Arial", 9), justify="center")
-            slot_label.grid(row=0, column=0, columnspan=3, pady=(0, 8))
-            self.slot_labels.append(slot_label)
-            
-            # Create tooltip for this label
-            tooltip = ToolTip(slot_label, "")
-            self.slot_tooltips.append(tooltip)
-
-            # Buttons frame
-            btn_frame = ttk.Frame(slot_frame)
-            btn_frame.grid(row=1, column=0, columnspan=3, pady=(5, 0), sticky=(tk.W, tk.E))
-            
-            # Configure button frame
-            btn_frame.columnconfigure(0, weight=1)
-            
-            # Save button
-            save_btn = ttk.Button(btn_frame, text="Save",
-                                command=lambda i=i: self.save_to_slot(i))
-            save_btn.grid(row=0, column=0, pady=2, sticky=(tk.W, tk.E))
-            
-            # Load button
-            load_btn = ttk.Button(btn_frame, text="Load",
-                                command=lambda i=i: self.load_from_slot(i))
-            load_btn.grid(row=1, column=0, pady=2, sticky=(tk.W, tk.E))
-            
-            # Delete button
-            delete_btn = ttk.Button(btn_frame, text="Delete",
-                                  command=lambda i=i: self.delete_slot(i))
-            delete_btn.grid(row=2, column=0, pady=2, sticky=(tk.W, tk.E))
-            
-            self.slot_buttons.append([save_btn, load_btn, delete_btn])
-
-            # Rename button
-            rename_btn = ttk.Button(btn_frame, text="Rename",
-                                   command=lambda i=i: self.rename_slot(i))
-            rename_btn.grid(row=3, column=0, pady=2, sticky=(tk.W, tk.E))
-            # Keep a reference to this button
-            self.rename_buttons.append(rename_btn)
-            
-            # Update slot display
-            self.update_slot_display(i)
+        # Slot list; only the visible rows have widgets
+        self.slot_list = VirtualSlotList(
+            main_frame,
+            columns=[("Name", 24, tk.W), ("Run", 30, tk.W), ("Saved", 16, tk.W),
+                     ("Size", 9, tk.E)],
+            format_row=self.format_slot_row,
+            on_select=self.on_slot_selected)
+        self.slot_list.grid(row=1, column=0, columnspan=4, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        # Buttons acting on the selected slot
+        btn_frame = ttk.Frame(main_frame)
+        btn_frame.grid(row=2, column=0, columnspan=4, sticky=(tk.W, tk.E), pady=(5, 0))
+        new_btn = ttk.Button(btn_frame, text="New Slot", command=lambda: self.save_to_slot(None))
+        new_btn.grid(row=0, column=0, padx=(0, 3), sticky=(tk.W, tk.E))
+        import_btn = ttk.Button(btn_frame, text="Import", command=self.import_slot)
+        import_btn.grid(row=0, column=7, padx=3, sticky=(tk.W, tk.E))
+        verify_btn = ttk.Button(btn_frame, text="Verify All", command=self.verify_slots)
+        verify_btn.grid(row=0, column=8, padx=(3, 0), sticky=(tk.W, tk.E))
+        self.slot_buttons = []
+        for col, (text, command) in enumerate((("Save", self.save_to_slot),
+                                                ("Load", self.load_from_slot),
+                                                ("Compare", self.compare_slot),
+                                                ("Delete", self.delete_slot),
+                                                ("Rename", self.rename_slot),
+                                                ("Export", self.export_slot)), start=1):
+            button = ttk.Button(btn_frame, text=text, state='disabled',
+                                command=lambda command=command: command(self.slot_list.selected))
+            button.grid(row=0, column=col, padx=3, sticky=(tk.W, tk.E))
+            self.slot_buttons.append(button)
+        btn_frame.columnconfigure(tuple(range(9)), weight=1)
         
         # Status bar
         self.status_var = tk.StringVar()
         self.status_var.set("Ready")
         status_bar = ttk.Label(main_frame, textvariable=self.status_var, 
                               relief=tk.SUNKEN, anchor=tk.W)
-        status_bar.grid(row=4, column=0, columnspan=4, sticky=(tk.W, tk.E), pady=(20, 0))
+        status_bar.grid(row=4, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(20, 0))
+        
+        # Cancel button for running operations
+        self.cancel_button = ttk.Button(main_frame, text="Cancel", state='disabled',
+                                        command=self.cancel_jobs)
+        self.cancel_button.grid(row=4, column=3, sticky=(tk.E,), padx=(3, 0), pady=(20, 0))
         
         # Configure grid weights for proper autoscaling
         self.root.columnconfigure(0, weight=1)
@@ -429,49 +611,54 @@ class NoitaSaveManager:
         
         # Configure main frame grid weights
         main_frame.columnconfigure((0, 1, 2, 3), weight=1)
-        main_frame.rowconfigure(2, weight=1)  # First row of slots
-        main_frame.rowconfigure(3, weight=1)  # Second row of slots
+        main_frame.rowconfigure(1, weight=1)  # The slot list takes the extra height
         
-        # Configure slot frames to expand
-        for i in range(8):
-            row = 2 + (i // 4)
-            col = i % 4
-            main_frame.rowconfigure(row, weight=1)
-            main_frame.columnconfigure(col, weight=1)
-    
-    def update_slot_display(self, slot_num):
-        """Update the display for a specific slot"""
-        slot_data = self.slots_data[str(slot_num)]
-        if slot_data["exists"]:
-            name = slot_data.get("name", f"Slot {slot_num + 1}")
-            date = slot_data.get("date", "")
-
-            # Truncate long names to keep the slot size unchanged
-            display_name = name
-            if len(name) > 15:                     # 15‑char limit (adjust if needed)
-                display_name = name[:12] + "..."
-
-            self.slot_labels[slot_num].config(text=display_name)
-
-            # Update tooltip with the full name (and date if present)
-            tooltip_text = name
-            if date:
-                tooltip_text += f"\n{date}"
-            self.slot_tooltips[slot_num].text = tooltip_text
-            # Enable rename button when slot has data
-            self.rename_buttons[slot_num].config(state='normal')
-        else:
-            self.slot_labels[slot_num].config(text="Empty")
-            self.slot_tooltips[slot_num].text = ""
-            # Disable rename button when slot is empty
-            self.rename_buttons[slot_num].config(state='disabled')
+        self.refresh_slot_list()
+    
+    def format_slot_row(self, slot_num, record):
+        """Column texts and tooltip for one row of the slot list"""
+        name = record.get("name", f"Slot {slot_num + 1}")
+        date = record.get("date", "")
+        size = record.get("size")
+        size_text = f"{size / 1048576:.1f} MB" if size is not None else ""
+        # Tooltip with the full name (and date if present)
+        tooltip_text = name
+        if date:
+            tooltip_text += f"\n{date}"
+        # Run details were parsed at save time; nothing is read here
+        run = record.get("run") or {}
+        if run:
+            tooltip_text += f"\n{describe(run, long=True)}"
+        damaged = record.get("damaged_files")
+        if damaged:
+            name = f"{name} (damaged)"
+            tooltip_text += f"\n{damaged} files failed verification"
+        return [name, describe(run), date, size_text], tooltip_text
+    
+    def refresh_slot_list(self):
+        """Re-run the search and sort over the slot index and redraw the list"""
+        sort, descending = SORT_CHOICES.get(self.sort_var.get(), ("date", None))
+        self.slot_list.set_items(self.core.query_slots(self.search_var.get(), sort, descending))
+        self.on_slot_selected(self.slot_list.selected)
+    
+    def on_slot_selected(self, slot_num):
+        """Enable the slot buttons only while a saved slot is selected"""
+        state = 'normal' if self.slot_exists(slot_num) else 'disabled'
+        for button in self.slot_buttons:
+            button.config(state=state)
     
     def update_initial_status(self):
         """Update initial status on startup"""
         if self.noita_folder_exists and self.noita_save_path:
-            self.status_var.set("Ready - Noita save folder detected")
+            status = "Ready - Noita save folder detected"
         else:
-            self.status_var.set("Warning - Noita save folder not found")
+            status = "Warning - Noita save folder not found"
+        if self.process_monitor.running:
+            status += " (Noita is running)"
+        pending = self.core.trash.pending_bytes()
+        if pending:
+            status += f" - {pending / 1048576:.1f} MB awaiting cleanup"
+        self.status_var.set(status)
     
     def update_status(self, message):
         """Update the status bar"""
@@ -486,12 +673,14 @@ class NoitaSaveManager:
     
     def on_closing(self):
         """Handle application closing - save data before exit"""
-        try:
-            # Save slot data before closing
-            self.save_slots_data()
-            print("Slot data saved successfully")
-        except Exception as e:
-            print(f"Error saving slot data on exit: {e}")
+        # Stop background jobs; a load that already swapped folders still finishes
+        self.scheduler.shutdown(cancel=True)
+        while not self.ui_queue.empty():
+            func, args = self.ui_queue.get_nowait()
+            func(*args)
+        
+        # Slot changes are already journaled; only the monitors need stopping
+        self.root_core.close()
         
         # Destroy the window
         self.root.destroy()
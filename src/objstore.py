@@ -0,0 +1,841 @@
+# objstore.py
+# Noita Savior - content-addressed snapshot store
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Deduplicated snapshot storage.
+
+Every file of a snapshot is stored once under ``objects/`` keyed by the
+SHA-256 of its contents. A snapshot itself is only a small JSON manifest
+in ``manifests/`` mapping relative paths to object hashes, so files that
+did not change between two snapshots cost neither disk space nor copy
+time. Objects are reference counted and removed as soon as no manifest
+points at them any more.
+
+Large files can instead be stored as content-defined chunks (see
+chunking.py): the object is then a small recipe, ``<hash>.chunks``,
+listing chunk objects that are shared with every other file containing
+the same data, so a world file that changed in a few places only adds
+the chunks around the changes. Chunks are counted in the same reference
+table, once per recipe that uses them. A commit appends only the counts
+it changed to ``refcounts.journal``; the journal is folded back into
+``refcounts.json`` every JOURNAL_COMPACT commits.
+
+A snapshot can also be taken while the game is still writing the folder
+(see livesnap.py): files are then read once, at a limited rate, and the
+tree is rescanned until no file changed during the last pass.
+"""
+import contextlib
+import hashlib
+import json
+import mmap
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+import snapclone
+from chunking import MAX_CHUNK, iter_chunks
+from copyengine import CopyEngine
+from livesnap import READ_SIZE, LiveSnapshotError, ThrottledReader
+from metrics import phase
+
+HASH_CHUNK_SIZE = 1024 * 1024
+# Files at least this big are hashed straight from a memory map
+MMAP_THRESHOLD = 8 * 1024 * 1024
+MANIFEST_VERSION = 1
+RECIPE_SUFFIX = ".chunks"
+# Commits appended to the reference count journal before it is folded
+# back into refcounts.json
+JOURNAL_COMPACT = 256
+# Temp files untouched this long belong to a copy that was cut short, not
+# to one still running (the window and the command line share the store)
+STALE_TMP_SECONDS = 600
+DIGEST = re.compile(r"[0-9a-f]{64}")
+
+
+def hash_file(path):
+    """Return the hex SHA-256 digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            # One update over the mapping: no copies into Python buffers, and
+            # hashlib drops the GIL for the whole file
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    digest.update(mapped)
+                return digest.hexdigest()
+            except (OSError, ValueError):
+                digest = hashlib.sha256()
+                f.seek(0)
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_safe_rel(rel):
+    """Check that a manifest path names something inside the snapshot folder.
+
+    Absolute paths, drive letters, backslashes and empty, '.' or '..'
+    components are refused, so a manifest from elsewhere (an imported
+    export) cannot make a restore write outside its destination.
+    """
+    return (isinstance(rel, str) and bool(rel) and not rel.startswith("/") and
+            "\\" not in rel and ":" not in rel and
+            all(part not in ("", ".", "..") for part in rel.split("/")))
+
+
+def check_manifest(manifest):
+    """Raise ValueError unless a manifest's paths and digests are well-formed"""
+    files = manifest.get("files")
+    dirs = manifest.get("dirs", [])
+    if not isinstance(files, dict) or not isinstance(dirs, list):
+        raise ValueError("Malformed manifest")
+    for rel, entry in files.items():
+        if not is_safe_rel(rel):
+            raise ValueError(f"Unsafe path in manifest: {rel!r}")
+        if (not isinstance(entry, list) or len(entry) != 3 or
+                not isinstance(entry[0], str) or not DIGEST.fullmatch(entry[0]) or
+                not all(isinstance(value, int) and value >= 0 for value in entry[1:])):
+            raise ValueError(f"Malformed manifest entry for {rel}")
+    for rel in dirs:
+        if not is_safe_rel(rel):
+            raise ValueError(f"Unsafe path in manifest: {rel!r}")
+
+
+def scan_tree(root):
+    """Walk a directory and return (files, dirs) with paths relative to root.
+
+    files maps a '/'-separated relative path to its os.stat_result,
+    dirs lists every sub directory so empty folders survive a restore.
+    """
+    files = {}
+    dirs = []
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        abs_dir = os.path.join(root, rel_dir) if rel_dir else root
+        with os.scandir(abs_dir) as it:
+            for entry in it:
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(rel)
+                    stack.append(rel)
+                elif entry.is_file(follow_symlinks=False):
+                    files[rel] = entry.stat(follow_symlinks=False)
+    return files, dirs
+
+
+class ObjectStore:
+    """Content-addressed store holding named snapshots of a directory tree"""
+
+    def __init__(self, root, engine=None, clone=True, link_patterns=(), trash=None,
+                 chunk_threshold=0):
+        self.root = root
+        self.engine = engine or CopyEngine()
+        # Freed objects are renamed into this Trash instead of unlinked
+        self.trash = trash
+        # Reflink files where the filesystem supports it, and hardlink files
+        # matching link_patterns (those are never modified in place)
+        self.clone = clone
+        self.link_patterns = tuple(link_patterns)
+        # Files at least this big are split into chunks (0 = never); files
+        # that fit into one chunk gain nothing from it
+        self.chunk_threshold = chunk_threshold and max(chunk_threshold, MAX_CHUNK + 1)
+        # Guards manifests and reference counts when jobs run concurrently.
+        # Objects pinned by an in-progress snapshot are never freed.
+        self.lock = threading.RLock()
+        self.pinned = {}
+        self.objects_dir = os.path.join(root, "objects")
+        self.manifests_dir = os.path.join(root, "manifests")
+        self.tmp_dir = os.path.join(root, "tmp")
+        self.refcounts_file = os.path.join(root, "refcounts.json")
+        self.journal_file = os.path.join(root, "refcounts.journal")
+        self.dirty_marker = os.path.join(root, ".dirty")
+        for path in (self.objects_dir, self.manifests_dir, self.tmp_dir):
+            os.makedirs(path, exist_ok=True)
+
+        # A leftover marker means we crashed between writing a manifest and
+        # committing the reference counts; leftover temp files mean a copy
+        # was cut short. Either can leave objects no manifest uses, so
+        # recount from scratch and sweep those away.
+        if os.path.exists(self.dirty_marker) or self._stale_tmp():
+            self.gc()
+        elif not os.path.exists(self.refcounts_file):
+            self.refcounts = self.rebuild_refcounts()
+        else:
+            try:
+                with open(self.refcounts_file, 'r') as f:
+                    self.refcounts = json.load(f)
+                self.journal_entries = self._replay_journal()
+            except (OSError, ValueError):
+                self.refcounts = self.rebuild_refcounts()
+
+    def _stale_tmp(self):
+        """Temp files left by an interrupted copy"""
+        stale = []
+        cutoff = time.time() - STALE_TMP_SECONDS
+        for entry in os.listdir(self.tmp_dir):
+            path = os.path.join(self.tmp_dir, entry)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    stale.append(path)
+            except FileNotFoundError:
+                pass
+        return stale
+
+    # -- paths -----------------------------------------------------------
+
+    def object_path(self, digest):
+        """Return the on-disk path of an object"""
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def recipe_path(self, digest):
+        """Return the on-disk path of a chunked object's chunk list"""
+        return self.object_path(digest) + RECIPE_SUFFIX
+
+    def manifest_path(self, name):
+        """Return the on-disk path of a snapshot manifest"""
+        return os.path.join(self.manifests_dir, f"{name}.json")
+
+    # -- manifests -------------------------------------------------------
+
+    def has(self, name):
+        """Check whether a snapshot with this name exists"""
+        return os.path.exists(self.manifest_path(name))
+
+    def names(self):
+        """List the names of all stored snapshots"""
+        return sorted(entry[:-5] for entry in os.listdir(self.manifests_dir)
+                      if entry.endswith(".json"))
+
+    def read_manifest(self, name):
+        """Load a snapshot manifest, or None if it does not exist"""
+        try:
+            with open(self.manifest_path(name), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def summary(self, name):
+        """Return (file count, total bytes, SHA-256 of the manifest) of a snapshot"""
+        with open(self.manifest_path(name), 'rb') as f:
+            raw = f.read()
+        files = json.loads(raw)["files"]
+        return (len(files), sum(entry[1] for entry in files.values()),
+                hashlib.sha256(raw).hexdigest())
+
+    def _write_json(self, path, data):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    # -- reference counting ----------------------------------------------
+
+    def rebuild_refcounts(self):
+        """Recount object references from every manifest on disk"""
+        refcounts = {}
+        for name in self.names():
+            manifest = self.read_manifest(name) or {}
+            for digest, _size, _mtime in manifest.get("files", {}).values():
+                refcounts[digest] = refcounts.get(digest, 0) + 1
+        for digest in list(refcounts):
+            for chunk in self._recipe_chunks(digest):
+                refcounts[chunk] = refcounts.get(chunk, 0) + 1
+        self.refcounts = refcounts
+        self._compact_refcounts()
+        if os.path.exists(self.dirty_marker):
+            os.remove(self.dirty_marker)
+        return refcounts
+
+    def _compact_refcounts(self):
+        """Write the whole table to refcounts.json and start an empty journal"""
+        self._write_json(self.refcounts_file, self.refcounts)
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self.journal_entries = 0
+        self.touched = set()
+
+    def _replay_journal(self):
+        """Apply journal lines ({digest: new count}, 0 = gone) to self.refcounts"""
+        entries = 0
+        try:
+            with open(self.journal_file, 'r') as f:
+                for line in f:
+                    for digest, count in json.loads(line).items():
+                        if count:
+                            self.refcounts[digest] = count
+                        else:
+                            self.refcounts.pop(digest, None)
+                    entries += 1
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _begin(self):
+        with open(self.dirty_marker, 'w'):
+            pass
+        self.touched = set()
+
+    def _commit(self):
+        # Only the counts this commit changed are appended, so committing a
+        # snapshot does not rewrite the table of every object in the store
+        if self.journal_entries >= JOURNAL_COMPACT:
+            self._compact_refcounts()
+        else:
+            with open(self.journal_file, 'a') as f:
+                f.write(json.dumps({digest: self.refcounts.get(digest, 0)
+                                    for digest in self.touched},
+                                   separators=(",", ":")) + "\n")
+            self.journal_entries += 1
+        os.remove(self.dirty_marker)
+
+    def _add_refs(self, manifest):
+        for digest, _size, _mtime in manifest["files"].values():
+            self.touched.add(digest)
+            count = self.refcounts.get(digest, 0)
+            self.refcounts[digest] = count + 1
+            if not count:
+                # A recipe coming into use holds a reference on each of its chunks
+                for chunk in self._recipe_chunks(digest):
+                    self.touched.add(chunk)
+                    self.refcounts[chunk] = self.refcounts.get(chunk, 0) + 1
+
+    def _drop_refs(self, manifest):
+        """Decrement references and return the objects nobody uses any more"""
+        freed = []
+        pending = [digest for digest, _size, _mtime in manifest["files"].values()]
+        while pending:
+            digest = pending.pop()
+            self.touched.add(digest)
+            count = self.refcounts.get(digest, 0) - 1
+            if count <= 0:
+                self.refcounts.pop(digest, None)
+                freed.append(digest)
+                pending.extend(self._recipe_chunks(digest))
+            else:
+                self.refcounts[digest] = count
+        return freed
+
+    def _free_objects(self, digests):
+        freed_bytes = 0
+        pending = set(digests)
+        while pending:
+            digest = pending.pop()
+            if digest in self.refcounts or digest in self.pinned:
+                continue
+            path = self.object_path(digest)
+            if not os.path.exists(path) and os.path.exists(self.recipe_path(digest)):
+                # Chunks of an unused recipe go too, unless another recipe has them
+                pending.update(self._recipe_chunks(digest))
+                path = self.recipe_path(digest)
+            try:
+                size = os.path.getsize(path)
+                if self.trash:
+                    self.trash.discard(path, size)
+                else:
+                    os.remove(path)
+                freed_bytes += size
+            except FileNotFoundError:
+                pass
+        return freed_bytes
+
+    # -- snapshot operations ---------------------------------------------
+
+    def probe(self, live_dir):
+        """Detect clone support between the store and a live folder up front"""
+        if self.clone:
+            self._capabilities(live_dir, self.tmp_dir)
+            self._capabilities(self.objects_dir, os.path.dirname(live_dir))
+
+    def _capabilities(self, src_dir, dst_dir):
+        return snapclone.detect(src_dir, dst_dir) if self.clone else None
+
+    def _ingest(self, src_path, digest, caps=None, link_ok=False):
+        """Copy a file into the store unless an identical object exists"""
+        obj_path = self.object_path(digest)
+        if self.has_object(digest):
+            return False
+        os.makedirs(os.path.dirname(obj_path), exist_ok=True)
+        # Identical files may be ingested by two workers at once
+        tmp_path = os.path.join(self.tmp_dir, f"{digest}.{threading.get_ident()}")
+        snapclone.copy_file(src_path, tmp_path, caps, link_ok)
+        os.replace(tmp_path, obj_path)
+        return True
+
+    def _pin(self, digest):
+        with self.lock:
+            self.pinned[digest] = self.pinned.get(digest, 0) + 1
+
+    def _unpin(self, digests):
+        for digest in digests:
+            count = self.pinned.get(digest, 0) - 1
+            if count <= 0:
+                self.pinned.pop(digest, None)
+            else:
+                self.pinned[digest] = count
+
+    def _hash_and_ingest(self, src_path, rel, caps, pins, size=0):
+        digest = hash_file(src_path)
+        # Pin before checking for an existing object so a concurrent delete
+        # cannot free it between the check and our manifest commit
+        self._pin(digest)
+        pins.append(digest)
+        if self.chunk_threshold and size >= self.chunk_threshold:
+            if not self.has_object(digest):
+                self._ingest_chunked(src_path, digest, pins)
+            return digest
+        self._ingest(src_path, digest, caps, snapclone.is_link_safe(rel, self.link_patterns))
+        return digest
+
+    def _ingest_chunked(self, src_path, digest, pins):
+        """Store a file as chunks plus a recipe listing them"""
+        with open(src_path, 'rb') as f:
+            check, chunks = self._write_chunks(f, pins)
+        if check != digest:
+            raise OSError(f"{src_path} changed while it was being stored")
+        self._write_recipe(digest, chunks)
+
+    def _ingest_live(self, src_path, pins, limiter, size=0):
+        """Hash and store a file that may be written meanwhile, reading it once"""
+        with open(src_path, 'rb') as f:
+            reader = ThrottledReader(f, limiter)
+            if self.chunk_threshold and size >= self.chunk_threshold:
+                digest, chunks = self._write_chunks(reader, pins)
+                self._pin(digest)
+                pins.append(digest)
+                if not self.has_object(digest):
+                    self._write_recipe(digest, chunks)
+                return digest
+            # Hash what is copied rather than the file, so the object always
+            # matches its digest even if the game rewrote the file meanwhile
+            hasher = hashlib.sha256()
+            tmp_path = os.path.join(self.tmp_dir, f"live.{threading.get_ident()}")
+            try:
+                with open(tmp_path, 'wb') as out:
+                    while True:
+                        data = reader.read(READ_SIZE)
+                        if not data:
+                            break
+                        hasher.update(data)
+                        out.write(data)
+                digest = hasher.hexdigest()
+                self._pin(digest)
+                pins.append(digest)
+                if not self.has_object(digest):
+                    os.makedirs(os.path.dirname(self.object_path(digest)), exist_ok=True)
+                    os.replace(tmp_path, self.object_path(digest))
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return digest
+
+    def _write_chunks(self, f, pins):
+        """Store the chunks of a file object; returns (digest of the whole, chunk list)"""
+        whole = hashlib.sha256()
+        chunks = []
+        for data in iter_chunks(f):
+            whole.update(data)
+            chunk = hashlib.sha256(data).hexdigest()
+            # Pinned like whole files: an old recipe may be freeing this chunk
+            self._pin(chunk)
+            pins.append(chunk)
+            chunk_path = self.object_path(chunk)
+            if not os.path.exists(chunk_path):
+                os.makedirs(os.path.dirname(chunk_path), exist_ok=True)
+                tmp_path = os.path.join(self.tmp_dir, f"{chunk}.{threading.get_ident()}")
+                with open(tmp_path, 'wb') as out:
+                    out.write(data)
+                os.replace(tmp_path, chunk_path)
+            chunks.append([chunk, len(data)])
+        return whole.hexdigest(), chunks
+
+    def _write_recipe(self, digest, chunks):
+        os.makedirs(os.path.dirname(self.object_path(digest)), exist_ok=True)
+        tmp_path = os.path.join(self.tmp_dir, f"{digest}.{threading.get_ident()}")
+        with open(tmp_path, 'w') as out:
+            json.dump(chunks, out, separators=(",", ":"))
+        os.replace(tmp_path, self.recipe_path(digest))
+
+    def read_recipe(self, digest):
+        """Return [[chunk digest, size], ...] of a chunked object, or None"""
+        try:
+            with open(self.recipe_path(digest), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _recipe_chunks(self, digest):
+        """Distinct chunks of a chunked object (nothing for a whole one)"""
+        chunks = self.read_recipe(digest)
+        return {chunk for chunk, _size in chunks} if chunks else set()
+
+    def open_object(self, digest):
+        """Open an object for reading, whether stored whole or as chunks"""
+        try:
+            return open(self.object_path(digest), 'rb')
+        except FileNotFoundError:
+            chunks = self.read_recipe(digest)
+            if chunks is None:
+                raise
+            return _ChunkedReader([self.object_path(chunk) for chunk, _size in chunks])
+
+    def _materialize(self, digest, dst_path, rel, mtime_ns, caps, size=0):
+        if size > MAX_CHUNK and not os.path.exists(self.object_path(digest)):
+            # Reassemble a chunked file; only one chunk is held at a time
+            with self.open_object(digest) as src, open(dst_path, 'wb') as out:
+                while True:
+                    data = src.read(MAX_CHUNK)
+                    if not data:
+                        break
+                    out.write(data)
+        else:
+            snapclone.copy_file(self.object_path(digest), dst_path, caps,
+                                snapclone.is_link_safe(rel, self.link_patterns))
+        os.utime(dst_path, ns=(mtime_ns, mtime_ns))
+
+    def snapshot(self, src_dir, name, rehash=False, progress=None, base=None, live=None):
+        """Store the contents of src_dir as snapshot `name`, replacing any old one.
+
+        The previous manifest of the same snapshot doubles as a file index:
+        files whose size and mtime are unchanged reuse the recorded hash and
+        are neither read nor copied. base names another snapshot of src_dir
+        whose entries take precedence in that index (a mirror kept in sync
+        in the background); if it is current, nothing needs to be read.
+        Pass rehash=True to hash every file.
+        live, a livesnap.LiveCopy, is for a folder the game may be writing:
+        files are read once at its rate on low-priority threads, and files
+        that changed during the copy are copied again until the tree holds
+        still (LiveSnapshotError if it never does).
+        Returns the CopyStats of the files that had to be hashed.
+        """
+        with phase("scan") as scan:
+            old_manifest = self.read_manifest(name)
+            index = {}
+            if not rehash:
+                for manifest in (old_manifest, base and self.read_manifest(base)):
+                    if manifest:
+                        index.update(manifest["files"])
+
+            files, dirs = scan_tree(src_dir)
+            entries = {}
+            changed = []
+            reused = []
+            for rel, st in files.items():
+                known = index.get(rel)
+                if known and known[1] == st.st_size and known[2] == st.st_mtime_ns:
+                    reused.append((rel, st, known))
+                else:
+                    changed.append((rel, st))
+            # Pin reused objects before checking them: a concurrent snapshot
+            # replacing `base` must not free them before our manifest commits
+            pins = [known[0] for _rel, _st, known in reused]
+            with self.lock:
+                for digest in pins:
+                    self._pin(digest)
+            for rel, st, known in reused:
+                if self.has_object(known[0]):
+                    entries[rel] = known
+                else:
+                    changed.append((rel, st))
+            scan.add(files=len(files))
+
+        caps = self._capabilities(src_dir, self.tmp_dir)
+        # Few workers for a live snapshot: the game needs the disk more
+        engine = self.engine if live is None else CopyEngine(live.workers)
+        try:
+            with phase("copy") as copy:
+                stats = self._ingest_files(engine, src_dir, changed, entries, caps, pins,
+                                           progress, live)
+                copy.add(stats=stats)
+            if live is not None:
+                with phase("settle") as settle:
+                    dirs = self._settle(engine, src_dir, files, entries, caps, pins, live)
+                    settle.add(files=live.retry_files, bytes=live.retry_bytes)
+        except BaseException:
+            # Drop whatever this aborted snapshot added and nobody else uses
+            with self.lock:
+                self._unpin(pins)
+                self._free_objects(pins)
+            raise
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "files": entries,
+            "dirs": sorted(dirs),
+        }
+        self._commit_manifest(name, manifest, pins)
+        return stats
+
+    def _ingest_files(self, engine, src_dir, changed, entries, caps, pins, progress=None,
+                      live=None):
+        """Hash and store (rel, stat) pairs into entries; returns CopyStats"""
+        tasks = []
+        for rel, st in changed:
+            path = os.path.join(src_dir, *rel.split("/"))
+            if live is None:
+                tasks.append((self._hash_and_ingest, (path, rel, caps, pins, st.st_size),
+                              st.st_size))
+            else:
+                tasks.append((live.wrap(self._ingest_live),
+                              (path, pins, live.limiter, st.st_size), st.st_size))
+        digests, stats = engine.run(tasks, progress)
+        for (rel, st), digest in zip(changed, digests):
+            # None: the game deleted the file after the scan
+            if digest is not None:
+                entries[rel] = [digest, st.st_size, st.st_mtime_ns]
+        return stats
+
+    def _settle(self, engine, src_dir, before, entries, caps, pins, live):
+        """Rescan after a live copy and copy again what changed; returns the final dirs"""
+        live.rounds = 1
+        while True:
+            after, dirs = scan_tree(src_dir)
+            for rel in [rel for rel in entries if rel not in after]:
+                del entries[rel]
+            changed = []
+            for rel, st in after.items():
+                old = before.get(rel)
+                if (rel not in entries or old is None or old.st_size != st.st_size or
+                        old.st_mtime_ns != st.st_mtime_ns):
+                    changed.append((rel, st))
+            if not changed:
+                return dirs
+            if live.rounds >= live.max_rounds:
+                raise LiveSnapshotError(
+                    f"{src_dir} was still changing after {live.rounds} passes")
+            live.rounds += 1
+            stats = self._ingest_files(engine, src_dir, changed, entries, caps, pins, live=live)
+            live.retry_files += stats.files
+            live.retry_bytes += stats.bytes
+            before = after
+
+    def _commit_manifest(self, name, manifest, pins):
+        """Make manifest snapshot `name`, replacing an old one, and drop the pins"""
+        with self.lock:
+            old_manifest = self.read_manifest(name)
+            with phase("metadata"):
+                self._begin()
+                self._write_json(self.manifest_path(name), manifest)
+                self._add_refs(manifest)
+                freed = self._drop_refs(old_manifest) if old_manifest else []
+                self._commit()
+                self._unpin(pins)
+            with phase("delete") as delete:
+                # Pinned objects the manifest does not use (copies a live
+                # snapshot replaced) are freed along with the old ones
+                delete.add(bytes=self._free_objects(list(freed) + pins))
+
+    # -- import ----------------------------------------------------------
+
+    def has_object(self, digest):
+        """Check whether an object is stored, whole or as chunks"""
+        return (os.path.exists(self.object_path(digest)) or
+                os.path.exists(self.recipe_path(digest)))
+
+    def add_object(self, digest, fileobj):
+        """Store an object read from fileobj, checking it really hashes to digest.
+
+        Returns the number of bytes written (0 if the object already exists).
+        """
+        # The digest names files in the store; refuse anything but a hash
+        if not DIGEST.fullmatch(digest):
+            raise ValueError(f"Not an object name: {digest!r}")
+        if self.has_object(digest):
+            return 0
+        obj_path = self.object_path(digest)
+        os.makedirs(os.path.dirname(obj_path), exist_ok=True)
+        tmp_path = os.path.join(self.tmp_dir, f"{digest}.{threading.get_ident()}")
+        check = hashlib.sha256()
+        written = 0
+        try:
+            with open(tmp_path, 'wb') as out:
+                while True:
+                    chunk = fileobj.read(HASH_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    check.update(chunk)
+                    out.write(chunk)
+                    written += len(chunk)
+            if check.hexdigest() != digest:
+                raise ValueError(f"Object {digest} is damaged")
+            os.replace(tmp_path, obj_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return written
+
+    def pin_manifest(self, manifest):
+        """Pin every object of a manifest that is about to be imported.
+
+        Existing objects can then not be freed by a concurrent delete before
+        import_snapshot() references them. Returns the pins.
+        """
+        pins = []
+        for digest, _size, _mtime in manifest["files"].values():
+            self._pin(digest)
+            pins.append(digest)
+        return pins
+
+    def release(self, pins):
+        """Undo pin_manifest() after a failed import, freeing unused objects"""
+        with self.lock:
+            self._unpin(pins)
+            self._free_objects(pins)
+
+    def import_snapshot(self, name, manifest, pins):
+        """Create snapshot `name` from a manifest whose objects were added.
+
+        The pins stay the caller's: if this raises, the caller release()s them.
+        """
+        check_manifest(manifest)
+        missing = {digest for digest in pins if not self.has_object(digest)}
+        if missing:
+            raise FileNotFoundError(f"{len(missing)} objects missing for snapshot {name}")
+        manifest = dict(manifest, version=MANIFEST_VERSION)
+        self._commit_manifest(name, manifest, pins)
+
+    def restore(self, name, dst_dir, progress=None, select=None):
+        """Recreate snapshot `name` as a plain directory tree at dst_dir.
+
+        select, if given, is a predicate over relative paths; only the
+        files and folders it accepts are restored.
+        """
+        manifest = self.read_manifest(name)
+        if manifest is None:
+            raise FileNotFoundError(f"Snapshot not found: {name}")
+
+        files = manifest["files"]
+        dirs = manifest["dirs"]
+        if select is not None:
+            files = {rel: entry for rel, entry in files.items() if select(rel)}
+            dirs = [rel for rel in dirs if select(rel)]
+            dirs += sorted({rel.rsplit("/", 1)[0] for rel in files if "/" in rel})
+        root = os.path.abspath(dst_dir)
+
+        def target(rel):
+            # Never follow a manifest path out of dst_dir, whatever wrote it
+            path = os.path.normpath(os.path.join(root, *rel.split("/")))
+            if not is_safe_rel(rel) or os.path.commonpath([root, path]) != root or path == root:
+                raise ValueError(f"Snapshot {name} has an unsafe path: {rel!r}")
+            return path
+
+        targets = {rel: target(rel) for rel in list(files) + list(dirs)}
+        os.makedirs(dst_dir, exist_ok=True)
+        for rel in dirs:
+            os.makedirs(targets[rel], exist_ok=True)
+        caps = self._capabilities(self.objects_dir, dst_dir)
+        with phase("copy") as copy:
+            _results, stats = self.engine.run(
+                [(self._materialize, (digest, targets[rel], rel, mtime_ns, caps, size), size)
+                 for rel, (digest, size, mtime_ns) in files.items()], progress)
+            copy.add(stats=stats)
+        return stats
+
+    def delete(self, name):
+        """Remove snapshot `name` and free objects no other snapshot uses"""
+        manifest = self.read_manifest(name)
+        if manifest is None:
+            return 0
+        with self.lock:
+            with phase("metadata"):
+                self._begin()
+                os.remove(self.manifest_path(name))
+                freed = self._drop_refs(manifest)
+                self._commit()
+            with phase("delete") as delete:
+                freed_bytes = self._free_objects(freed)
+                delete.add(bytes=freed_bytes)
+            return freed_bytes
+
+    def gc(self):
+        """Delete every object that is not referenced by any manifest.
+
+        Normal operations free objects eagerly; this sweep also catches
+        objects left behind by an interrupted snapshot. It runs when the
+        store is opened after a crash, and on request (``nsav gc``).
+        Returns the bytes freed.
+        """
+        with self.lock:
+            self.rebuild_refcounts()
+            freed_bytes = 0
+            for prefix in os.listdir(self.objects_dir):
+                prefix_dir = os.path.join(self.objects_dir, prefix)
+                for rest in os.listdir(prefix_dir):
+                    digest = prefix + rest.replace(RECIPE_SUFFIX, "")
+                    if digest not in self.refcounts and digest not in self.pinned:
+                        path = os.path.join(prefix_dir, rest)
+                        freed_bytes += os.path.getsize(path)
+                        os.remove(path)
+            if not self.pinned:
+                for path in self._stale_tmp():
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(path)
+            return freed_bytes
+
+    def stats(self):
+        """Return (object count, total stored bytes)"""
+        count = 0
+        total = 0
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            for rest in os.listdir(prefix_dir):
+                count += 1
+                total += os.path.getsize(os.path.join(prefix_dir, rest))
+        return count, total
+
+
+class _ChunkedReader:
+    """Sequential read() over the chunk files of a chunked object"""
+
+    def __init__(self, paths):
+        self.paths = iter(paths)
+        self.current = None
+
+    def read(self, size=-1):
+        parts = []
+        while size < 0 or size > 0:
+            if self.current is None:
+                path = next(self.paths, None)
+                if path is None:
+                    break
+                self.current = open(path, 'rb')
+            data = self.current.read(size)
+            if not data:
+                self.current.close()
+                self.current = None
+                continue
+            parts.append(data)
+            if size > 0:
+                size -= len(data)
+        return b"".join(parts)
+
+    def close(self):
+        if self.current is not None:
+            self.current.close()
+            self.current = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
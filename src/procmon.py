@@ -0,0 +1,204 @@
+# procmon.py
+# Noita Savior - cached Noita process detection
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Know whether Noita is running without scanning the process table each time.
+
+A full scan over every process is expensive, so the monitor remembers the
+PID once Noita has been found and afterwards only re-checks that single
+process. While Noita is not running a background thread rescans at a low
+rate. Listeners are told whenever the running state changes.
+"""
+import os
+import subprocess
+import threading
+import time
+
+# psutil is imported on first use; it is slow to import and optional
+_psutil = None
+
+PROCESS_NAMES = ("noita.exe",)
+POLL_INTERVAL = 1.0
+RESCAN_INTERVAL = 5.0
+
+
+def _load_psutil():
+    """Return the psutil module, or False if it is not installed"""
+    global _psutil
+    if _psutil is None:
+        try:
+            import psutil
+            _psutil = psutil
+        except ImportError:
+            _psutil = False
+    return _psutil
+
+
+def psutil_available():
+    """True if psutil can be used for process detection"""
+    return bool(_load_psutil())
+
+
+def _tasklist_scan(names):
+    """Fallback scan via the Windows tasklist command"""
+    try:
+        result = subprocess.run(['tasklist', '/FO', 'CSV', '/NH'],
+                                capture_output=True, text=True, timeout=5)
+    except (subprocess.TimeoutExpired, subprocess.CalledProcessError, OSError):
+        return None
+    for line in result.stdout.splitlines():
+        fields = [field.strip('"') for field in line.split('","')]
+        if len(fields) > 1 and fields[0].lower() in names:
+            try:
+                return int(fields[1])
+            except ValueError:
+                continue
+    return None
+
+
+def _proc_scan(names):
+    """Fallback scan via /proc on Linux (e.g. Noita under Proton)"""
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/comm", 'r') as f:
+                if f.read().strip().lower() in names:
+                    return int(entry)
+        except OSError:
+            continue
+    return None
+
+
+def find_pid(names=PROCESS_NAMES):
+    """Scan the whole process table and return the PID of Noita, or None"""
+    names = tuple(name.lower() for name in names)
+    psutil = _load_psutil()
+    if psutil:
+        try:
+            for proc in psutil.process_iter(['pid', 'name']):
+                if proc.info['name'] and proc.info['name'].lower() in names:
+                    return proc.info['pid']
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            pass
+        return None
+    if os.name == 'nt':
+        return _tasklist_scan(names)
+    if os.path.isdir("/proc"):
+        return _proc_scan(names)
+    return None
+
+
+def pid_matches(pid, names=PROCESS_NAMES):
+    """Check that pid is still alive and still belongs to Noita"""
+    names = tuple(name.lower() for name in names)
+    psutil = _load_psutil()
+    if psutil:
+        try:
+            return psutil.Process(pid).name().lower() in names
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return False
+    if os.path.isdir("/proc"):
+        try:
+            with open(f"/proc/{pid}/comm", 'r') as f:
+                return f.read().strip().lower() in names
+        except OSError:
+            return False
+    # Without psutil or /proc a PID can only be confirmed by another scan
+    return find_pid(names) == pid
+
+
+class ProcessMonitor:
+    """Cached running/not-running state of the Noita process"""
+
+    def __init__(self, names=PROCESS_NAMES, poll_interval=POLL_INTERVAL,
+                 rescan_interval=RESCAN_INTERVAL):
+        self.names = tuple(names)
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.pid = None
+        self.running = False
+        self.last_scan = None
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def add_listener(self, callback):
+        """Call callback(running) from the monitor thread whenever the state changes"""
+        self.listeners.append(callback)
+
+    def _update(self, pid):
+        with self.lock:
+            changed = (pid is not None) != self.running
+            self.pid = pid
+            self.running = pid is not None
+        if changed:
+            for callback in self.listeners:
+                try:
+                    callback(self.running)
+                except Exception as e:
+                    print(f"Process monitor listener failed: {e}")
+
+    def refresh(self, force_scan=False):
+        """Update the state: re-check the known PID or scan if due"""
+        pid = self.pid
+        if pid is not None and pid_matches(pid, self.names):
+            self._update(pid)
+            return True
+        now = time.monotonic()
+        if (force_scan or pid is not None or self.last_scan is None or
+                now - self.last_scan >= self.rescan_interval):
+            self.last_scan = now
+            self._update(find_pid(self.names))
+        return self.running
+
+    def is_running(self, max_age=None):
+        """Return whether Noita runs, for guarding file operations.
+
+        A known PID is always re-verified (cheap). Without one the cached
+        state is trusted if the last scan is younger than max_age
+        (default: the rescan interval), otherwise a scan is done now.
+        """
+        if self.pid is not None:
+            return self.refresh()
+        if max_age is None:
+            max_age = self.rescan_interval
+        if (self.thread is None or self.last_scan is None or
+                time.monotonic() - self.last_scan > max_age):
+            return self.refresh(force_scan=True)
+        return self.running
+
+    def start(self):
+        """Start polling on a daemon thread"""
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self._loop, name="process-monitor", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the polling thread"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _loop(self):
+        while not self.stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Process monitor error: {e}")
+            self.stop_event.wait(self.poll_interval)
@@ -0,0 +1,185 @@
+# retention.py
+# Noita Savior - retention policy for automatic backups
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Thin out the auto_backup_* folders created before every load.
+
+A backup survives if it is one of the newest ``keep_last`` backups, or
+the newest backup of one of the last ``keep_hourly`` hours or
+``keep_daily`` days that have backups. The survivors are then trimmed,
+oldest first, until they fit into ``max_bytes``. The newest backup is
+never removed.
+
+Backups never change once written, so their sizes are measured once and
+cached in a small JSON index instead of walking every tree on each run.
+"""
+import json
+import os
+import re
+import shutil
+import threading
+from datetime import datetime
+
+BACKUP_PATTERN = re.compile(r"^auto_backup_(\d{8}_\d{6})(?:_\d+)?$")
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+
+class RetentionPolicy:
+    """Limits applied to the automatic backups; 0 disables a limit"""
+
+    def __init__(self, keep_last=20, keep_hourly=24, keep_daily=14, max_bytes=0):
+        self.keep_last = keep_last
+        self.keep_hourly = keep_hourly
+        self.keep_daily = keep_daily
+        self.max_bytes = max_bytes
+
+
+def tree_size(path):
+    """Total size in bytes of all files below path"""
+    total = 0
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    total += entry.stat(follow_symlinks=False).st_size
+    return total
+
+
+def list_backups(backup_dir):
+    """Return [(timestamp, name)] of all automatic backups, newest first"""
+    backups = []
+    for name in os.listdir(backup_dir):
+        match = BACKUP_PATTERN.match(name)
+        if match:
+            try:
+                backups.append((datetime.strptime(match.group(1), TIMESTAMP_FORMAT), name))
+            except ValueError:
+                continue
+    backups.sort(reverse=True)
+    return backups
+
+
+class SizeIndex:
+    """Cached byte size of every backup folder, persisted as JSON"""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, 'r') as f:
+                self.sizes = json.load(f)
+        except (OSError, ValueError):
+            self.sizes = {}
+
+    def size_of(self, backup_dir, name):
+        """Return the size of a backup, measuring it only the first time"""
+        if name not in self.sizes:
+            self.sizes[name] = tree_size(os.path.join(backup_dir, name))
+        return self.sizes[name]
+
+    def prune(self, names):
+        """Forget backups that no longer exist"""
+        for name in set(self.sizes) - set(names):
+            del self.sizes[name]
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.sizes, f)
+        os.replace(tmp_path, self.path)
+
+
+def select_expired(backups, sizes, policy):
+    """Return the names from backups (newest first) that the policy evicts"""
+    keep = set()
+    if policy.keep_last:
+        keep.update(name for _ts, name in backups[:policy.keep_last])
+    for limit, bucket in ((policy.keep_hourly, "%Y%m%d%H"), (policy.keep_daily, "%Y%m%d")):
+        seen = set()
+        for ts, name in backups:
+            key = ts.strftime(bucket)
+            if key not in seen and len(seen) < limit:
+                seen.add(key)
+                keep.add(name)
+    if backups:
+        keep.add(backups[0][1])
+    if not (policy.keep_last or policy.keep_hourly or policy.keep_daily):
+        keep.update(name for _ts, name in backups)
+
+    if policy.max_bytes:
+        kept = [name for _ts, name in backups if name in keep]
+        total = sum(sizes[name] for name in kept)
+        for name in reversed(kept[1:]):
+            if total <= policy.max_bytes:
+                break
+            keep.discard(name)
+            total -= sizes[name]
+
+    return [name for _ts, name in backups if name not in keep]
+
+
+class RetentionManager:
+    """Apply a RetentionPolicy to a backup folder, optionally in the background"""
+
+    def __init__(self, backup_dir, policy, index_file=None, trash=None):
+        self.backup_dir = backup_dir
+        self.policy = policy
+        # Expired backups are renamed into this Trash instead of deleted here
+        self.trash = trash
+        self.index = SizeIndex(index_file or os.path.join(backup_dir, ".backup_sizes.json"))
+        self.lock = threading.Lock()
+
+    def run(self):
+        """Evict expired backups now and return (removed names, freed bytes)"""
+        with self.lock:
+            backups = list_backups(self.backup_dir)
+            names = [name for _ts, name in backups]
+            self.index.prune(names)
+            sizes = {name: self.index.size_of(self.backup_dir, name) for name in names}
+            removed = []
+            freed = 0
+            for name in select_expired(backups, sizes, self.policy):
+                try:
+                    if self.trash:
+                        self.trash.discard(os.path.join(self.backup_dir, name), sizes[name])
+                    else:
+                        shutil.rmtree(os.path.join(self.backup_dir, name))
+                except OSError as e:
+                    print(f"Could not remove old backup {name}: {e}")
+                    continue
+                removed.append(name)
+                freed += sizes[name]
+                del self.index.sizes[name]
+            self.index.save()
+        if removed:
+            print(f"Retention removed {len(removed)} auto-backups, freed {freed / 1048576:.1f} MB")
+        return removed, freed
+
+    def run_in_background(self):
+        """Start run() on a daemon thread; overlapping requests are skipped"""
+        if self.lock.locked():
+            return None
+        thread = threading.Thread(target=self._run_quietly, name="backup-retention",
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    def _run_quietly(self):
+        try:
+            self.run()
+        except Exception as e:
+            print(f"Backup retention failed: {e}")
@@ -0,0 +1,130 @@
+# runsummary.py
+# Noita Savior - run details read from a saved game
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Pull a short summary of the run (gold, health, depth, playtime, seed,
+kills) out of a save so slots can be told apart without loading them.
+
+The values come from attributes of a few elements of ``player.xml`` and
+of the newest ``stats/sessions/*_stats.xml``. Both are read with
+iterparse and left as soon as every wanted attribute was seen, so the
+rest of a large player entity (wands, inventory) is never parsed. The
+encrypted ``.salakieli`` files are not read. Anything missing or
+unparsable is simply left out of the summary.
+"""
+import xml.etree.ElementTree as ET
+
+PLAYER_FILE = "player.xml"
+SESSIONS_DIR = "stats/sessions/"
+SESSION_SUFFIX = "_stats.xml"
+
+# tag -> {attribute: summary field}; the first element with that tag wins,
+# which in player.xml is the player's own component, not an item's
+PLAYER_FIELDS = {
+    "WalletComponent": {"money": "gold"},
+    "DamageModelComponent": {"hp": "hp", "max_hp": "max_hp"},
+    "_Transform": {"position.y": "depth"},
+}
+# Attributes of the session stats element
+SESSION_FIELDS = {"world_seed": "seed", "playtime": "playtime", "enemies_killed": "kills"}
+
+# Noita keeps health in units of 25 HP
+HP_SCALE = 25
+
+
+def _number(text):
+    try:
+        value = float(text)
+    except (TypeError, ValueError):
+        return None
+    return int(value) if value.is_integer() else round(value, 2)
+
+
+def _scan(fileobj, fields, summary):
+    """Copy wanted attributes into summary; fields maps tag (None = root) -> attributes"""
+    wanted = dict(fields)
+    try:
+        for _event, elem in ET.iterparse(fileobj, events=("start",)):
+            attributes = wanted.pop(elem.tag, None)
+            if attributes is None and None in wanted:
+                attributes = wanted.pop(None)
+            for name, field in (attributes or {}).items():
+                value = _number(elem.get(name))
+                if value is not None:
+                    summary[field] = value
+            if not wanted:
+                break
+    except ET.ParseError:
+        pass
+
+
+def latest_session(rels):
+    """Relative path of the newest session stats file (named by date) or None"""
+    sessions = [rel for rel in rels
+                if rel.startswith(SESSIONS_DIR) and rel.endswith(SESSION_SUFFIX)]
+    return max(sessions, default=None)
+
+
+def extract(rels, open_file):
+    """Return the run summary of a save.
+
+    rels are the save's relative file paths; open_file(rel) returns a
+    binary file object for one of them.
+    """
+    summary = {}
+    sources = [(PLAYER_FILE, PLAYER_FIELDS)]
+    session = latest_session(rels)
+    if session:
+        sources.append((session, {None: SESSION_FIELDS}))
+    rels = set(rels)
+    for rel, fields in sources:
+        if rel not in rels:
+            continue
+        try:
+            with open_file(rel) as f:
+                _scan(f, fields, summary)
+        except OSError:
+            continue
+    if "seed" in summary:
+        summary["seed"] = str(summary["seed"])
+    return summary
+
+
+def format_playtime(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def describe(summary, long=False):
+    """One-line text for the slot list; long adds the seed and kills"""
+    parts = []
+    if "gold" in summary:
+        parts.append(f"${summary['gold']}")
+    if "hp" in summary:
+        hp = f"{summary['hp'] * HP_SCALE:.0f}"
+        if "max_hp" in summary:
+            hp += f"/{summary['max_hp'] * HP_SCALE:.0f}"
+        parts.append(f"{hp} HP")
+    if "depth" in summary:
+        parts.append(f"depth {summary['depth']:.0f}")
+    if "playtime" in summary:
+        parts.append(format_playtime(summary["playtime"]))
+    if long:
+        if "kills" in summary:
+            parts.append(f"{summary['kills']} kills")
+        if "seed" in summary:
+            parts.append(f"seed {summary['seed']}")
+    return "  ".join(parts)
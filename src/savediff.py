@@ -0,0 +1,115 @@
+# savediff.py
+# Noita Savior - differences between slots and the live save
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Compare two save trees from their file indexes.
+
+An index maps a relative path to (size, mtime_ns, sha256 or None). Slot
+indexes come straight from the store manifest or the archive index, which
+both record a hash per file, so comparing two slots never opens a file.
+The live save only has size and mtime; a file is hashed only when its size
+matches but its mtime does not, and the caller can cache those hashes.
+"""
+
+TOP_LEVEL = "(top level)"
+
+
+def group_of(rel):
+    """The top-level folder a file belongs to (world, persistent, stats, ...)"""
+    head, sep, _rest = rel.partition("/")
+    return head if sep else TOP_LEVEL
+
+
+class SaveDiff:
+    """Files added, removed and modified going from an old tree to a new one"""
+
+    def __init__(self):
+        self.added = []  # (rel, new size)
+        self.removed = []  # (rel, old size)
+        self.modified = []  # (rel, old size, new size)
+        self.unchanged = 0
+        self.hashed = 0  # files that had to be read to decide
+
+    @property
+    def changed_files(self):
+        return len(self.added) + len(self.removed) + len(self.modified)
+
+    @property
+    def bytes_delta(self):
+        """Growth of the tree in bytes (negative if it shrinks)"""
+        return (sum(size for _rel, size in self.added) -
+                sum(size for _rel, size in self.removed) +
+                sum(new - old for _rel, old, new in self.modified))
+
+    def changes(self):
+        """Yield (status, rel, old size, new size) sorted by path"""
+        rows = ([("added", rel, None, size) for rel, size in self.added] +
+                [("removed", rel, size, None) for rel, size in self.removed] +
+                [("modified", rel, old, new) for rel, old, new in self.modified])
+        rows.sort(key=lambda row: row[1])
+        return rows
+
+    def groups(self):
+        """Return {group: summary} with counts, byte delta and the changes"""
+        groups = {}
+        for status, rel, old, new in self.changes():
+            group = groups.setdefault(group_of(rel), {"added": 0, "removed": 0,
+                                                      "modified": 0, "bytes": 0,
+                                                      "changes": []})
+            group[status] += 1
+            group["bytes"] += (new or 0) - (old or 0)
+            group["changes"].append((status, rel, old, new))
+        return groups
+
+    def __str__(self):
+        if not self.changed_files:
+            return f"identical ({self.unchanged} files)"
+        return (f"{len(self.added)} added, {len(self.removed)} removed, "
+                f"{len(self.modified)} modified, {self.bytes_delta / 1048576:+.1f} MB")
+
+
+def diff_indexes(old, new, hash_old=None, hash_new=None):
+    """Compare two indexes and return a SaveDiff.
+
+    hash_old/hash_new are called as hash(rel) for files whose hash is not
+    in the index and cannot be decided from size and mtime alone.
+    """
+    diff = SaveDiff()
+    for rel, (old_size, old_mtime, old_digest) in old.items():
+        entry = new.get(rel)
+        if entry is None:
+            diff.removed.append((rel, old_size))
+            continue
+        new_size, new_mtime, new_digest = entry
+        if old_size != new_size:
+            same = False
+        elif old_digest and new_digest:
+            same = old_digest == new_digest
+        elif old_mtime == new_mtime:
+            # The same rule the store uses to skip unchanged files on save
+            same = True
+        else:
+            if not old_digest:
+                old_digest = hash_old(rel)
+            if not new_digest:
+                new_digest = hash_new(rel)
+            diff.hashed += 1
+            same = old_digest == new_digest
+        if same:
+            diff.unchanged += 1
+        else:
+            diff.modified.append((rel, old_size, new_size))
+    diff.added = [(rel, entry[0]) for rel, entry in new.items() if rel not in old]
+    return diff
@@ -0,0 +1,179 @@
+# saveprofiles.py
+# Noita Savior - save folders of every installed Noita
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Known Noita save folders ("save profiles"), each with its own slots.
+
+A scan looks in the LocalLow folders for ``Nolla_Games_Noita*`` (the
+regular game, the beta branch and other installs that get their own
+folder) and in each of those for ``saveNN`` folders. The main game's
+``save00`` is the default profile, which keeps the slots.json and
+backups layout of single-profile versions; other folders get ids such
+as ``save01`` or ``beta-save00``. Folders elsewhere (a second install
+under Wine, a copy on another disk) can be added by hand.
+
+The result is written to ``save_profiles.json`` and reused on later
+starts. The folders are only scanned again on request, or when a cached
+folder has disappeared.
+"""
+import json
+import os
+import re
+import threading
+import time
+
+PROFILES_VERSION = 1
+DEFAULT_PROFILE = "default"
+GAME_FOLDER = "Nolla_Games_Noita"
+SAVE_FOLDER = re.compile(r"save\d\d")
+PROFILE_ID = re.compile(r"[a-z0-9][a-z0-9_-]*")
+
+
+def profile_id(text):
+    """Turn a user-given name into a profile id (lower case, no separators)"""
+    slug = re.sub(r"[^a-z0-9_-]+", "-", text.lower()).strip("-_")
+    if not slug:
+        raise ValueError(f"Not usable as a profile id: {text!r}")
+    return slug
+
+
+def scan(roots, prepare=None):
+    """Return {profile id: {"name", "path"}} for the save folders under roots.
+
+    roots are LocalLow-style folders holding Nolla_Games_Noita*.
+    prepare(path), if given, is called for every saveNN candidate before
+    it is checked, so a folder mid-swap can be put back first.
+    """
+    found = {}
+    for root in roots:
+        try:
+            games = sorted(os.listdir(root))
+        except OSError:
+            continue
+        for game in games:
+            if not game.startswith(GAME_FOLDER):
+                continue
+            game_dir = os.path.join(root, game)
+            variant = re.sub(r"[^a-z0-9]+", "", game[len(GAME_FOLDER):].lower())
+            try:
+                entries = sorted(os.listdir(game_dir))
+            except OSError:
+                continue
+            # A load interrupted mid-swap leaves only saveNN.nsav_staging
+            names = sorted({entry.split(".", 1)[0] for entry in entries
+                            if SAVE_FOLDER.fullmatch(entry.split(".", 1)[0])})
+            for name in names:
+                path = os.path.join(game_dir, name)
+                if prepare:
+                    prepare(path)
+                if not os.path.isdir(path):
+                    continue
+                if not variant and name == "save00":
+                    key = DEFAULT_PROFILE
+                else:
+                    key = f"{variant}-{name}" if variant else name
+                if key in found:
+                    # Same game folder under two roots (e.g. %AppData% and ~)
+                    continue
+                label = f"{name} ({game[len(GAME_FOLDER):].strip('_- ')})" if variant else name
+                found[key] = {"name": label, "path": path}
+    return found
+
+
+class SaveProfiles:
+    """Cached profile list persisted in save_profiles.json"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.profiles = {}
+        self.scanned = None
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if data.get("version") == PROFILES_VERSION:
+                self.profiles = {key: value for key, value in data["profiles"].items()
+                                 if PROFILE_ID.fullmatch(key) and value.get("path")}
+                self.scanned = data.get("scanned")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            # Only a cache of the scan plus hand-added folders; rescan
+            print(f"Error reading {self.path}, rescanning save folders: {e}")
+
+    def _write(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": PROFILES_VERSION, "scanned": self.scanned,
+                       "profiles": self.profiles}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def rescan(self, roots, prepare=None):
+        """Scan for save folders again; hand-added profiles are kept"""
+        found = scan(roots, prepare)
+        with self.lock:
+            for key, entry in list(self.profiles.items()):
+                if not entry.get("added") and key not in found:
+                    del self.profiles[key]
+            for key, entry in found.items():
+                if not self.profiles.get(key, {}).get("added"):
+                    self.profiles[key] = entry
+            self.scanned = time.strftime("%Y-%m-%d %H:%M:%S")
+            self._write()
+        return self.profiles
+
+    def resolve(self, key, roots, prepare=None):
+        """Cached save folder of a profile.
+
+        The folders are only scanned before the first scan ever ran and
+        when a cached folder has gone; a profile the last scan did not
+        find, the default one included, stays unknown until rescan().
+        """
+        entry = self.profiles.get(key)
+        if entry:
+            if prepare:
+                prepare(entry["path"])
+            if os.path.isdir(entry["path"]) or entry.get("added"):
+                return entry["path"]
+        elif self.scanned:
+            # A scan already ran and did not find it; no point in probing again
+            return None
+        self.rescan(roots, prepare)
+        entry = self.profiles.get(key)
+        return entry["path"] if entry else None
+
+    def add(self, key, path, name=None):
+        """Register a save folder outside the scanned locations"""
+        if not PROFILE_ID.fullmatch(key):
+            raise ValueError(f"Profile ids are lower case letters, digits, - and _: {key}")
+        with self.lock:
+            self.profiles[key] = {"name": name or key, "path": os.path.abspath(path),
+                                  "added": True}
+            self._write()
+
+    def remove(self, key):
+        """Forget a profile; its slots stay in the backups folder"""
+        with self.lock:
+            if self.profiles.pop(key, None) is None:
+                raise KeyError(key)
+            self._write()
+
+    def ordered(self):
+        """(id, entry) pairs with the default profile first"""
+        return sorted(self.profiles.items(), key=lambda item: (item[0] != DEFAULT_PROFILE,
+                                                               item[0]))
@@ -0,0 +1,209 @@
+# savewatch.py
+# Noita Savior - polling watcher for automatic snapshots
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Notice when Noita has finished writing its save folder.
+
+The watcher keeps a cached index of every directory in the save folder.
+Each tick stats only the directories themselves and rescans the ones
+whose mtime moved, since adding, removing or replacing a file changes
+its directory. Files rewritten in place do not touch their directory, so
+every ``deep_every`` ticks all directories are rescanned as well.
+
+Once changes were seen and the folder then stayed quiet for
+``quiet_seconds``, the ``on_settled`` callback fires once.
+"""
+import os
+import threading
+import time
+
+POLL_SECONDS = 2.0
+QUIET_SECONDS = 10.0
+DEEP_EVERY = 15
+
+
+class TreeIndex:
+    """Incrementally refreshed listing of a directory tree"""
+
+    def __init__(self, root):
+        self.root = root
+        # rel_dir -> (dir mtime_ns, {name: (is_dir, size, mtime_ns)})
+        self.dirs = {}
+        self.rebuild()
+
+    def _abs(self, rel_dir):
+        return os.path.join(self.root, *rel_dir.split("/")) if rel_dir else self.root
+
+    def _list(self, rel_dir):
+        entries = {}
+        with os.scandir(self._abs(rel_dir)) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        entries[entry.name] = (True, 0, 0)
+                    else:
+                        st = entry.stat(follow_symlinks=False)
+                        entries[entry.name] = (False, st.st_size, st.st_mtime_ns)
+                except OSError:
+                    continue
+        return entries
+
+    def _add_tree(self, rel_dir):
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            try:
+                mtime_ns = os.stat(self._abs(current)).st_mtime_ns
+                entries = self._list(current)
+            except OSError:
+                continue
+            self.dirs[current] = (mtime_ns, entries)
+            for name, (is_dir, _size, _mtime) in entries.items():
+                if is_dir:
+                    stack.append(f"{current}/{name}" if current else name)
+
+    def _drop_tree(self, rel_dir):
+        prefix = rel_dir + "/"
+        for key in [key for key in self.dirs if key == rel_dir or key.startswith(prefix)]:
+            del self.dirs[key]
+
+    def rebuild(self):
+        """Forget everything and index the whole tree again"""
+        self.dirs = {}
+        if os.path.isdir(self.root):
+            self._add_tree("")
+
+    def _rescan(self, rel_dir, mtime_ns):
+        """Refresh one directory's listing and return the number of changes"""
+        old_entries = self.dirs[rel_dir][1]
+        try:
+            entries = self._list(rel_dir)
+        except OSError:
+            self._drop_tree(rel_dir)
+            return 1
+        self.dirs[rel_dir] = (mtime_ns, entries)
+        changes = 0
+        for name in set(old_entries) | set(entries):
+            old = old_entries.get(name)
+            new = entries.get(name)
+            if old == new:
+                continue
+            changes += 1
+            child = f"{rel_dir}/{name}" if rel_dir else name
+            if old is not None and old[0]:
+                self._drop_tree(child)
+            if new is not None and new[0]:
+                self._add_tree(child)
+        return changes
+
+    def refresh(self, deep=False):
+        """Bring the index up to date and return how many entries changed"""
+        if not self.dirs:
+            if not os.path.isdir(self.root):
+                return 0
+            self._add_tree("")
+            return 1
+        changes = 0
+        for rel_dir in list(self.dirs):
+            if rel_dir not in self.dirs:
+                continue  # dropped together with a parent during this pass
+            try:
+                mtime_ns = os.stat(self._abs(rel_dir)).st_mtime_ns
+            except OSError:
+                self._drop_tree(rel_dir)
+                changes += 1
+                continue
+            if deep or mtime_ns != self.dirs[rel_dir][0]:
+                changes += self._rescan(rel_dir, mtime_ns)
+        return changes
+
+
+class SaveWatcher:
+    """Background poller that calls on_settled after Noita finished writing"""
+
+    def __init__(self, root, on_settled, poll_seconds=POLL_SECONDS,
+                 quiet_seconds=QUIET_SECONDS, deep_every=DEEP_EVERY):
+        self.root = root
+        self.on_settled = on_settled
+        self.poll_seconds = poll_seconds
+        self.quiet_seconds = quiet_seconds
+        self.deep_every = deep_every
+        self.index = None
+        self.pending_since = None
+        self.last_change = None
+        self.ticks = 0
+        self.cpu_seconds = 0.0
+        self.started = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def cpu_fraction(self):
+        """Share of one core spent polling since start()"""
+        if not self.started:
+            return 0.0
+        wall = time.monotonic() - self.started
+        return self.cpu_seconds / wall if wall > 0 else 0.0
+
+    def reset(self):
+        """Re-baseline after our own writes (e.g. loading a slot)"""
+        with self.lock:
+            self.index = TreeIndex(self.root)
+            self.pending_since = None
+            self.last_change = None
+
+    def tick(self):
+        """Run one poll; returns True if on_settled should fire"""
+        cpu_start = time.thread_time()
+        with self.lock:
+            if self.index is None:
+                self.index = TreeIndex(self.root)
+            self.ticks += 1
+            deep = self.deep_every and self.ticks % self.deep_every == 0
+            changes = self.index.refresh(deep=deep)
+            now = time.monotonic()
+            if changes:
+                self.last_change = now
+                if self.pending_since is None:
+                    self.pending_since = now
+            settled = (self.pending_since is not None and
+                       now - self.last_change >= self.quiet_seconds)
+            if settled:
+                self.pending_since = None
+        self.cpu_seconds += time.thread_time() - cpu_start
+        return settled
+
+    def start(self):
+        """Start polling on a daemon thread"""
+        if self.thread is not None:
+            return
+        self.started = time.monotonic()
+        self.thread = threading.Thread(target=self._loop, name="save-watcher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the polling thread"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _loop(self):
+        while not self.stop_event.wait(self.poll_seconds):
+            try:
+                if self.tick():
+                    self.on_settled()
+            except Exception as e:
+                print(f"Save watcher error: {e}")
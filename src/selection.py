@@ -0,0 +1,64 @@
+# selection.py
+# Noita Savior - choosing parts of a save for a partial restore
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Select files of a save by subtree or glob pattern.
+
+A pattern is a '/'-separated path relative to save00. A plain path such
+as ``persistent`` selects that file or everything below that folder;
+patterns with wildcards are matched with fnmatch against the whole
+relative path (``stats/sessions/*.xml``). Preset names expand to the
+parts of a Noita save that belong together.
+"""
+import fnmatch
+
+PRESETS = {
+    # Progress, unlocks and the enemy/spell/perk discovery flags
+    "persistent": ("persistent",),
+    # The current run: terrain, entities and the player
+    "world": ("world", "player.xml", "world_state.xml"),
+    "stats": ("stats",),
+}
+
+_WILDCARDS = set("*?[")
+
+
+def expand(patterns):
+    """Replace preset names by their patterns and normalize separators"""
+    expanded = []
+    for pattern in patterns:
+        for item in PRESETS.get(pattern, (pattern,)):
+            item = item.replace("\\", "/").strip("/")
+            if item and item not in expanded:
+                expanded.append(item)
+    return expanded
+
+
+def compile_selection(patterns):
+    """Return a predicate telling whether a relative path is selected"""
+    patterns = expand(patterns)
+    if not patterns:
+        raise ValueError("Nothing selected to restore")
+    prefixes = tuple(p for p in patterns if not _WILDCARDS & set(p))
+    globs = [p for p in patterns if _WILDCARDS & set(p)]
+
+    def selected(rel):
+        for prefix in prefixes:
+            if rel == prefix or rel.startswith(prefix + "/"):
+                return True
+        return any(fnmatch.fnmatchcase(rel, pattern) for pattern in globs)
+
+    selected.patterns = patterns
+    return selected
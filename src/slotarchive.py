@@ -0,0 +1,327 @@
+# slotarchive.py
+# Noita Savior - compressed single-file slot archives
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Compressed slot archives.
+
+All files of a save are concatenated into one logical stream which is cut
+into fixed size blocks. Every block is compressed on its own, so blocks
+are compressed and decompressed in parallel, memory use is bounded by the
+number of blocks in flight, and a single file can be read by decompressing
+only the blocks it overlaps.
+
+Layout::
+
+    MAGIC | block 0 | block 1 | ... | index (zlib JSON) | footer
+
+The footer holds the index offset and length followed by MAGIC again.
+"""
+import hashlib
+import json
+import lzma
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from copyengine import CopyStats, DEFAULT_WORKERS
+from objstore import scan_tree
+
+MAGIC = b"NSAVARC1"
+FOOTER = struct.Struct("<QQ8s")
+FORMAT_VERSION = 1
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+READ_SIZE = 1024 * 1024
+
+CODECS = {
+    "zlib": (lambda data, level: zlib.compress(data, 6 if level is None else level),
+             zlib.decompress),
+    "lzma": (lambda data, level: lzma.compress(data, preset=1 if level is None else level),
+             lzma.decompress),
+}
+
+
+class ArchiveError(Exception):
+    """Raised when a slot archive is missing or damaged"""
+
+
+class _BlockWriter:
+    """Compress blocks on a pool while writing them out strictly in order"""
+
+    def __init__(self, f, codec, level, workers):
+        self.f = f
+        self.compress = CODECS[codec][0]
+        self.level = level
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.pending = deque()
+        self.max_pending = workers * 2
+        self.blocks = []
+
+    def submit(self, data):
+        self.pending.append((len(data), self.pool.submit(self.compress, data, self.level)))
+        while len(self.pending) >= self.max_pending:
+            self._write_oldest()
+
+    def _write_oldest(self):
+        raw_len, future = self.pending.popleft()
+        payload = future.result()
+        self.blocks.append([self.f.tell(), len(payload), raw_len])
+        self.f.write(payload)
+
+    def close(self):
+        try:
+            while self.pending:
+                self._write_oldest()
+        finally:
+            self.pool.shutdown()
+
+
+def write_archive(src_dir, path, codec="zlib", level=None, workers=None,
+                  block_size=DEFAULT_BLOCK_SIZE, progress=None):
+    """Pack src_dir into a compressed archive at path and return CopyStats.
+
+    The archive is written to a temporary file and renamed into place, so
+    an existing archive is only replaced once the new one is complete.
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown archive codec: {codec}")
+    stats = CopyStats()
+    start = time.perf_counter()
+    files, dirs = scan_tree(src_dir)
+    total_bytes = sum(st.st_size for st in files.values())
+    entries = {}
+    tmp_path = f"{path}.tmp"
+
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            writer = _BlockWriter(f, codec, level, workers or DEFAULT_WORKERS)
+            buffer = bytearray()
+            offset = 0
+            try:
+                for rel, st in sorted(files.items()):
+                    digest = hashlib.sha256()
+                    size = 0
+                    with open(os.path.join(src_dir, *rel.split("/")), 'rb') as src:
+                        while True:
+                            chunk = src.read(READ_SIZE)
+                            if not chunk:
+                                break
+                            digest.update(chunk)
+                            buffer += chunk
+                            size += len(chunk)
+                            while len(buffer) >= block_size:
+                                writer.submit(bytes(buffer[:block_size]))
+                                del buffer[:block_size]
+                    entries[rel] = [offset, size, st.st_mtime_ns, digest.hexdigest()]
+                    offset += size
+                    stats.files += 1
+                    stats.bytes += size
+                    if progress:
+                        progress(stats.files, stats.bytes, len(files), total_bytes)
+                if buffer:
+                    writer.submit(bytes(buffer))
+            finally:
+                writer.close()
+
+            index = {
+                "version": FORMAT_VERSION,
+                "codec": codec,
+                "block_size": block_size,
+                "blocks": writer.blocks,
+                "files": entries,
+                "dirs": sorted(dirs),
+            }
+            index_data = zlib.compress(json.dumps(index, separators=(",", ":")).encode("utf-8"))
+            index_offset = f.tell()
+            f.write(index_data)
+            f.write(FOOTER.pack(index_offset, len(index_data), MAGIC))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+class SlotArchive:
+    """Read access to a slot archive written by write_archive"""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ArchiveError(f"Not a slot archive: {path}")
+                f.seek(-FOOTER.size, os.SEEK_END)
+                index_offset, index_len, magic = FOOTER.unpack(f.read(FOOTER.size))
+                if magic != MAGIC:
+                    raise ArchiveError(f"Truncated slot archive: {path}")
+                f.seek(index_offset)
+                self.index = json.loads(zlib.decompress(f.read(index_len)).decode("utf-8"))
+        except (OSError, ValueError, zlib.error) as e:
+            raise ArchiveError(f"Cannot read slot archive {path}: {e}")
+        self.decompress = CODECS[self.index["codec"]][1]
+        self.block_size = self.index["block_size"]
+        self.blocks = self.index["blocks"]
+        self.files = self.index["files"]
+        self.dirs = self.index["dirs"]
+
+    def _read_block(self, f, number):
+        offset, length, raw_len = self.blocks[number]
+        f.seek(offset)
+        data = self.decompress(f.read(length))
+        if len(data) != raw_len:
+            raise ArchiveError(f"Corrupt block {number} in {self.path}")
+        return data
+
+    def read_file(self, rel):
+        """Return the contents of one file, decompressing only its blocks"""
+        offset, size, _mtime_ns, _digest = self.files[rel]
+        if size == 0:
+            return b""
+        first = offset // self.block_size
+        last = (offset + size - 1) // self.block_size
+        with open(self.path, 'rb') as f:
+            data = b"".join(self._read_block(f, n) for n in range(first, last + 1))
+        start = offset - first * self.block_size
+        return data[start:start + size]
+
+    def _iter_blocks(self, workers, numbers=None):
+        """Yield (number, decompressed block) in order with a bounded read-ahead.
+
+        numbers limits the blocks read to an ascending list of block numbers.
+        """
+        local = threading.local()
+
+        def load(number):
+            if not hasattr(local, "f"):
+                local.f = open(self.path, 'rb')
+                handles.append(local.f)
+            return self._read_block(local.f, number)
+
+        handles = []
+        pending = deque()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                try:
+                    for number in (range(len(self.blocks)) if numbers is None else numbers):
+                        pending.append((number, pool.submit(load, number)))
+                        if len(pending) >= workers * 2:
+                            number, future = pending.popleft()
+                            yield number, future.result()
+                    while pending:
+                        number, future = pending.popleft()
+                        yield number, future.result()
+                finally:
+                    for _number, future in pending:
+                        future.cancel()
+        finally:
+            for handle in handles:
+                handle.close()
+
+    def iter_files(self, workers=None, select=None):
+        """Yield (rel, index entry, chunks) in archive order.
+
+        chunks yields the file's bytes as memoryviews and has to be consumed
+        before the next file is requested. With select (a predicate over
+        relative paths) only the blocks holding selected files are read.
+        Memory stays bounded by the block read-ahead.
+        """
+        files = self.files
+        if select is not None:
+            files = {rel: entry for rel, entry in files.items() if select(rel)}
+        ordered = sorted(files.items(), key=lambda item: item[1][0])
+        numbers = None
+        if select is not None:
+            numbers = sorted({number for _rel, (offset, size, _mtime, _digest) in ordered
+                              if size
+                              for number in range(offset // self.block_size,
+                                                  (offset + size - 1) // self.block_size + 1)})
+        blocks = self._iter_blocks(workers or DEFAULT_WORKERS, numbers)
+        current = [-1, memoryview(b"")]
+
+        def chunks(offset, size):
+            position = offset
+            remaining = size
+            while remaining:
+                wanted = position // self.block_size
+                while current[0] < wanted:
+                    try:
+                        number, data = next(blocks)
+                    except StopIteration:
+                        raise ArchiveError(f"Truncated slot archive: {self.path}")
+                    current[:] = [number, memoryview(data)]
+                block_pos = position - wanted * self.block_size
+                take = min(remaining, len(current[1]) - block_pos)
+                if take <= 0:
+                    raise ArchiveError(f"Corrupt block {wanted} in {self.path}")
+                yield current[1][block_pos:block_pos + take]
+                position += take
+                remaining -= take
+
+        try:
+            for rel, entry in ordered:
+                yield rel, entry, chunks(entry[0], entry[1])
+        finally:
+            blocks.close()
+
+    def extract_to(self, dst_dir, workers=None, progress=None, select=None):
+        """Stream the archive back into dst_dir and return CopyStats.
+
+        select, if given, is a predicate over relative paths; only the
+        files and folders it accepts are extracted, and only the blocks
+        holding them are decompressed.
+        """
+        stats = CopyStats()
+        start = time.perf_counter()
+        dirs = self.dirs
+        if select is not None:
+            dirs = [rel for rel in dirs if select(rel)]
+            dirs += sorted({rel.rsplit("/", 1)[0] for rel in self.files
+                            if "/" in rel and select(rel)})
+        os.makedirs(dst_dir, exist_ok=True)
+        for rel in dirs:
+            os.makedirs(os.path.join(dst_dir, *rel.split("/")), exist_ok=True)
+
+        selected = [entry for rel, entry in self.files.items() if select is None or select(rel)]
+        total_bytes = sum(entry[1] for entry in selected)
+        for rel, (_offset, size, mtime_ns, _digest), chunks in self.iter_files(workers, select):
+            dst_path = os.path.join(dst_dir, *rel.split("/"))
+            with open(dst_path, 'wb') as out:
+                for chunk in chunks:
+                    out.write(chunk)
+            os.utime(dst_path, ns=(mtime_ns, mtime_ns))
+            stats.files += 1
+            stats.bytes += size
+            if progress:
+                progress(stats.files, stats.bytes, len(selected), total_bytes)
+        stats.seconds = time.perf_counter() - start
+        return stats
+
+    def verify(self, workers=2):
+        """Hash every file against the index; returns the paths that differ"""
+        bad = []
+        for rel, (_offset, _size, _mtime_ns, digest), chunks in self.iter_files(workers):
+            file_hash = hashlib.sha256()
+            for chunk in chunks:
+                file_hash.update(chunk)
+            if file_hash.hexdigest() != digest:
+                bad.append(rel)
+        return bad
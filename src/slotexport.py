@@ -0,0 +1,192 @@
+# slotexport.py
+# Noita Savior - portable slot export files
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Move a slot between machines as one file.
+
+An export is a plain tar stream, optionally gzip or xz compressed, so it
+can also be opened with any archive tool::
+
+    nsav-slot.json        slot record and manifest (paths -> sha256, size, mtime)
+    objects/<sha256>      contents of each distinct file, once
+
+Both directions stream: objects go from the slot store (or archive)
+straight into the tar and back into the store, one buffer at a time, with
+no temporary copy of the slot. Because the manifest comes first, an
+import skips every object the local store already has; those bytes are
+only read past in the stream, never written.
+"""
+import gzip
+import json
+import lzma
+import os
+import tarfile
+import time
+
+from copyengine import CopyStats
+from objstore import DIGEST, check_manifest
+
+EXPORT_VERSION = 1
+HEADER_NAME = "nsav-slot.json"
+OBJECT_PREFIX = "objects/"
+EXTENSION = ".nsavslot"
+COMPRESSIONS = ("gz", "xz", "none")
+
+
+class ExportError(Exception):
+    """Raised when an export file is not a slot export or is damaged"""
+
+
+class _ChunkReader:
+    """File-like read() over an iterator of byte chunks (for tarfile.addfile)"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = bytearray()
+
+    def read(self, size=-1):
+        # tarfile expects exactly `size` bytes until the end of the member
+        while size < 0 or len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+        if size < 0:
+            size = len(self.buffer)
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+
+def _compressed_writer(f, compression, level):
+    if compression == "gz":
+        return gzip.GzipFile(fileobj=f, mode='wb', compresslevel=6 if level is None else level)
+    if compression == "xz":
+        return lzma.LZMAFile(f, 'wb', preset=1 if level is None else level)
+    if compression == "none":
+        return None
+    raise ValueError(f"Unknown compression: {compression} (choose from {', '.join(COMPRESSIONS)})")
+
+
+def write_export(path, header, objects, compression="gz", level=None, progress=None):
+    """Write an export file and return CopyStats of the object data.
+
+    header is the JSON-able slot description (it must hold "manifest");
+    objects yields (digest, size, opener) for each distinct object, where
+    opener() returns a file-like object or an iterator of byte chunks.
+    The file is written under a temporary name and renamed when complete.
+    """
+    stats = CopyStats()
+    start = time.perf_counter()
+    sizes = {digest: size for digest, size, _mtime in header["manifest"]["files"].values()}
+    total_files = len(sizes)
+    total_bytes = sum(sizes.values())
+    now = int(time.time())
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            compressor = _compressed_writer(f, compression, level)
+            try:
+                with tarfile.open(fileobj=compressor or f, mode="w|",
+                                  format=tarfile.PAX_FORMAT) as tar:
+                    data = json.dumps(dict(header, version=EXPORT_VERSION),
+                                      separators=(",", ":")).encode("utf-8")
+                    info = tarfile.TarInfo(HEADER_NAME)
+                    info.size = len(data)
+                    info.mtime = now
+                    tar.addfile(info, _ChunkReader([data]))
+                    for digest, size, opener in objects:
+                        info = tarfile.TarInfo(OBJECT_PREFIX + digest)
+                        info.size = size
+                        info.mtime = now
+                        source = opener()
+                        try:
+                            tar.addfile(info, source if hasattr(source, "read")
+                                        else _ChunkReader(source))
+                        finally:
+                            if hasattr(source, "close"):
+                                source.close()
+                        stats.files += 1
+                        stats.bytes += size
+                        if progress:
+                            progress(stats.files, stats.bytes, total_files, total_bytes)
+            finally:
+                if compressor is not None:
+                    compressor.close()
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def read_export(path, store, on_header, progress=None):
+    """Stream an export file into an ObjectStore.
+
+    on_header(header) is called as soon as the slot description has been
+    read; objects the store already has are skipped. Manifest paths that
+    would leave the save folder and member names that are not object
+    hashes raise ExportError before anything is written. Returns
+    (header, CopyStats of the objects written, number of objects skipped).
+    """
+    stats = CopyStats()
+    start = time.perf_counter()
+    header = None
+    skipped = 0
+    done_bytes = 0
+    try:
+        # "r|*" detects gzip/xz/uncompressed on the fly
+        with tarfile.open(path, mode="r|*") as tar:
+            for member in tar:
+                if member.name == HEADER_NAME:
+                    header = json.loads(tar.extractfile(member).read().decode("utf-8"))
+                    if header.get("version") != EXPORT_VERSION or "manifest" not in header:
+                        raise ExportError(f"Unsupported slot export: {path}")
+                    try:
+                        # Paths are restored into the save folder, digests name store files
+                        check_manifest(header["manifest"])
+                    except ValueError as e:
+                        raise ExportError(f"Refusing slot export {path}: {e}")
+                    on_header(header)
+                    sizes = {digest: size for digest, size, _mtime
+                             in header["manifest"]["files"].values()}
+                    continue
+                if header is None:
+                    raise ExportError(f"Not a slot export (no {HEADER_NAME} first): {path}")
+                if not member.isfile() or not member.name.startswith(OBJECT_PREFIX):
+                    continue
+                digest = member.name[len(OBJECT_PREFIX):]
+                if digest not in sizes or not DIGEST.fullmatch(digest):
+                    raise ExportError(f"Refusing slot export {path}: "
+                                      f"unexpected member {member.name!r}")
+                if store.has_object(digest):
+                    skipped += 1
+                else:
+                    store.add_object(digest, tar.extractfile(member))
+                    stats.files += 1
+                    stats.bytes += member.size
+                if progress:
+                    done_bytes += member.size
+                    progress(stats.files + skipped, done_bytes, len(sizes), sum(sizes.values()))
+    except (tarfile.TarError, EOFError, OSError, ValueError) as e:
+        if isinstance(e, FileNotFoundError):
+            raise
+        raise ExportError(f"Cannot read slot export {path}: {e}")
+    if header is None:
+        raise ExportError(f"Not a slot export: {path}")
+    stats.seconds = time.perf_counter() - start
+    return header, stats, skipped
@@ -0,0 +1,224 @@
+# slotlist.py
+# Noita Savior - virtualized slot list widget
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+A scrolling list of slots that only has widgets for the rows on screen.
+
+The list keeps a small pool of row widgets, just enough to fill its
+height, and refills them from the item list whenever it scrolls. Having
+800 slots therefore costs no more widgets than having 8.
+"""
+import tkinter as tk
+import tkinter.font
+from tkinter import ttk
+
+ROW_PADDING = 3
+SELECTED_BACKGROUND = "#cce4f7"
+
+
+# Simple tooltip helper
+class ToolTip:
+    """Display a tooltip with the full slot name when hovering over a widget."""
+    def __init__(self, widget, text=""):
+        self.widget = widget
+        self.text = text
+        self.tipwindow = None
+        widget.bind("<Enter>", self.enter, add="+")
+        widget.bind("<Leave>", self.leave, add="+")
+
+    def enter(self, event=None):
+        if self.tipwindow or not self.text:
+            return
+        # Position the tooltip just below the widget
+        x = self.widget.winfo_rootx() + 20
+        y = self.widget.winfo_rooty() + self.widget.winfo_height() + 5
+        self.tipwindow = tw = tk.Toplevel(self.widget)
+        tw.wm_overrideredirect(True)
+        tw.wm_geometry(f"+{x}+{y}")
+        label = ttk.Label(tw, text=self.text, background="#ffffe0",
+                          relief='solid', borderwidth=1, padding=2)
+        label.pack()
+
+    def leave(self, event=None):
+        tw = self.tipwindow
+        self.tipwindow = None
+        if tw:
+            tw.destroy()
+
+
+class VirtualSlotList(ttk.Frame):
+    """Scrollable, selectable list of (slot, record) items.
+
+    columns is a list of (title, width in characters, anchor); format_row
+    turns an item into one string per column plus a tooltip text.
+    """
+
+    def __init__(self, master, columns, format_row, on_select=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.columns = columns
+        self.format_row = format_row
+        self.on_select = on_select
+        self.items = []
+        self.offset = 0
+        self.capacity = 1
+        self.selected = None
+        # Pool of (frame, labels, tooltip); each row remembers the slot it shows
+        self.rows = []
+        self.row_slots = []
+
+        font = tkinter.font.nametofont("TkDefaultFont")
+        self.row_height = font.metrics("linespace") + 2 * ROW_PADDING
+        self.background = ttk.Style().lookup("TFrame", "background") or "white"
+
+        header = ttk.Frame(self)
+        header.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        for col, (title, width, anchor) in enumerate(columns):
+            ttk.Label(header, text=title, width=width, anchor=anchor,
+                      font=("Arial", 9, "bold")).grid(row=0, column=col, padx=4, sticky=tk.W)
+        header.columnconfigure(0, weight=1)
+
+        self.body = tk.Frame(self, height=self.row_height * 8, background=self.background,
+                             takefocus=1, highlightthickness=1)
+        self.body.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.body.grid_propagate(False)
+        self.body.columnconfigure(0, weight=1)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._scroll)
+        self.scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+
+        self.body.bind("<Configure>", self._resize)
+        self._bind_common(self.body)
+        self.body.bind("<Up>", lambda event: self._move(-1))
+        self.body.bind("<Down>", lambda event: self._move(1))
+        self.body.bind("<Prior>", lambda event: self._move(-self.capacity))
+        self.body.bind("<Next>", lambda event: self._move(self.capacity))
+
+    # -- public ----------------------------------------------------------
+
+    def set_items(self, items):
+        """Show a new list of (slot, record) items, keeping the selection if possible"""
+        self.items = items
+        if self.selected is not None and self.index_of(self.selected) is None:
+            self.select(None)
+        self._render()
+
+    def index_of(self, slot):
+        for index, (item_slot, _record) in enumerate(self.items):
+            if item_slot == slot:
+                return index
+        return None
+
+    def select(self, slot):
+        """Select a slot (or None) and tell on_select"""
+        self.selected = slot
+        self._render()
+        if self.on_select:
+            self.on_select(slot)
+
+    def see(self, slot):
+        """Scroll so that slot is visible"""
+        index = self.index_of(slot)
+        if index is None:
+            return
+        if index < self.offset:
+            self.offset = index
+        elif index >= self.offset + self.capacity:
+            self.offset = index - self.capacity + 1
+        self._render()
+
+    # -- rows ------------------------------------------------------------
+
+    def _bind_common(self, widget):
+        widget.bind("<MouseWheel>", self._wheel)
+        widget.bind("<Button-4>", lambda event: self._scroll("scroll", -1, "units"))
+        widget.bind("<Button-5>", lambda event: self._scroll("scroll", 1, "units"))
+
+    def _make_row(self, position):
+        frame = tk.Frame(self.body, background=self.background)
+        labels = []
+        for col, (_title, width, anchor) in enumerate(self.columns):
+            label = tk.Label(frame, width=width, anchor=anchor, background=self.background,
+                             font=("Arial", 9))
+            label.grid(row=0, column=col, padx=4, pady=ROW_PADDING - 1, sticky=tk.W)
+            label.bind("<Button-1>", lambda event, position=position: self._click(position))
+            self._bind_common(label)
+            labels.append(label)
+        frame.columnconfigure(0, weight=1)
+        frame.bind("<Button-1>", lambda event, position=position: self._click(position))
+        self._bind_common(frame)
+        self.rows.append((frame, labels, ToolTip(labels[0])))
+        self.row_slots.append(None)
+
+    def _resize(self, event):
+        self.capacity = max(1, event.height // self.row_height)
+        while len(self.rows) < self.capacity:
+            self._make_row(len(self.rows))
+        for position, (frame, _labels, _tooltip) in enumerate(self.rows):
+            if position < self.capacity:
+                frame.grid(row=position, column=0, sticky=(tk.W, tk.E))
+            else:
+                frame.grid_remove()
+        self._render()
+
+    def _render(self):
+        self.offset = max(0, min(self.offset, len(self.items) - self.capacity))
+        for position, (frame, labels, tooltip) in enumerate(self.rows[:self.capacity]):
+            index = self.offset + position
+            if index < len(self.items):
+                slot, record = self.items[index]
+                values, tip = self.format_row(slot, record)
+                color = SELECTED_BACKGROUND if slot == self.selected else self.background
+            else:
+                slot, values, tip, color = None, [""] * len(labels), "", self.background
+            self.row_slots[position] = slot
+            frame.config(background=color)
+            for label, value in zip(labels, values):
+                label.config(text=value, background=color)
+            tooltip.text = tip
+        if self.items:
+            self.scrollbar.set(self.offset / len(self.items),
+                               min(1.0, (self.offset + self.capacity) / len(self.items)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    # -- events ----------------------------------------------------------
+
+    def _click(self, position):
+        self.body.focus_set()
+        slot = self.row_slots[position]
+        if slot is not None:
+            self.select(slot)
+
+    def _move(self, step):
+        if not self.items:
+            return
+        index = self.index_of(self.selected)
+        index = 0 if index is None else max(0, min(len(self.items) - 1, index + step))
+        self.select(self.items[index][0])
+        self.see(self.selected)
+
+    def _wheel(self, event):
+        # Windows and macOS report multiples of 120 / small deltas
+        step = -1 if event.delta > 0 else 1
+        self._scroll("scroll", step * 3, "units")
+
+    def _scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.offset = int(float(amount) * len(self.items))
+        else:
+            step = self.capacity if unit == "pages" else 1
+            self.offset += int(amount) * step
+        self._render()
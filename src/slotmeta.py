@@ -0,0 +1,212 @@
+# slotmeta.py
+# Noita Savior - journaled slot metadata
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Slot metadata kept as a snapshot file plus an append-only journal.
+
+``slots.json`` holds the state as of the last compaction and is only ever
+replaced atomically (temp file + rename; the previous copy is kept as
+``slots.json.bak``). Every change in between is one JSON line appended
+to ``slots.journal``. Journal entries are idempotent, so replaying one
+that already made it into the snapshot does no harm, and a torn last
+line from a crash is simply dropped.
+
+Records carry everything the UI shows (name, date, size, file count,
+manifest hash, timings), so listing slots needs no file system access
+beyond reading these two files.
+"""
+import json
+import os
+import threading
+
+INDEX_VERSION = 1
+COMPACT_EVERY = 200
+
+# sort name -> (key function over (slot, record), newest/largest first)
+SORT_ORDERS = {
+    "date": (lambda item: (item[1].get("saved_at") or 0, item[1].get("date", "")), True),
+    "name": (lambda item: item[1].get("name", "").lower(), False),
+    "size": (lambda item: item[1].get("size") or 0, True),
+    "slot": (lambda item: int(item[0]), False),
+    # Run details parsed from the save (see runsummary.py)
+    "playtime": (lambda item: item[1].get("run", {}).get("playtime") or 0, True),
+    "gold": (lambda item: item[1].get("run", {}).get("gold") or 0, True),
+    "depth": (lambda item: item[1].get("run", {}).get("depth") or 0, True),
+}
+
+
+class SlotIndex:
+    """Slot records keyed by slot id, persisted through a journal"""
+
+    def __init__(self, path, compact_every=COMPACT_EVERY):
+        self.path = path
+        self.backup_path = f"{path}.bak"
+        self.journal_path = os.path.splitext(path)[0] + ".journal"
+        self.compact_every = compact_every
+        self.lock = threading.Lock()
+        self.slots = {}
+        # True if records came from a pre-journal slots.json (or nothing),
+        # in which case the caller should check them against the disk once
+        self.needs_reconcile = False
+        self.journal_entries = 0
+        self.load()
+
+    # -- reading ---------------------------------------------------------
+
+    def _read_snapshot(self, path):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("slot index is not a JSON object")
+        if "version" in data and isinstance(data.get("slots"), dict):
+            return data["slots"], False
+        # Old format: the whole file is {slot: record}
+        return {key: value for key, value in data.items() if isinstance(value, dict)}, True
+
+    def load(self):
+        """(Re)read the snapshot and replay the journal on top of it"""
+        with self.lock:
+            slots = None
+            recovered = False
+            self.needs_reconcile = False
+            for path in (self.path, self.backup_path):
+                try:
+                    slots, legacy = self._read_snapshot(path)
+                except FileNotFoundError:
+                    continue
+                except (OSError, ValueError) as e:
+                    print(f"Slot index {path} is damaged ({e}), trying older copy")
+                    continue
+                if path != self.path:
+                    print(f"Recovered slot index from {path}")
+                    recovered = True
+                self.needs_reconcile = legacy
+                break
+            if slots is None:
+                slots = {}
+                self.needs_reconcile = True
+            self.slots = slots
+
+            entries, torn = self._replay()
+            self.journal_entries = entries
+        if torn:
+            print(f"Dropped {torn} incomplete entries from {self.journal_path}")
+        if torn or recovered:
+            # Start a clean journal on top of a good snapshot
+            self.compact()
+        return self.slots
+
+    def _replay(self):
+        """Apply the journal to self.slots; returns (entries applied, torn lines)"""
+        try:
+            with open(self.journal_path, 'r') as f:
+                lines = f.read().split("\n")
+        except FileNotFoundError:
+            return 0, 0
+        except OSError as e:
+            print(f"Cannot read {self.journal_path}: {e}")
+            return 0, 0
+        applied = torn = 0
+        for line in lines:
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+                self._apply(entry)
+            except (ValueError, KeyError, TypeError):
+                torn += 1
+                continue
+            applied += 1
+        return applied, torn
+
+    def _apply(self, entry):
+        slot = entry["slot"]
+        if entry["op"] == "update":
+            record = dict(self.slots.get(slot, {}))
+            record.update(entry["fields"])
+            # Replace rather than mutate so readers on other threads never
+            # see a half-updated record
+            self.slots[slot] = record
+        elif entry["op"] == "delete":
+            self.slots.pop(slot, None)
+        else:
+            raise ValueError(f"unknown journal op: {entry['op']}")
+
+    # -- access ----------------------------------------------------------
+
+    def get(self, slot, default=None):
+        """Return the record of a slot"""
+        return self.slots.get(str(slot), default)
+
+    def query(self, text="", sort="date", descending=None):
+        """Return [(slot, record)] of saved slots whose name contains text.
+
+        text also matches the exact seed of a slot's run. sort is one of
+        SORT_ORDERS; descending defaults to newest/largest first for dates,
+        sizes and run details and A-Z for names.
+        """
+        key, default_descending = SORT_ORDERS[sort]
+        text = text.strip().lower()
+        items = [(slot, record) for slot, record in list(self.slots.items())
+                 if record.get("exists") and
+                 (not text or text in record.get("name", "").lower() or
+                  text == record.get("run", {}).get("seed"))]
+        items.sort(key=key, reverse=default_descending if descending is None else descending)
+        return items
+
+    def update(self, slot, **fields):
+        """Merge fields into a slot's record and journal the change"""
+        self._append({"op": "update", "slot": str(slot), "fields": fields})
+
+    def remove(self, slot):
+        """Forget a slot's record"""
+        self._append({"op": "delete", "slot": str(slot)})
+
+    def _append(self, entry):
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self.lock:
+            with open(self.journal_path, 'a') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._apply(entry)
+            self.journal_entries += 1
+            due = self.journal_entries >= self.compact_every
+        if due:
+            self.compact()
+
+    # -- compaction ------------------------------------------------------
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot and empty the journal"""
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({"version": INDEX_VERSION, "slots": self.slots}, f,
+                          indent=2, sort_keys=True)
+                f.flush()
+                os.fsync(f.fileno())
+            # The journal stays until the new snapshot is in place; replaying
+            # it on top of either copy gives the same result
+            if os.path.exists(self.path):
+                os.replace(self.path, self.backup_path)
+            os.replace(tmp_path, self.path)
+            with open(self.journal_path, 'w'):
+                pass
+            self.journal_entries = 0
+            self.needs_reconcile = False
@@ -0,0 +1,149 @@
+# snapclone.py
+# Noita Savior - copy-on-write and hardlink file cloning
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Clone files instead of copying their bytes where the filesystem allows it.
+
+On btrfs, XFS with reflink and similar filesystems a file can be cloned
+with the FICLONE ioctl: the copy shares its data blocks with the original
+until one of them is written, so it takes no time and no space. Where
+that is not available, files that are never modified in place can be
+hardlinked instead. Everything else falls back to a normal copy.
+
+Support is probed once per pair of devices and cached for the lifetime
+of the process.
+"""
+import fnmatch
+import os
+import shutil
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# _IOW(0x94, 9, int) from linux/fs.h
+FICLONE = 0x40049409
+PROBE_SIZE = 4096
+COPY_RANGE_CHUNK = 64 * 1024 * 1024
+
+# Files Noita writes once and never rewrites in place, safe to hardlink
+DEFAULT_LINK_PATTERNS = ("persistent/flags/*", "stats/sessions/*")
+
+_capabilities = {}
+_lock = threading.Lock()
+
+
+class Capabilities:
+    """What the filesystem between two directories supports"""
+
+    def __init__(self, reflink=False, hardlink=False, same_device=False):
+        self.reflink = reflink
+        self.hardlink = hardlink
+        self.same_device = same_device
+
+    def __repr__(self):
+        return (f"Capabilities(reflink={self.reflink}, hardlink={self.hardlink}, "
+                f"same_device={self.same_device})")
+
+
+def reflink(src, dst):
+    """Clone src to dst with FICLONE; raises OSError if unsupported"""
+    if fcntl is None:
+        raise OSError("reflinks are not supported on this platform")
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.remove(dst)
+            raise
+
+
+def _probe(directory):
+    src = os.path.join(directory, f".nsav_probe_{os.getpid()}")
+    dst = src + ".clone"
+    link = src + ".link"
+    can_reflink = can_link = False
+    try:
+        with open(src, 'wb') as f:
+            f.write(b"\0" * PROBE_SIZE)
+        try:
+            reflink(src, dst)
+            can_reflink = True
+        except OSError:
+            pass
+        try:
+            os.link(src, link)
+            can_link = True
+        except (OSError, AttributeError, NotImplementedError):
+            pass
+    finally:
+        for path in (src, dst, link):
+            if os.path.exists(path):
+                os.remove(path)
+    return can_reflink, can_link
+
+
+def detect(src_dir, dst_dir):
+    """Return the cached Capabilities for cloning files from src_dir to dst_dir.
+
+    The probe only writes scratch files into dst_dir, never into src_dir.
+    """
+    key = (os.stat(src_dir).st_dev, os.stat(dst_dir).st_dev)
+    with _lock:
+        caps = _capabilities.get(key)
+        if caps is None:
+            if key[0] == key[1]:
+                caps = Capabilities(*_probe(dst_dir), same_device=True)
+            else:
+                caps = Capabilities()
+            _capabilities[key] = caps
+            print(f"Clone support {src_dir} -> {dst_dir}: {caps}")
+    return caps
+
+
+def is_link_safe(rel_path, patterns):
+    """Check a '/'-separated relative path against the hardlink-safe patterns"""
+    return any(fnmatch.fnmatchcase(rel_path, pattern) for pattern in patterns)
+
+
+def copy_file(src, dst, caps=None, link_ok=False):
+    """Copy src to dst using the cheapest method caps allow.
+
+    Returns "reflink", "hardlink" or "copy". link_ok must only be set for
+    files that neither side will ever modify in place.
+    """
+    if caps is not None and caps.reflink:
+        try:
+            reflink(src, dst)
+            return "reflink"
+        except OSError:
+            pass
+    if caps is not None and caps.hardlink and link_ok:
+        os.link(src, dst)
+        return "hardlink"
+    if caps is not None and caps.same_device and hasattr(os, "copy_file_range"):
+        # Lets the kernel copy (or share) the data without a userspace round trip
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                while os.copy_file_range(fsrc.fileno(), fdst.fileno(), COPY_RANGE_CHUNK):
+                    pass
+            return "copy"
+        except OSError:
+            pass
+    shutil.copyfile(src, dst)
+    return "copy"
@@ -0,0 +1,214 @@
+# trash.py
+# Noita Savior - instant deletes with background reclamation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Delete folders by renaming them into a trash folder.
+
+A rename is instant no matter how big the tree is. A low-priority reaper
+thread then removes the trash entries file by file. Whatever is still in
+the trash when the program exits is picked up again by the next start.
+Paths on another drive cannot be renamed into the trash and are removed
+right away instead.
+"""
+import contextlib
+import itertools
+import os
+import shutil
+import sys
+import threading
+import time
+
+# Pause briefly after this many files so the reaper never hogs the disk
+REAP_BATCH = 256
+REAP_PAUSE = 0.005
+
+
+# SetThreadPriority mode that also lowers the thread's disk and memory priority
+THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+
+
+def lower_thread_priority():
+    """Make the calling thread low priority where the OS allows it per thread"""
+    if sys.platform == "win32":
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN)
+    elif hasattr(os, "setpriority") and hasattr(threading, "get_native_id"):
+        try:
+            # On Linux the "process" priority of a thread id is per thread
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except OSError:
+            pass
+
+
+class Trash:
+    """Trash folder plus the reaper thread that empties it"""
+
+    _ids = itertools.count()
+
+    def __init__(self, trash_dir):
+        self.trash_dir = trash_dir
+        os.makedirs(trash_dir, exist_ok=True)
+        self.condition = threading.Condition()
+        # entry name -> bytes still to free (None until measured)
+        self.pending = {name: None for name in os.listdir(trash_dir)}
+        self.stopping = False
+        self.thread = None
+
+    def discard(self, path, size=None):
+        """Move path (file or folder) into the trash; returns True if it existed"""
+        if not os.path.lexists(path):
+            return False
+        name = f"{time.time_ns()}_{next(self._ids)}_{os.path.basename(path)}"
+        try:
+            os.rename(path, os.path.join(self.trash_dir, name))
+        except OSError:
+            # Different drive: no instant way around deleting it here
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+            return True
+        with self.condition:
+            self.pending[name] = size
+            self.condition.notify_all()
+        return True
+
+    def pending_bytes(self):
+        """Bytes waiting to be reclaimed (entries not measured yet count as 0)"""
+        with self.condition:
+            return sum(size or 0 for size in self.pending.values())
+
+    def pending_count(self):
+        """Number of trash entries not yet removed"""
+        with self.condition:
+            return len(self.pending)
+
+    def start(self):
+        """Start the reaper on a daemon thread"""
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self._loop, name="trash-reaper", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the reaper; unfinished entries stay for the next start"""
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def empty(self):
+        """Remove everything in the trash on the calling thread"""
+        while True:
+            with self.condition:
+                # A stopped reaper leaves entries half-done for the next start
+                if not self.pending or self.stopping:
+                    return
+                name = next(iter(self.pending))
+            self._reap(name, pause=False)
+
+    def _loop(self):
+        lower_thread_priority()
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopping:
+                    self.condition.wait()
+                if self.stopping:
+                    return
+                name = next(iter(self.pending))
+            try:
+                self.measure_pending()
+                self._reap(name, pause=True)
+            except Exception as e:
+                print(f"Trash reaper could not remove {name}: {e}")
+                with self.condition:
+                    self.pending.pop(name, None)
+
+    def measure_pending(self):
+        """Measure entries of unknown size so pending_bytes() covers all of them"""
+        with self.condition:
+            unknown = [name for name, size in self.pending.items() if size is None]
+        for name in unknown:
+            path = os.path.join(self.trash_dir, name)
+            try:
+                size = self._measure(path)
+            except OSError:
+                size = 0
+            with self.condition:
+                if name in self.pending and self.pending[name] is None:
+                    self.pending[name] = size
+
+    def _measure(self, path):
+        if not os.path.isdir(path) or os.path.islink(path):
+            return os.lstat(path).st_size
+        total = 0
+        for dirpath, _dirnames, filenames in os.walk(path):
+            for filename in filenames:
+                try:
+                    total += os.lstat(os.path.join(dirpath, filename)).st_size
+                except OSError:
+                    pass
+        return total
+
+    def _reap(self, name, pause):
+        # Another process (the window and the command line share the trash)
+        # may be removing the same entry; whatever is gone already is skipped
+        path = os.path.join(self.trash_dir, name)
+        with self.condition:
+            size = self.pending.get(name)
+        if size is None:
+            try:
+                size = self._measure(path)
+            except FileNotFoundError:
+                size = 0
+            with self.condition:
+                self.pending[name] = size
+
+        if not os.path.isdir(path) or os.path.islink(path):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+        else:
+            removed = 0
+            for dirpath, dirnames, filenames in os.walk(path, topdown=False):
+                for filename in filenames:
+                    file_path = os.path.join(dirpath, filename)
+                    try:
+                        size = os.lstat(file_path).st_size
+                        os.remove(file_path)
+                    except FileNotFoundError:
+                        continue
+                    with self.condition:
+                        if name in self.pending:
+                            self.pending[name] = max(0, self.pending[name] - size)
+                        if self.stopping:
+                            return
+                    removed += 1
+                    if pause and removed % REAP_BATCH == 0:
+                        time.sleep(REAP_PAUSE)
+                for dirname in dirnames:
+                    dir_path = os.path.join(dirpath, dirname)
+                    with contextlib.suppress(FileNotFoundError):
+                        if os.path.islink(dir_path):
+                            os.remove(dir_path)
+                        else:
+                            os.rmdir(dir_path)
+            with contextlib.suppress(FileNotFoundError):
+                os.rmdir(path)
+        with self.condition:
+            self.pending.pop(name, None)
@@ -0,0 +1,212 @@
+# verify.py
+# Noita Savior - integrity verification of stored slots
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Check stored slots against the hashes recorded when they were saved.
+
+Store slots are checked object by object: an object is named after the
+SHA-256 of its contents, so re-hashing it is the whole check. Archive
+slots carry a SHA-256 per file in their index and are checked by
+decompressing them once.
+
+A verification cache remembers the size and mtime of every object and
+archive at its last successful check. Only files whose size or mtime
+changed since are hashed again, and objects shared by several slots are
+hashed once, so a repeated check costs time in proportion to what
+changed rather than to the size of the backups. Hashing runs on the
+CopyEngine pool; hashlib releases the GIL, so it scales with the cores.
+"""
+import json
+import os
+import time
+
+from copyengine import CopyEngine
+from objstore import hash_file
+
+CACHE_VERSION = 1
+
+
+class VerifyReport:
+    """Outcome of a verification run"""
+
+    def __init__(self):
+        self.slots = 0
+        self.hashed_files = 0
+        self.hashed_bytes = 0
+        self.cached_files = 0
+        self.unverifiable = []  # slot labels without recorded hashes
+        self.problems = []  # (slot label, relative path, reason)
+        self.seconds = 0.0
+
+    @property
+    def ok(self):
+        return not self.problems
+
+    def damaged_slots(self):
+        return sorted({label for label, _rel, _reason in self.problems})
+
+    def __str__(self):
+        text = (f"{self.slots} slots, hashed {self.hashed_files} files "
+                f"({self.hashed_bytes / 1048576:.1f} MB), {self.cached_files} unchanged "
+                f"in {self.seconds:.2f}s")
+        if self.problems:
+            text += f", {len(self.problems)} damaged files"
+        return text
+
+
+def _check_object(path, digest):
+    """Re-hash one store object; returns (matches, stat before hashing)"""
+    st = os.stat(path)
+    return hash_file(path) == digest, st
+
+
+def _check_archive(path):
+    """Hash every file of an archive; returns (bad paths, stat before reading)"""
+    from slotarchive import SlotArchive
+
+    st = os.stat(path)
+    return SlotArchive(path).verify(), st
+
+
+class Verifier:
+    """Verifies store and archive slots, remembering what was already checked"""
+
+    def __init__(self, store, cache_file, engine=None):
+        self.store = store
+        self.cache_file = cache_file
+        self.engine = engine or CopyEngine()
+        self.cache = self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                return {"objects": data.get("objects", {}),
+                        "archives": data.get("archives", {})}
+        except (OSError, ValueError, AttributeError):
+            pass
+        return {"objects": {}, "archives": {}}
+
+    def _save_cache(self):
+        # Forget objects that no slot references any more
+        with self.store.lock:
+            live = set(self.store.refcounts)
+        self.cache["objects"] = {digest: entry for digest, entry
+                                 in self.cache["objects"].items() if digest in live}
+        self.cache["archives"] = {path: entry for path, entry
+                                  in self.cache["archives"].items() if os.path.exists(path)}
+        tmp_path = f"{self.cache_file}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": CACHE_VERSION, **self.cache}, f, separators=(",", ":"))
+        os.replace(tmp_path, self.cache_file)
+
+    def _unchanged(self, kind, key, st):
+        entry = self.cache[kind].get(key)
+        return entry is not None and entry == [st.st_size, st.st_mtime_ns]
+
+    def verify(self, slots, full=False, progress=None):
+        """Check slots and return a VerifyReport.
+
+        slots is a list of (label, kind, target): kind "store" with a
+        snapshot name, "archive" with an archive path, or anything else for
+        slots that have no recorded hashes. full=True ignores the cache.
+        """
+        report = VerifyReport()
+        start = time.perf_counter()
+        objects = {}  # digest -> (expected size, [(label, rel)])
+        archives = []
+        for label, kind, target in slots:
+            report.slots += 1
+            if kind == "store":
+                manifest = self.store.read_manifest(target)
+                if manifest is None:
+                    report.problems.append((label, "", "snapshot manifest missing"))
+                    continue
+                for rel, (digest, size, _mtime_ns) in manifest["files"].items():
+                    objects.setdefault(digest, (size, []))[1].append((label, rel))
+            elif kind == "archive":
+                archives.append((label, target))
+            else:
+                report.unverifiable.append(label)
+
+        tasks = []
+        checks = []
+        # Files stored as chunks are checked through their chunks, each only once
+        chunked = {}
+        for digest, (size, users) in (item for group in (objects, chunked)
+                                      for item in group.items()):
+            path = self.store.object_path(digest)
+            try:
+                st = os.stat(path)
+            except OSError:
+                chunks = self.store.read_recipe(digest)
+                if chunks is not None and sum(chunk_size for _chunk, chunk_size in chunks) == size:
+                    for chunk, chunk_size in chunks:
+                        chunked.setdefault(chunk, (chunk_size, []))[1].extend(users)
+                else:
+                    report.problems.extend((label, rel, "object missing") for label, rel in users)
+                continue
+            if st.st_size != size:
+                # Truncation shows without reading a byte
+                report.problems.extend((label, rel, f"size {st.st_size} instead of {size}")
+                                       for label, rel in users)
+                continue
+            if not full and self._unchanged("objects", digest, st):
+                report.cached_files += 1
+                continue
+            tasks.append((_check_object, (path, digest), size))
+            checks.append(("objects", digest, users))
+        for label, path in archives:
+            try:
+                st = os.stat(path)
+            except OSError:
+                report.problems.append((label, "", "archive missing"))
+                continue
+            if not full and self._unchanged("archives", path, st):
+                report.cached_files += 1
+                continue
+            tasks.append((_check_archive, (path,), st.st_size))
+            checks.append(("archives", path, [(label, "")]))
+
+        def guarded(func, *args):
+            try:
+                return func(*args)
+            except Exception as e:
+                return e, None
+
+        results, stats = self.engine.run(
+            [(guarded, (func,) + args, size) for func, args, size in tasks], progress)
+        report.hashed_files = stats.files
+        report.hashed_bytes = stats.bytes
+
+        for (kind, key, users), (outcome, st) in zip(checks, results):
+            if isinstance(outcome, Exception):
+                report.problems.extend((label, rel, f"unreadable: {outcome}")
+                                       for label, rel in users)
+            elif kind == "objects" and not outcome:
+                report.problems.extend((label, rel, "contents changed") for label, rel in users)
+            elif kind == "archives" and outcome:
+                label = users[0][0]
+                report.problems.extend((label, rel, "contents changed") for rel in outcome)
+            else:
+                # Stat taken before hashing: a write during the check forces a recheck
+                self.cache[kind][key] = [st.st_size, st.st_mtime_ns]
+                continue
+            self.cache[kind].pop(key, None)
+
+        self._save_cache()
+        report.seconds = time.perf_counter() - start
+        return report